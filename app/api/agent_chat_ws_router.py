@@ -1,64 +1,173 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.services.agent_chat_service import agent_chat_answer
-from app.services.agent_chat_service import flush_all_chat_logs
-from typing import List, Dict
+from app.services.agent_chat_service import agent_chat_answer_async, warm_manual_resources
 import uuid
 import time
+import asyncio
+from typing import Set
+from app.core import metrics
+from app.services import conversation_memory
+from app.services.chat_turns import TurnRunner
+from app.services import session_manager
+from app.services.session_manager import connection_manager
 
 router = APIRouter()
 
+# 진행 중인 매뉴얼 예열 작업 (참조를 잡아 두지 않으면 완료 전에 가비지 컬렉션될 수 있음)
+_warm_tasks: Set[asyncio.Task] = set()
+
+
+def _on_warm_done(task: asyncio.Task):
+    _warm_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"매뉴얼 예열 실패: {task.exception()}")
+
+
+def _start_warm(manual_id: str):
+    """매뉴얼 임베딩/색인 예열을 백그라운드로 시작합니다. (실패해도 첫 질문 때 다시 적재됨)"""
+    task = asyncio.create_task(asyncio.to_thread(warm_manual_resources, manual_id))
+    _warm_tasks.add(task)
+    task.add_done_callback(_on_warm_done)
+
+
+def _normalize_experiment_id(value):
+    """
+    experiment_id를 한 가지 타입으로 맞춥니다. Redis 세션 상태나 클라이언트가 보낸 숫자 문자열은 int로
+    바꿔 채팅 로그 버퍼/DB(정수 컬럼)와 같은 값으로 비교되게 합니다. (빈 값은 None)
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return value
+
 @router.websocket("/ws/agent-chat")
 async def agent_chat_ws(websocket: WebSocket):
     """
     WebSocket 기반 Agent QA 챗봇 (manual_id, sender, message 입력 → 답변/기록 반환)
+
+    요청에 "stream": true를 주면 답변 생성 중 {"event": "delta", "delta": "<토큰>"} 프레임을 여러 번 보낸 뒤,
+    마지막에 기존 응답 필드(message/answer/type/logged/experiment_id/history)를 담은 {"event": "final"} 프레임을 보냅니다.
+    "mode"로 답변 방식(fast: 검색 1회 + LLM 1회, agent: 함수 호출 에이전트, auto: 자동 선택)을 고를 수 있습니다.
+    최종 프레임의 metrics에는 첫 토큰까지 시간(ttft_ms)과 전체 시간(total_ms)이 들어갑니다.
+    대화 기록은 서버가 experiment_id별로 보관하므로 요청의 history 필드는 더 이상 사용하지 않습니다.
+
+    답변 생성 중 새 메시지를 보내면 진행 중인 답변을 취소하고({"event": "cancelled", "reason": "superseded"})
+    새 메시지를 처리합니다. "interrupt": false를 주면 취소하지 않고 대기열에 넣으며,
+    대기열(WS_SESSION_QUEUE_SIZE)이 가득 차면 {"event": "rejected"}로 거절합니다.
+    연결이 끊기면 진행 중인 LLM/검색 작업도 취소됩니다.
+
+    세션 상태는 Redis에 저장되므로, 최종 프레임의 session_id로 ?session_id=...를 붙여 다시 연결하면
+    다른 워커에 붙더라도 같은 experiment_id와 대화 기록으로 이어집니다. 서버가 보내는 이벤트
+    (예: {"event": "tts_ready"})도 세션 채널을 통해 이 연결로 전달됩니다.
     """
     await websocket.accept()
-    history: List[Dict[str, str]] = []
-    experiment_id  = str(uuid.uuid4()) # 세션 ID 생성
+    # ?session_id=... 로 다시 연결하면 어느 워커로 붙든 Redis에 저장된 세션 상태를 이어서 사용
+    session_id = websocket.query_params.get("session_id") or uuid.uuid4().hex
+    saved_state = await session_manager.load_state(session_id)
+    session = {
+        # 새 세션은 첫 턴에서 정수 experiment_id를 만듦 (agent_chat_answer와 같은 방식)
+        "experiment_id": _normalize_experiment_id(saved_state.get("experiment_id")),
+        # ws://.../ws/agent-chat?manual_id=... 로 연결하면 첫 질문 전에 매뉴얼 임베딩/색인을 예열
+        "warmed_manual_id": websocket.query_params.get("manual_id") or saved_state.get("manual_id"),
+    }
+    if session["warmed_manual_id"]:
+        _start_warm(session["warmed_manual_id"])
+    # 다른 워커/백그라운드 작업이 session_manager.notify()로 보낸 이벤트를 이 연결로 전달
+    connection_token = await connection_manager.connect(session_id, websocket.send_json,
+                                     experiment_id=session["experiment_id"], manual_id=session["warmed_manual_id"])
+
+    async def handle_turn(data: dict):
+        manual_id = data["manual_id"]
+        message = data["message"]
+        user_id = data.get("user_id", "default_user")
+
+        # experiment_id 없으면 새로 생성 (정수값으로)
+        experiment_id = _normalize_experiment_id(data.get("experiment_id")) or session["experiment_id"] or int(time.time())
+
+        # "stream": true 이면 토큰이 생성되는 대로 {"event": "delta"} 프레임으로 전송
+        stream = bool(data.get("stream", False))
+        started = time.perf_counter()
+        first_token_at = None
+
+        async def send_delta(token: str):
+            nonlocal first_token_at
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            await websocket.send_json({"event": "delta", "delta": token})
+
+        # agent_chat_answer 호출 시 session_id 전달 (비동기 버전: 응답을 기다리는 동안 다른 연결도 처리됨)
+        result = await agent_chat_answer_async(
+            manual_id=manual_id, 
+            sender="user",
+            message=message, 
+            user_id=user_id, 
+            experiment_id=experiment_id,
+            on_token=send_delta if stream else None,
+            mode=data.get("mode")  # "fast" | "agent" | "auto"
+        )
+        total_ms = (time.perf_counter() - started) * 1000
+        # 스트리밍하지 않으면 전체 응답이 첫 토큰이므로 ttft = total
+        ttft_ms = ((first_token_at or time.perf_counter()) - started) * 1000
+        metrics.observe("chat.ttft_ms", ttft_ms)
+        metrics.observe("chat.total_ms", total_ms)
+        answer = result.get("response", "")
+        msg_type = result.get("type", "message")
+        logged = result.get("logged", False)
+        experiment_id = _normalize_experiment_id(result.get("experiment_id", experiment_id))  # 업데이트된 experiment_id
+        session["experiment_id"] = experiment_id
+        await session_manager.save_state(session_id, experiment_id=experiment_id, user_id=user_id, manual_id=manual_id)
+        print("agent_chat_answer result:", result)
+
+        # 대화 기록은 서버(conversation_memory)가 보관하므로 클라이언트는 새 메시지만 보내면 됨
+        history = await conversation_memory.recent_turns(experiment_id, limit=10)
+
+        await websocket.send_json({
+            "event": "final",
+            "session_id": session_id,
+            "message": message,
+            "answer": answer,
+            "type": msg_type,
+            "logged": logged,
+            "experiment_id": experiment_id,
+            "mode": result.get("mode"),
+            "history": history,  # 최근 10개 메시지만 반환
+            "metrics": {"ttft_ms": round(ttft_ms, 1), "total_ms": round(total_ms, 1)}
+        })
+
+    async def on_cancelled(data: dict, reason: str):
+        # superseded: 답변 생성 중 새 메시지가 와서 이전 턴을 취소함
+        await websocket.send_json({"event": "cancelled", "message": data.get("message"), "reason": reason})
+
+    async def on_error(data: dict, error: BaseException):
+        await websocket.send_json({"error": f"서버 오류: {str(error)}", "message": data.get("message")})
+
+    runner = TurnRunner(handle_turn, on_cancelled, on_error)
     try:
+        # 수신 루프는 답변 생성과 분리되어 있어, 답변 중에도 새 메시지(정정)와 연결 종료를 바로 감지함
         while True:
             data = await websocket.receive_json()
             manual_id = data.get("manual_id")
             message = data.get("message")
-            user_id = data.get("user_id", "default_user")
-            history = data.get("history", []) # 프론트에서 history도 넘기면 반영
+
+            if manual_id and manual_id != session["warmed_manual_id"]:
+                session["warmed_manual_id"] = manual_id
+                _start_warm(manual_id)
 
             if not manual_id or not message:
                 await websocket.send_json({"error": "manual_id와 message 모두 필요합니다."})
                 continue
-            
-            # experiment_id 없으면 새로 생성 (정수값으로)
-            experiment_id = data.get("experiment_id") or experiment_id or int(time.time())
-
-            # agent_chat_answer 호출 시 session_id 전달
-            result = agent_chat_answer(
-                manual_id=manual_id, 
-                sender="user",
-                message=message, 
-                user_id=user_id, 
-                experiment_id=experiment_id,
-                history=history
-            )
-            answer = result.get("response", "")
-            msg_type = result.get("type", "message")
-            logged = result.get("logged", False)
-            experiment_id = result.get("experiment_id", experiment_id) # 업데이트된 experiment_id
-            print("agent_chat_answer result:", result)
-
-            # history 저장(사용자, 어시스턴트 turn 구분)
-            history.append({"role": "user", "content": message})
-            history.append({"role": "assistant", "content": answer})
-
-            await websocket.send_json({
-                "message": message,
-                "answer": answer,
-                "type": msg_type,
-                "logged": logged,
-                "experiment_id": experiment_id,
-                "history": history[-10:]  # 최근 10턴만 반환
-            })
+
+            if not await runner.submit(data):
+                await websocket.send_json({
+                    "event": "rejected",
+                    "message": message,
+                    "error": "이전 메시지를 처리하는 중입니다. 잠시 후 다시 보내주세요."
+                })
     except WebSocketDisconnect:
-        print(f"Agent Chat WebSocket 연결 종료 (Experiment: {experiment_id})")
-        flush_all_chat_logs() # 종료될 때 Redis → DB 저장 강제 수행
+        print(f"Agent Chat WebSocket 연결 종료 (Experiment: {session['experiment_id']})")
+        await runner.close()  # 아무도 받지 않을 답변 생성을 중단
+        await connection_manager.disconnect(session_id, connection_token)
     except Exception as e:
+        await runner.close()
+        await connection_manager.disconnect(session_id, connection_token)
         await websocket.send_json({"error": f"서버 오류: {str(e)}"})
@@ -1,18 +1,32 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.schemas.chat_log import ChatLogOut
-from app.crud import chat_log_crud
-from typing import List
+from app.services.chat_log_service import chat_log_service
+from typing import List, Optional
 
 router = APIRouter(prefix="/chat", tags=["ChatLog"])
 
-# 전체 채팅 불러오기
+# 채팅 불러오기 (DB + 아직 저장되지 않은 Redis 버퍼)
+# 커서 없이 호출하면 최신 limit개, before=<가장 오래된 메시지 id>로 이전 페이지, after=<마지막 메시지 id>로 다음 페이지
 @router.get("/{experiment_id}", response_model=List[ChatLogOut])
-def get_chat_logs(experiment_id: int, db: Session = Depends(get_db)):
-    return chat_log_crud.load_chat_logs(db, experiment_id)
+def get_chat_logs(
+    experiment_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="before와 after는 함께 사용할 수 없습니다.")
+    return chat_log_service.get_chat_history(db, experiment_id, limit=limit, before=before, after=after)
 
-# 최근 10개 이어쓰기용
+# 최근 10개 이어쓰기용 (실험별 Redis tail이 있으면 DB를 읽지 않음), before로 이전 메시지 더 보기
 @router.get("/continue/{experiment_id}", response_model=List[ChatLogOut])
-def continue_chat_logs(experiment_id: int, db: Session = Depends(get_db)):
-    return chat_log_crud.continue_chat_logs(db, experiment_id)
+def continue_chat_logs(
+    experiment_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    before: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    return chat_log_service.get_recent_chat_history(db, experiment_id, limit=limit, before=before)
@@ -1,12 +1,10 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Depends
 from fastapi.responses import JSONResponse
 from app.services.manual_rag import embed_pdf_manual
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
 from app.dependencies import get_current_user
+from app.db.vector_store import get_vector_store
 
 router = APIRouter()
-CHROMA_DIR = "./chroma_db"
 
 @router.post("/manual/embed")
 async def manual_embed(file: UploadFile = File(...), current_user=Depends(get_current_user)):
@@ -29,13 +27,11 @@ async def get_manual_chunks(
     , experiment_id: str = Query(None)
 ):
     """
-    Chroma DB에 저장된 chunk(문단)와 각 chunk의 메타데이터를 조회합니다.
+    벡터DB에 저장된 chunk(문단)와 각 chunk의 메타데이터를 조회합니다.
     manual_id, manual_type, source 등으로 필터링 가능.
     """
-    embeddings = OpenAIEmbeddings()
-    vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-    collection = vectorstore._collection
-    results = collection.get()
+    # manual_id가 주어지면 해당 매뉴얼 파티션만 조회
+    results = get_vector_store().get(where={"manual_id": manual_id} if manual_id else None)
     docs = []
     for doc, meta in zip(results['documents'], results['metadatas']):
         if not doc:
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_core.documents import Document
 
 from app.db.database import get_db
+from app.db.vector_store import get_vector_store
 from app.dependencies import get_current_user
 from app.services.manual_summary import (
     summarize_experiment_chunks,
@@ -24,10 +23,6 @@ import os
 
 router = APIRouter(prefix="/manual-summary", tags=["manual-summary"])
 
-# Chroma DB 설정
-CHROMA_DIR = "./chroma_db"
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
 
 @router.get("/experiment/{experiment_id}", response_model=ExperimentSummaryResponse)
 async def summarize_single_experiment(
@@ -38,13 +33,9 @@ async def summarize_single_experiment(
     특정 experiment_id의 청크들을 요약합니다.
     """
     try:
-        # Chroma DB에서 해당 experiment_id의 청크들 조회
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-        
         # 메타데이터 필터링으로 특정 experiment_id 청크만 조회
-        collection = vectorstore._collection
-        results = collection.get(
+        vector_store = get_vector_store()
+        results = vector_store.get(
             where={"experiment_id": experiment_id}
         )
         
@@ -74,12 +65,9 @@ async def summarize_manual_experiments(
     특정 manual_id의 모든 실험들을 요약합니다.
     """
     try:
-        # Chroma DB에서 해당 manual_id의 모든 청크들 조회
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-        
-        collection = vectorstore._collection
-        results = collection.get(
+        # 벡터DB에서 해당 manual_id의 모든 청크들 조회
+        vector_store = get_vector_store()
+        results = vector_store.get(
             where={"manual_id": manual_id}
         )
         
@@ -119,11 +107,8 @@ async def get_structured_experiment_summary(
     """
     try:
         # 먼저 일반 요약 생성
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-        
-        collection = vectorstore._collection
-        results = collection.get(
+        vector_store = get_vector_store()
+        results = vector_store.get(
             where={"experiment_id": experiment_id}
         )
         
@@ -161,11 +146,8 @@ async def get_experiment_count(
     특정 매뉴얼의 실험 개수를 반환합니다. (프론트엔드 진행률 표시용)
     """
     try:
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-        
-        collection = vectorstore._collection
-        results = collection.get(
+        vector_store = get_vector_store()
+        results = vector_store.get(
             where={"manual_id": manual_id}
         )
         
@@ -199,17 +181,14 @@ async def list_available_experiments(
     사용 가능한 experiment_id 목록을 반환합니다.
     """
     try:
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-        
-        collection = vectorstore._collection
+        vector_store = get_vector_store()
         
         # 필터 조건 설정
         where_filter = {}
         if manual_id:
             where_filter["manual_id"] = manual_id
         
-        results = collection.get(where=where_filter if where_filter else None)
+        results = vector_store.get(where=where_filter if where_filter else None)
         
         # 고유한 experiment_id 추출
         experiment_ids = set()
@@ -234,11 +213,8 @@ async def export_manual_summaries_to_json(
     """
     try:
         # 매뉴얼 요약 생성
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-        
-        collection = vectorstore._collection
-        results = collection.get(
+        vector_store = get_vector_store()
+        results = vector_store.get(
             where={"manual_id": manual_id}
         )
         
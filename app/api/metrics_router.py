@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException
+from app.core import metrics
+from app.services.vector_purge_service import get_maintenance_report
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/")
+def get_metrics():
+    """
+    캐시 적중률, 단계별 지연시간 등 서비스 지표를 조회합니다.
+    """
+    try:
+        return metrics.snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"지표 조회 실패: {str(e)}")
+
+@router.get("/vector-maintenance")
+def get_vector_maintenance():
+    """
+    매뉴얼 삭제 후 벡터 정리 작업 대기열과 최근 삭제/압축 결과(회수 용량, 소요 시간)를 조회합니다.
+    """
+    try:
+        return get_maintenance_report()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"벡터 정리 현황 조회 실패: {str(e)}")
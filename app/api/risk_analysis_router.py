@@ -1,34 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from app.services.risk_analysis_service import analyze_risk_advices
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
-from pathlib import Path
+from app.db.vector_store import get_vector_store
 import json
 
 router = APIRouter()
-CHROMA_DB_PATH = "./chroma_db"
 
-def get_chroma_db():
-    db_path = Path(CHROMA_DB_PATH)
-    if not db_path.exists() or not list(db_path.glob("*")):
-        raise HTTPException(status_code=404, detail="업로드된 문서가 없습니다. PDF를 먼저 업로드해 주세요.")
-    embeddings = OpenAIEmbeddings()
-    vectorstore = Chroma(persist_directory=str(db_path.absolute()), embedding_function=embeddings)
-    if not vectorstore._collection:
-        raise HTTPException(status_code=404, detail="Chroma DB collection not found")
-    return vectorstore
-
-def get_documents_from_chroma(vectorstore):
-    from langchain_core.documents import Document
-    collection = vectorstore._collection
-    results = collection.get()
-    print("get_documents_from_chroma - 문서 개수:", len(results.get('documents', [])))
-    docs = []
-    for doc, metadata in zip(results['documents'], results['metadatas']):
-        if doc:
-            docs.append(Document(page_content=doc, metadata=metadata))
-    print("get_documents_from_chroma - 실제 반환 docs 개수:", len(docs))
+def get_documents_from_vector_store(manual_id: str):
+    # 전체 컬렉션을 읽지 않고 해당 매뉴얼 청크만 조회
+    docs = get_vector_store().get_documents(where={"manual_id": manual_id})
+    print("get_documents_from_vector_store - 실제 반환 docs 개수:", len(docs))
     return docs
 
 @router.post("/risk-analysis")
@@ -37,8 +18,7 @@ async def risk_analysis(manual_id: str):
     manual_id로 필터된 문서만 위험도 분석합니다.
     """
     try:
-        vectorstore = get_chroma_db()
-        docs = get_documents_from_chroma(vectorstore)
+        docs = get_documents_from_vector_store(manual_id)
         if not docs:
             return JSONResponse(content={"error": "분석 가능한 데이터가 없습니다. PDF를 먼저 업로드해 주세요."}, status_code=200)
         result = analyze_risk_advices(docs, manual_id)
@@ -5,6 +5,7 @@ import app.crud.user_crud as crud_user
 from app.db.database import get_db
 from app.core.security import verify_password, create_access_token, decode_access_token
 from app.dependencies import get_current_user
+from app.services import id_resolver
 from datetime import timedelta
 import logging
 import re
@@ -152,4 +153,6 @@ def update_me(user_update: UserUpdate, db: Session = Depends(get_db), current_us
 # 유저 삭제 (JWT 필요)
 @router.delete("/me", response_model=UserOut)
 def delete_me(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    return crud_user.delete_user(db, current_user)
\ No newline at end of file
+    deleted = crud_user.delete_user(db, current_user)
+    id_resolver.invalidate_user(deleted.id)  # 채팅 로그 ID 변환 캐시에서 제거
+    return deleted
\ No newline at end of file
@@ -2,34 +2,62 @@ from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.responses import JSONResponse
 from app.services.stt_service import transcribe_whisper_with_validation
 from app.services.tts_service import tts_google_to_file
-from app.services.agent_chat_service import agent_chat_answer
+from app.services.agent_chat_service import agent_chat_answer_async
 from app.db.database import get_db
-from app.db.redis_conn import get_redis_conn
+from app.services import session_manager
 from sqlalchemy.orm import Session
 
 import os
 import time
+import asyncio
 import uuid
-from typing import Optional
+from typing import Optional, Set
 from fastapi import Depends
 
 router = APIRouter(prefix="/stt/voice", tags=["Voice Chat"])
 
+# 진행 중인 백그라운드 TTS 작업 (참조를 잡아 두지 않으면 완료 전에 가비지 컬렉션될 수 있음)
+_tts_tasks: Set[asyncio.Task] = set()
+
+async def _synthesize_and_notify(session_id: str, experiment_id: int, text: str, audio_filepath: str, audio_url: str):
+    """백그라운드 TTS: 완료/실패를 채팅 세션에 이벤트로 알림"""
+    try:
+        tts_result = await asyncio.to_thread(tts_google_to_file, text=text, output_path=audio_filepath)
+        if tts_result["success"]:
+            print("생성된 오디오 URL:", audio_url)
+            await session_manager.notify(session_id, {
+                "event": "tts_ready", "experiment_id": experiment_id, "audio_url": audio_url
+            })
+            return
+        error = tts_result["error"]
+    except Exception as e:
+        print(f"백그라운드 TTS 실패 (session_id={session_id}): {e}")
+        error = str(e)
+    await session_manager.notify(session_id, {
+        "event": "tts_failed", "experiment_id": experiment_id, "error": error
+    })
+
 @router.post("/chat")
 async def voice_chat(
     audio: UploadFile = File(...),
     manual_id: str = Form(...),
     experiment_id: int = Form(...),
     user_id: str = Form(...),
+    session_id: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
+    """
+    session_id(채팅 WebSocket 세션)를 주면 TTS를 기다리지 않고 텍스트 응답을 먼저 반환하고,
+    음성이 준비되면 그 세션에 {"event": "tts_ready", "audio_url": ...} 이벤트를 보냅니다.
+    (세션이 다른 워커에 연결되어 있어도 Redis pub/sub으로 전달됨)
+    """
     try:
         audio_bytes = await audio.read()
         if len(audio_bytes) == 0:
             raise HTTPException(status_code=400, detail="음성 파일이 비어있습니다.")
 
         # 1. STT 변환
-        stt_result = transcribe_whisper_with_validation(audio_bytes)
+        stt_result = await asyncio.to_thread(transcribe_whisper_with_validation, audio_bytes)
         if not stt_result["success"]:
             return JSONResponse(status_code=400, content={"success": False, "error": stt_result["error"]})
 
@@ -38,7 +66,7 @@ async def voice_chat(
             return JSONResponse(status_code=400, content={"success": False, "error": "음성에서 텍스트를 추출할 수 없습니다."})
 
         # 2. GPT 응답 및 DB 저장은 agent_chat_answer 안에서 수행됨
-        ai_response = agent_chat_answer(
+        ai_response = await agent_chat_answer_async(
             manual_id=manual_id,
             sender="user",
             message=input_text,
@@ -64,30 +92,28 @@ async def voice_chat(
         audio_filepath = f"static/audio/{audio_filename}"
         os.makedirs("static/audio", exist_ok=True)
 
-        tts_result = tts_google_to_file(text=response_text, output_path=audio_filepath)
-        if not tts_result["success"]:
-            return JSONResponse(status_code=500, content={"success": False, "error": tts_result["error"]})
-
         audio_url = f"/static/audio/{audio_filename}"
-        print("생성된 오디오 URL:", audio_url)
-        
-        estimated_duration = len(response_text) * 0.1
+        if session_id:
+            task = asyncio.create_task(
+                _synthesize_and_notify(session_id, experiment_id, response_text, audio_filepath, audio_url)
+            )
+            _tts_tasks.add(task)
+            task.add_done_callback(_tts_tasks.discard)
+            audio_url = None
+        else:
+            tts_result = await asyncio.to_thread(tts_google_to_file, text=response_text, output_path=audio_filepath)
+            if not tts_result["success"]:
+                return JSONResponse(status_code=500, content={"success": False, "error": tts_result["error"]})
+            print("생성된 오디오 URL:", audio_url)
 
-        # 4. Redis 저장
-        redis_key = f"chat:{experiment_id}"
-        redis_entry = {
-            "user": input_text,
-            "ai": response_text,
-            "timestamp": str(timestamp)
-        }
-        redis_client = get_redis_conn()
-        redis_client.rpush(redis_key, str(redis_entry))
+        # 대화 기록(conversation_memory)과 채팅 로그 버퍼 저장은 agent_chat_answer_async에서 텍스트 채팅과 같은 경로로 수행됨
 
         return JSONResponse(status_code=200, content={
             "success": True,
             "input_text": input_text,
             "response_text": response_text,
             "audio_url": audio_url,
+            "audio_pending": audio_url is None,
             "audio_duration": estimated_duration
         })
 
@@ -2,12 +2,13 @@ from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.responses import JSONResponse
 import os
 import time
+import asyncio
 import uuid
 from typing import Optional
 
 from app.services.stt_service import transcribe_whisper_with_validation
 from app.services.tts_service import tts_google_to_file
-from app.services.agent_chat_service import agent_chat_answer
+from app.services.agent_chat_service import agent_chat_answer_async
 
 
 router = APIRouter(prefix="/web-voice", tags=["Web Voice Chat"])
@@ -53,7 +54,7 @@ async def web_voice_chat(
         
         # 2. STT: Whisper로 음성 → 텍스트 변환
         print("🗣️ STT 처리 중...")
-        stt_result = transcribe_whisper_with_validation(audio_bytes)
+        stt_result = await asyncio.to_thread(transcribe_whisper_with_validation, audio_bytes)
         
         if not stt_result["success"]:
             return JSONResponse(
@@ -87,7 +88,7 @@ async def web_voice_chat(
         # 3. AI 챗봇 응답 생성
         print("🤖 AI 응답 생성 중...")
         try:
-            ai_response = agent_chat_answer(
+            ai_response = await agent_chat_answer_async(
                 manual_id=manual_id,
                 sender="user",
                 message=input_text,
@@ -123,7 +124,8 @@ async def web_voice_chat(
         os.makedirs("static/audio", exist_ok=True)
         
         # gTTS로 음성 파일 생성
-        tts_result = tts_google_to_file(
+        tts_result = await asyncio.to_thread(
+            tts_google_to_file,
             text=response_text,
             output_path=audio_filepath,
             language="ko"
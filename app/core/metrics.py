@@ -0,0 +1,127 @@
+import os
+import time
+import atexit
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from app.db.redis_conn import get_redis_conn
+
+# 모든 워커가 같은 지표를 보도록 Redis에 카운터/측정값을 모읍니다.
+METRICS_COUNTER_KEY = "metrics:counters"
+METRICS_TIMING_KEY_PREFIX = "metrics:timings:"
+METRICS_TIMING_SAMPLES = 1000  # 측정값은 최근 N개만 보관
+# incr/observe는 프로세스 메모리에만 쌓고, 백그라운드 스레드가 이 주기(초)마다 파이프라인 한 번으로 Redis에 보냅니다.
+# 따라서 코루틴에서 호출해도 Redis 왕복으로 이벤트 루프를 막지 않습니다.
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1.0))
+
+_counters: Dict[str, int] = defaultdict(int)
+_samples: Dict[str, List[float]] = defaultdict(list)
+_buffer_lock = threading.Lock()
+_flusher: Optional[threading.Thread] = None
+
+
+def _ensure_flusher():
+    """프로세스마다 (uvicorn 워커 fork 이후) 처음 기록할 때 flush 스레드를 시작합니다."""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _buffer_lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="metrics-flusher", daemon=True)
+        _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        flush()
+
+
+def flush():
+    """쌓인 카운터/측정값을 Redis로 보냅니다. 지표 기록 실패가 요청 처리를 막지 않도록 예외는 무시합니다."""
+    with _buffer_lock:
+        if not _counters and not _samples:
+            return
+        counters, samples = dict(_counters), dict(_samples)
+        _counters.clear()
+        _samples.clear()
+    try:
+        pipe = get_redis_conn().pipeline(transaction=False)
+        for name, amount in counters.items():
+            pipe.hincrby(METRICS_COUNTER_KEY, name, amount)
+        for name, values in samples.items():
+            pipe.lpush(METRICS_TIMING_KEY_PREFIX + name, *values)
+            pipe.ltrim(METRICS_TIMING_KEY_PREFIX + name, 0, METRICS_TIMING_SAMPLES - 1)
+        pipe.execute()
+    except Exception as e:
+        print(f"지표 기록 실패 ({', '.join(list(counters) + list(samples))}): {e}")
+
+
+atexit.register(flush)
+
+
+def incr(name: str, amount: int = 1):
+    """카운터 지표를 증가시킵니다. (메모리에만 기록, Redis 전송은 flush 스레드가 담당)"""
+    with _buffer_lock:
+        _counters[name] += amount
+    _ensure_flusher()
+
+
+def observe(name: str, value: float):
+    """지연시간(ms), 배치 크기 등 측정값을 기록합니다. (메모리에만 기록, Redis 전송은 flush 스레드가 담당)"""
+    with _buffer_lock:
+        values = _samples[name]
+        values.append(round(value, 3))
+        if len(values) > METRICS_TIMING_SAMPLES:
+            del values[:-METRICS_TIMING_SAMPLES]
+    _ensure_flusher()
+
+
+class timer:
+    """
+    with 블록의 실행 시간을 ms 단위로 기록합니다.
+
+    Example:
+        with metrics.timer("answer_cache.lookup_ms"):
+            ...
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.elapsed_ms = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed_ms = (time.perf_counter() - self._start) * 1000
+        observe(self.name, self.elapsed_ms)
+        return False
+
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    count = len(samples)
+    return {
+        "count": count,
+        "avg": round(sum(samples) / count, 3),
+        "p50": samples[count // 2],
+        "p95": samples[min(count - 1, int(count * 0.95))],
+        "max": samples[-1],
+    }
+
+
+def snapshot() -> Dict:
+    """현재 카운터와 측정값 요약(count/avg/p50/p95/max)을 반환합니다."""
+    flush()  # 이 워커에 아직 쌓여 있는 값도 포함
+    redis_conn = get_redis_conn()
+    counters = {name: int(value) for name, value in redis_conn.hgetall(METRICS_COUNTER_KEY).items()}
+    timings = {}
+    for key in redis_conn.scan_iter(match=METRICS_TIMING_KEY_PREFIX + "*"):
+        samples = [float(v) for v in redis_conn.lrange(key, 0, -1)]
+        if samples:
+            timings[key[len(METRICS_TIMING_KEY_PREFIX):]] = _summarize(samples)
+    return {"counters": counters, "timings": timings}
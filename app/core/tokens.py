@@ -0,0 +1,29 @@
+from functools import lru_cache
+from typing import Optional
+
+# 프롬프트 토큰 예산 계산용 토크나이저 (gpt-4o/4.1 계열)
+TOKENIZER_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[object]:
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        # 오프라인 등으로 인코딩 파일을 받지 못하면 근사치로 계산
+        print(f"[Tokens] tiktoken 사용 불가, 근사치로 계산합니다: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    텍스트의 토큰 수. tiktoken을 쓸 수 없으면 영문/숫자 4자당 1토큰, 그 외(한글 등) 1자당 1토큰으로 근사합니다.
+    """
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
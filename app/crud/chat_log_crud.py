@@ -1,17 +1,35 @@
+from sqlalchemy import insert, and_, or_
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.models.chat_logs import ChatLog
+from app.models.chat_log_archive import ChatLogArchive
 from datetime import datetime
 
-def create_chat_log_batch(db: Session, logs: List[Dict]):
+_CHAT_LOG_COLUMNS = ("user_id", "manual_id", "experiment_id", "sender", "message")
+
+def create_chat_log_batch(db: Session, logs: List[Dict]) -> int:
     """
-    Saves a batch of chat logs to the database.
-    'logs' is a list of dictionaries, each containing chat log data.
+    Saves a batch of chat logs to the database with a single multi-row INSERT (executemany)
+    in one transaction. 'logs' is a list of dictionaries, each containing chat log data;
+    'created_at' may be an ISO string (the time the message was buffered).
+    Returns the number of inserted rows.
     """
-    log_objects = [ChatLog(**log_data, created_at=datetime.utcnow()) for log_data in logs]
-    db.add_all(log_objects)
-    db.commit()
-    return log_objects
+    if not logs:
+        return 0
+    now = datetime.utcnow()
+    rows = []
+    for log in logs:
+        row = {column: log.get(column) for column in _CHAT_LOG_COLUMNS}
+        created_at = log.get("created_at")
+        row["created_at"] = datetime.fromisoformat(created_at) if isinstance(created_at, str) else (created_at or now)
+        rows.append(row)
+    try:
+        db.execute(insert(ChatLog), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
 
 def create_chat_log(db: Session, log: Dict):
     db_log = ChatLog(**log)
@@ -19,11 +37,85 @@ def create_chat_log(db: Session, log: Dict):
     db.commit()
     return db_log
 
-def load_chat_logs(db: Session, experiment_id: int):
-    # 채팅 불러오기: 전체 내역
-    return db.query(ChatLog).filter(ChatLog.experiment_id == experiment_id).order_by(ChatLog.created_at).all()
+def _find_cursor(db: Session, experiment_id: int, log_id: int):
+    """(커서가 있는 테이블, (created_at, id)). chat_logs에 없으면 아카이브에서 찾고, 다른 실험의 id이면 (None, None)"""
+    for model in (ChatLog, ChatLogArchive):
+        cursor = db.query(model.created_at, model.id)\
+            .filter(model.id == log_id, model.experiment_id == experiment_id).first()
+        if cursor is not None:
+            return model, cursor
+    return None, None
+
+def get_chat_log_cursor(db: Session, experiment_id: int, log_id: int):
+    """커서로 받은 채팅 로그 id의 (created_at, id). 다른 실험의 id이면 None"""
+    return _find_cursor(db, experiment_id, log_id)[1]
 
-def continue_chat_logs(db: Session, experiment_id: int, limit: int = 10):
+def _page(db: Session, model, experiment_id: int, limit: int, before=None, after=None) -> List:
+    """한 테이블에서 커서 위치(created_at, id) 이전/이후의 limit개를 시간순으로"""
+    query = db.query(model).filter(model.experiment_id == experiment_id)
+    if after is not None:
+        query = query.filter(or_(model.created_at > after.created_at,
+                                 and_(model.created_at == after.created_at, model.id > after.id)))
+        return query.order_by(model.created_at, model.id).limit(limit).all()
+    if before is not None:
+        query = query.filter(or_(model.created_at < before.created_at,
+                                 and_(model.created_at == before.created_at, model.id < before.id)))
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit).all()[::-1]
+
+def load_chat_logs(db: Session, experiment_id: int, limit: int = 100,
+                   before: Optional[int] = None, after: Optional[int] = None) -> List:
+    """
+    채팅 불러오기 (keyset 페이지): (experiment_id, created_at, id) 인덱스 순서로 최대 limit개를 시간순으로 반환합니다.
+    - 커서 없음: 최신 limit개
+    - before=<채팅 로그 id>: 그 메시지 직전의 limit개 (이전 페이지)
+    - after=<채팅 로그 id>: 그 메시지 직후의 limit개 (다음 페이지)
+    커서를 찾을 수 없으면 빈 목록을 반환합니다.
+    보존 기간이 지나 chat_logs_archive로 옮겨진 로그는 chat_logs보다 오래되었으므로,
+    chat_logs만으로 페이지가 차지 않을 때 이어서 아카이브를 읽습니다. (ChatLog와 ChatLogArchive가 섞여 반환됨)
+    """
+    if after is not None:
+        model, cursor = _find_cursor(db, experiment_id, after)
+        if cursor is None:
+            return []
+        rows = []
+        if model is ChatLogArchive:
+            rows = _page(db, ChatLogArchive, experiment_id, limit, after=cursor)
+        if len(rows) < limit:
+            rows += _page(db, ChatLog, experiment_id, limit - len(rows), after=cursor)
+        return rows
+    cursor = None
+    if before is not None:
+        cursor = get_chat_log_cursor(db, experiment_id, before)
+        if cursor is None:
+            return []
+    rows = _page(db, ChatLog, experiment_id, limit, before=cursor)
+    if len(rows) < limit:
+        oldest = rows[0] if rows else cursor
+        rows = _page(db, ChatLogArchive, experiment_id, limit - len(rows), before=oldest) + rows
+    return rows
+def continue_chat_logs(db: Session, experiment_id: int, limit: int = 10, before: Optional[int] = None):
     # 채팅 이어하기: 최신 10개만
-    return db.query(ChatLog).filter(ChatLog.experiment_id == experiment_id)\
-        .order_by(ChatLog.created_at.desc()).limit(limit).all()[::-1]
\ No newline at end of file
+    return load_chat_logs(db, experiment_id, limit=limit, before=before)
+
+def archive_chat_log_batch(db: Session, cutoff: datetime, after_id: int, limit: int) -> List[Dict]:
+    """
+    created_at이 cutoff 이전인 채팅 로그를 id 순서로 최대 limit개 chat_logs_archive로 옮깁니다. (한 트랜잭션)
+    after_id보다 큰 id부터 읽으므로 반환된 마지막 id를 다음 호출에 넘기면 이어서 처리합니다.
+    Returns: 옮긴 행 (dict 목록, 없으면 빈 목록)
+    """
+    columns = ("id",) + _CHAT_LOG_COLUMNS + ("created_at",)
+    rows = db.query(*[getattr(ChatLog, column) for column in columns])\
+        .filter(ChatLog.id > after_id, ChatLog.created_at < cutoff)\
+        .order_by(ChatLog.id).limit(limit).all()
+    if not rows:
+        return []
+    records = [dict(zip(columns, row)) for row in rows]
+    try:
+        db.execute(insert(ChatLogArchive), records)
+        db.query(ChatLog).filter(ChatLog.id.in_([record["id"] for record in records]))\
+            .delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return records
@@ -0,0 +1,18 @@
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List
+from app.models.experiment_log import ExperimentLog
+
+def create_experiment_log(db: Session, user_id: str, content: str, experiment_type: str = "progress"):
+    db_log = ExperimentLog(user_id=user_id, type=experiment_type, content=content)
+    db.add(db_log)
+    db.commit()
+    return db_log
+
+def create_experiment_log_batch(db: Session, logs: Iterable[Dict]):
+    db.bulk_insert_mappings(ExperimentLog, list(logs))
+    db.commit()
+
+def get_recent_experiment_logs(db: Session, user_id: str, limit: int = 10) -> List[ExperimentLog]:
+    # 최신 limit개만 인덱스 역순으로 읽고, 시간순으로 뒤집어 반환
+    return db.query(ExperimentLog).filter(ExperimentLog.user_id == user_id)\
+        .order_by(ExperimentLog.timestamp.desc(), ExperimentLog.id.desc()).limit(limit).all()[::-1]
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from app.models.manuals import Manual
+from app.models.chat_log_archive import ChatLogArchive
 from app.schemas.manuals import ManualCreate, ManualUpdate
 from datetime import datetime
 from sqlalchemy.exc import SQLAlchemyError
@@ -58,12 +59,20 @@ def delete_manual(db: Session, manual_id: str, user_id: int):
         if manual.reports:
             for report in manual.reports:
                 db.delete(report)
+        experiment_ids = {log.experiment_id for log in manual.chat_logs or []}
+        experiment_ids.update(row.experiment_id for row in
+                              db.query(ChatLogArchive.experiment_id).filter(ChatLogArchive.manual_id == manual.id).distinct())
         if manual.chat_logs:
             for log in manual.chat_logs:
                 db.delete(log)
+        db.query(ChatLogArchive).filter(ChatLogArchive.manual_id == manual.id).delete(synchronize_session=False)
                 
         db.delete(manual)
         db.commit()
+        # 삭제한 대화가 Redis의 최근 메시지 tail로 계속 조회되지 않도록 함께 지움
+        # (chat_log_service → id_resolver → manuals_crud 순환 import를 피해 함수 안에서 import)
+        from app.services.chat_log_service import chat_log_service
+        chat_log_service.clear_tails(experiment_ids)
         return manual
         
     except SQLAlchemyError as e:
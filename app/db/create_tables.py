@@ -5,8 +5,12 @@ from app.models.manuals import Manual
 from app.models.risk_analysis import RiskAnalysis
 from app.models.reports import Report
 from app.models.chat_logs import ChatLog
+from app.models.chat_log_archive import ChatLogArchive
 # from app.models.refresh_token import RefreshToken 
 from app.models.experiment import Experiment
+from app.models.experiment_log import ExperimentLog
+from app.db.migrations import run_migrations
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 print("모든 테이블이 정상적으로 생성되었습니다!")
@@ -0,0 +1,259 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Dict, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.core import metrics
+from app.db.redis_conn import get_redis_conn
+from app.db.quantization import QuantizedMatrix, VECTOR_QUANTIZATION, QUANTIZED_DTYPES
+from app.db.vector_store import VectorStore, manual_id_of, matches_where, top_k_indices, _normalize_rows
+
+# 핫 캐시 메모리 상한 (0이면 비활성화)
+HOT_CACHE_MAX_BYTES = int(os.getenv("HOT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# 다른 워커의 변경 여부(Redis 버전)를 다시 확인하는 간격(초)과, 확인과 무관하게 다시 적재하는 최대 보관 시간(초)
+HOT_CACHE_VERSION_CHECK_INTERVAL = float(os.getenv("HOT_CACHE_VERSION_CHECK_INTERVAL", 1.0))
+HOT_CACHE_TTL = int(os.getenv("HOT_CACHE_TTL", 60 * 10))
+HOT_CACHE_VERSION_KEY_PREFIX = "hot_cache:version"
+HOT_CACHE_GLOBAL_VERSION_KEY = f"{HOT_CACHE_VERSION_KEY_PREFIX}:*"  # 매뉴얼을 특정할 수 없는 삭제용
+
+
+def _version_key(manual_id: str) -> str:
+    return f"{HOT_CACHE_VERSION_KEY_PREFIX}:{manual_id}"
+
+
+def read_version(manual_id: str) -> Optional[str]:
+    """매뉴얼 벡터의 버전 (쓰기마다 증가). Redis를 쓸 수 없으면 None"""
+    try:
+        manual_version, global_version = get_redis_conn().mget(_version_key(manual_id), HOT_CACHE_GLOBAL_VERSION_KEY)
+    except Exception as e:
+        print(f"[HotCache] 버전 조회 실패 (manual_id={manual_id}): {e}")
+        return None
+    return f"{manual_version or 0}:{global_version or 0}"
+
+
+def bump_version(manual_id: Optional[str] = None):
+    """다른 워커의 캐시도 다음 조회 때 다시 적재하도록 버전을 올립니다. (manual_id가 없으면 전체)"""
+    try:
+        get_redis_conn().incr(_version_key(manual_id) if manual_id else HOT_CACHE_GLOBAL_VERSION_KEY)
+    except Exception as e:
+        print(f"[HotCache] 버전 갱신 실패 (manual_id={manual_id}): {e}")
+
+
+class _HotManual:
+    """
+    메모리에 올린 매뉴얼 하나: 정규화된 float32 행렬(또는 양자화 행렬) + 텍스트/메타데이터
+    양자화된 경우 상위 후보의 float32 원본은 exact_rows로 백엔드에서 가져와 재점수합니다.
+    """
+
+    def __init__(self, ids: List[str], texts: List[str], metadatas: List[Dict], matrix: Optional[np.ndarray],
+                 quantized: Optional[QuantizedMatrix] = None, exact_rows: Optional[Callable] = None,
+                 version: Optional[str] = None):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.matrix = matrix
+        self.quantized = quantized
+        self.exact_rows = exact_rows
+        self.version = version
+        self.loaded_at = self.checked_at = time.monotonic()
+        # 텍스트 크기는 대략 UTF-8 3바이트/문자로 계산
+        vector_bytes = quantized.nbytes if quantized is not None else matrix.nbytes
+        self.nbytes = vector_bytes + sum(len(t) * 3 for t in texts)
+
+    def search(self, query: np.ndarray, k: int, where: Optional[Dict]) -> List[Tuple[Document, float]]:
+        mask = None
+        if where and set(where) != {"manual_id"}:
+            mask = np.fromiter((matches_where(m, where) for m in self.metadatas), dtype=bool, count=len(self.ids))
+        if self.quantized is not None:
+            indices, scores = self.quantized.search(query, k, mask=mask, exact_rows=self.exact_rows)
+        else:
+            scores = self.matrix @ query
+            if mask is not None:
+                scores = np.where(mask, scores, -np.inf)
+            indices = top_k_indices(scores, k)
+            indices = indices[np.isfinite(scores[indices])]
+            scores = scores[indices]
+        return [
+            (Document(page_content=self.texts[idx], metadata=self.metadatas[idx]), float(score))
+            for idx, score in zip(indices, scores)
+        ]
+
+
+class HotManualCache:
+    """
+    자주 쓰이는 매뉴얼의 임베딩을 통째로 메모리에 올려 두는 LRU 캐시.
+    매뉴얼당 청크가 수백~수천 개 수준이라 ANN 왕복보다 행렬-벡터 곱 한 번의 정확 검색이 더 빠릅니다.
+    캐시는 워커마다 따로 있으므로, 적중 시 Redis의 매뉴얼 버전(HOT_CACHE_VERSION_CHECK_INTERVAL마다)과
+    보관 시간(HOT_CACHE_TTL)을 확인해 다른 워커에서 바뀐 매뉴얼은 다시 적재합니다.
+    """
+
+    def __init__(self, backend: VectorStore, max_bytes: int = HOT_CACHE_MAX_BYTES,
+                 quantization: str = VECTOR_QUANTIZATION):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.quantization = quantization if quantization in QUANTIZED_DTYPES else None
+        self._entries: "OrderedDict[str, _HotManual]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def _load(self, manual_id: str) -> Optional[_HotManual]:
+        start = time.perf_counter()
+        # 적재 중에 들어온 쓰기는 버전을 올리므로, 버전을 먼저 읽어야 다음 확인에서 놓치지 않습니다.
+        version = read_version(manual_id)
+        results = self.backend.get(where={"manual_id": manual_id}, include_embeddings=True)
+        if not results["ids"]:
+            return None
+        matrix = np.ascontiguousarray(_normalize_rows(np.asarray(results["embeddings"], dtype=np.float32)))
+        if self.quantization:
+            ids = results["ids"]
+
+            def exact_rows(indices):
+                return self.backend.get_vectors([ids[i] for i in indices], manual_id=manual_id)
+
+            quantized = QuantizedMatrix.from_float32(matrix, self.quantization)
+            entry = _HotManual(ids, results["documents"], results["metadatas"], None, quantized, exact_rows, version)
+        else:
+            entry = _HotManual(results["ids"], results["documents"], results["metadatas"], matrix, version=version)
+        metrics.observe("hot_cache.load_ms", (time.perf_counter() - start) * 1000)
+        print(f"[HotCache] 매뉴얼 적재: manual_id={manual_id}, 청크 {len(entry.ids)}개, {entry.nbytes / 1024 / 1024:.1f}MB")
+        return entry
+
+    def _is_current(self, manual_id: str, entry: _HotManual) -> bool:
+        now = time.monotonic()
+        if now - entry.loaded_at > HOT_CACHE_TTL:
+            return False
+        if now - entry.checked_at < HOT_CACHE_VERSION_CHECK_INTERVAL:
+            return True
+        version = read_version(manual_id)
+        if version is None:
+            return True  # Redis 장애 중에는 보관 시간만 적용
+        entry.checked_at = now
+        return version == entry.version
+
+    def _drop(self, manual_id: str, entry: _HotManual):
+        with self._lock:
+            if self._entries.get(manual_id) is entry:
+                self._bytes -= self._entries.pop(manual_id).nbytes
+
+    def get(self, manual_id: str) -> Optional[_HotManual]:
+        with self._lock:
+            entry = self._entries.get(manual_id)
+        if entry is not None:
+            if self._is_current(manual_id, entry):
+                with self._lock:
+                    if manual_id in self._entries:
+                        self._entries.move_to_end(manual_id)
+                metrics.incr("hot_cache.hit")
+                return entry
+            self._drop(manual_id, entry)
+            metrics.incr("hot_cache.stale")
+        with self._lock:
+            loading = self._loading.setdefault(manual_id, threading.Lock())
+
+        # 같은 매뉴얼을 여러 요청이 동시에 적재하지 않도록 매뉴얼 단위로 잠급니다.
+        with loading:
+            with self._lock:
+                entry = self._entries.get(manual_id)
+            if entry is not None:
+                return entry
+            metrics.incr("hot_cache.miss")
+            try:
+                entry = self._load(manual_id)
+            finally:
+                with self._lock:
+                    self._loading.pop(manual_id, None)
+            if entry is None:
+                return None
+            with self._lock:
+                if entry.nbytes > self.max_bytes:
+                    return entry  # 상한보다 큰 매뉴얼은 이번 요청에만 사용
+                previous = self._entries.pop(manual_id, None)
+                if previous is not None:
+                    self._bytes -= previous.nbytes
+                self._entries[manual_id] = entry
+                self._bytes += entry.nbytes
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+                    metrics.incr("hot_cache.evicted")
+            return entry
+
+    def invalidate(self, manual_id: Optional[str] = None):
+        """이 워커의 캐시만 비웁니다. manual_id를 주지 않으면 전체를 비웁니다. (다른 워커는 bump_version)"""
+        with self._lock:
+            if manual_id is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(manual_id, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+
+    def invalidate_ids(self, ids: List[str]):
+        """삭제된 청크 ID를 포함한 매뉴얼만 비웁니다."""
+        targets = set(ids)
+        with self._lock:
+            for manual_id in [m for m, entry in self._entries.items() if targets.intersection(entry.ids)]:
+                self._bytes -= self._entries.pop(manual_id).nbytes
+
+
+class CachedVectorStore(VectorStore):
+    """
+    벡터 저장소 앞단의 핫 캐시 계층.
+    manual_id 필터가 있는 검색은 메모리 행렬에서 처리하고, 나머지는 원래 백엔드로 넘깁니다.
+    """
+
+    def __init__(self, backend: VectorStore, cache: Optional[HotManualCache] = None):
+        super().__init__(backend.embedding_function)
+        self.backend = backend
+        self.cache = cache or HotManualCache(backend)
+
+    def warm(self, manual_id: str):
+        self.cache.get(manual_id)
+
+    def add_documents(self, docs, ids=None, embeddings=None):
+        ids = self.backend.add_documents(docs, ids=ids, embeddings=embeddings)
+        for manual_id in {d.metadata.get("manual_id") for d in docs}:
+            bump_version(manual_id)
+            self.cache.invalidate(manual_id)
+        return ids
+
+    def delete(self, ids):
+        self.backend.delete(ids)
+        # ID만으로는 어느 매뉴얼인지 알 수 없어 다른 워커는 전체 버전으로 무효화합니다.
+        bump_version()
+        self.cache.invalidate_ids(ids)
+
+    def delete_manual(self, manual_id):
+        deleted = self.backend.delete_manual(manual_id)
+        bump_version(manual_id)
+        self.cache.invalidate(manual_id)
+        return deleted
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None):
+        manual_id = manual_id_of(filter)
+        entry = self.cache.get(manual_id) if manual_id else None
+        if entry is None:
+            return self.backend.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+        query = _normalize_rows(np.asarray([embedding], dtype=np.float32))[0]
+        return entry.search(query, k, filter)
+
+    def get(self, where=None, include_embeddings=False):
+        return self.backend.get(where=where, include_embeddings=include_embeddings)
+
+    def get_vectors(self, ids, manual_id=None):
+        return self.backend.get_vectors(ids, manual_id=manual_id)
+
+    def count(self, where=None):
+        return self.backend.count(where=where)
+
+    def disk_usage(self):
+        return self.backend.disk_usage()
+
+    def compact(self):
+        self.backend.compact()
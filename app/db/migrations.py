@@ -0,0 +1,52 @@
+"""
+기존 DB에 스키마 변경을 적용합니다. (create_all은 없는 테이블만 만들고, 있는 테이블의 인덱스는 추가하지 않음)
+
+각 마이그레이션은 현재 스키마를 확인한 뒤 필요한 경우에만 실행되므로 여러 번 실행해도 안전합니다.
+앱 시작 시 create_tables에서 실행되며, 수동 실행: python -m app.db.migrations
+"""
+from typing import Callable, List
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app.db.database import engine as default_engine
+from app.models.chat_logs import ChatLog
+
+
+def _add_missing_indexes(bind: Engine, table) -> List[str]:
+    """모델에 정의되어 있지만 DB 테이블에 없는 인덱스를 만듭니다."""
+    inspector = inspect(bind)
+    if not inspector.has_table(table.name):
+        return []
+    existing = {index["name"] for index in inspector.get_indexes(table.name)}
+    created = []
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(bind=bind)
+            created.append(index.name)
+    return created
+
+
+def add_chat_log_experiment_index(bind: Engine) -> List[str]:
+    """chat_logs (experiment_id, created_at, id): 실험별 대화 조회와 keyset 페이지 이동용"""
+    return _add_missing_indexes(bind, ChatLog.__table__)
+
+
+MIGRATIONS: List[Callable[[Engine], List[str]]] = [
+    add_chat_log_experiment_index,
+]
+
+
+def run_migrations(bind: Engine = default_engine):
+    for migration in MIGRATIONS:
+        try:
+            created = migration(bind)
+        except Exception as e:
+            print(f"[Migration] {migration.__name__} 실패: {e}")
+            continue
+        if created:
+            print(f"[Migration] {migration.__name__}: {', '.join(created)} 생성")
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -0,0 +1,106 @@
+import os
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+# none: float32 그대로 / float16: 절반 크기 / int8: 1/4 크기 (행별 scale 포함)
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+# 양자화 점수로 (k × 배수)개 후보를 고른 뒤 float32로 다시 계산
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", 4))
+
+_BLOCK_ROWS = 2048  # 역양자화 시 한 번에 float32로 펼치는 행 수 (임시 메모리 상한)
+
+QUANTIZED_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """점수 내림차순 상위 k개의 인덱스 (argpartition 후 k개만 정렬)"""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def quantize(matrix: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    정규화된 float32 행렬을 양자화합니다.
+
+    Returns:
+        (양자화된 행렬, 행별 scale) - float16은 scale이 필요 없으므로 None
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if mode == "float16":
+        return matrix.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return data, scales.astype(np.float32)
+    raise ValueError(f"지원하지 않는 양자화 방식: {mode}")
+
+
+def dequantize(data: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    rows = np.asarray(data, dtype=np.float32)
+    if scales is not None:
+        rows = rows * np.asarray(scales)[..., None]
+    return rows
+
+
+class QuantizedMatrix:
+    """
+    양자화된 임베딩 행렬. 전체 스캔은 블록 단위로 float32로 펼쳐 계산하고,
+    상위 후보만 원본 float32 벡터로 다시 점수를 매깁니다.
+    """
+
+    def __init__(self, data: np.ndarray, scales: Optional[np.ndarray]):
+        self.data = data
+        self.scales = scales
+
+    @classmethod
+    def from_float32(cls, matrix: np.ndarray, mode: str) -> "QuantizedMatrix":
+        return cls(*quantize(matrix, mode))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def rows(self, indices) -> np.ndarray:
+        return dequantize(self.data[indices], self.scales[indices] if self.scales is not None else None)
+
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(self.data), dtype=np.float32)
+        for start in range(0, len(self.data), _BLOCK_ROWS):
+            end = start + _BLOCK_ROWS
+            block = np.asarray(self.data[start:end], dtype=np.float32) @ query
+            if self.scales is not None:
+                block *= self.scales[start:end]
+            scores[start:end] = block
+        return scores
+
+    def search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None,
+               exact_rows: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+               rescore_factor: int = VECTOR_RESCORE_FACTOR) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            query: 정규화된 float32 질의 벡터
+            mask: False인 행은 제외
+            exact_rows: 후보 인덱스 → float32 원본 행. 없으면 역양자화 값으로 재계산합니다.
+
+        Returns:
+            (상위 k개 인덱스, 점수) - 점수 내림차순
+        """
+        scores = self.approximate_scores(query)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        candidates = top_k_indices(scores, k * max(rescore_factor, 1))
+        # memmap에서 읽을 때 순차 접근이 되도록 인덱스를 정렬
+        candidates = np.sort(candidates[np.isfinite(scores[candidates])])
+        if len(candidates) == 0:
+            return candidates, scores[candidates]
+        rows = exact_rows(candidates) if exact_rows is not None else self.rows(candidates)
+        exact = np.asarray(rows, dtype=np.float32) @ query
+        best = top_k_indices(exact, k)
+        return candidates[best], exact[best]
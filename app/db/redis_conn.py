@@ -1,4 +1,5 @@
 import redis
+import redis.asyncio
 import os
 from dotenv import load_dotenv
 
@@ -27,3 +28,21 @@ def get_redis_conn():
     Redis 연결 객체 반환
     """
     return redis.Redis(connection_pool=redis_pool)
+
+
+# 이벤트 루프에서 사용하는 비동기 연결 풀 (WebSocket/async 엔드포인트용)
+async_redis_pool = redis.asyncio.ConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    password=REDIS_PASSWORD,
+    decode_responses=True,
+    socket_timeout=5,
+    socket_connect_timeout=3
+)
+
+def get_async_redis_conn():
+    """
+    비동기 Redis 연결 객체 반환 (await로 사용)
+    """
+    return redis.asyncio.Redis(connection_pool=async_redis_pool)
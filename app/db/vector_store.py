@@ -0,0 +1,542 @@
+import os
+import json
+import glob
+import uuid
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple, Any
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_community.vectorstores import Chroma
+from langchain_community.embeddings import OpenAIEmbeddings
+
+from app.db.quantization import QuantizedMatrix, VECTOR_QUANTIZATION, QUANTIZED_DTYPES, quantize, top_k_indices
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+CHROMA_DIR = "./chroma_db"
+NUMPY_STORE_DIR = os.getenv("NUMPY_STORE_DIR", "./vector_store")
+# chroma: 기존 Chroma DB / numpy: 프로세스 내 NumPy 엔진 (매뉴얼별 float32 행렬 + memmap)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+# 양자화 모드에서도 재점수용 float32 원본을 디스크에 유지할지 여부
+VECTOR_KEEP_FLOAT32 = os.getenv("VECTOR_KEEP_FLOAT32", "true").lower() == "true"
+# 압축 시 이보다 오래된 임시 파일만 중단된 쓰기의 잔여물로 보고 지웁니다. (진행 중인 쓰기의 파일은 남김)
+NUMPY_STORE_TMP_MAX_AGE = int(os.getenv("NUMPY_STORE_TMP_MAX_AGE", 60 * 60))
+# 프로세스에 열어 두는 매뉴얼 세그먼트 수 (LRU)
+NUMPY_STORE_SEGMENT_CACHE_SIZE = int(os.getenv("NUMPY_STORE_SEGMENT_CACHE_SIZE", 64))
+
+_DEFAULT_MANUAL = "_default"
+
+
+def matches_where(metadata: Dict, where: Optional[Dict]) -> bool:
+    """
+    Chroma where 문법의 부분집합으로 메타데이터를 검사합니다.
+    지원: {"key": value}, {"key": {"$eq"|"$ne"|"$in": ...}}, {"$and": [...]}, {"$or": [...]}
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def manual_id_of(where: Optional[Dict]) -> Optional[str]:
+    """필터에서 manual_id 동등 조건을 찾아 반환합니다. (매뉴얼 단위 파티션 선택용)"""
+    if not where:
+        return None
+    if "manual_id" in where:
+        condition = where["manual_id"]
+        if isinstance(condition, dict):
+            return condition.get("$eq")
+        return condition
+    for sub in where.get("$and", []):
+        found = manual_id_of(sub)
+        if found:
+            return found
+    return None
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+class VectorStore(ABC):
+    """
+    서비스 코드가 사용하는 벡터 저장소 인터페이스.
+    검색 점수는 모든 백엔드에서 코사인 유사도(클수록 유사)로 통일합니다.
+    """
+
+    def __init__(self, embedding_function):
+        self.embedding_function = embedding_function
+
+    @abstractmethod
+    def add_documents(self, docs: List[Document], ids: Optional[List[str]] = None,
+                      embeddings: Optional[List[List[float]]] = None) -> List[str]:
+        """청크를 추가합니다. embeddings를 주지 않으면 embedding_function으로 계산합니다."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """ID 목록으로 청크를 삭제합니다."""
+
+    @abstractmethod
+    def delete_manual(self, manual_id: str) -> int:
+        """manual_id의 모든 청크를 삭제하고 삭제한 개수를 반환합니다."""
+
+    @abstractmethod
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict] = None) -> List[Tuple[Document, float]]:
+        """질의 벡터와 코사인 유사도가 높은 상위 k개 청크를 반환합니다."""
+
+    @abstractmethod
+    def get(self, where: Optional[Dict] = None, include_embeddings: bool = False) -> Dict[str, List[Any]]:
+        """메타데이터 조건에 맞는 청크를 {"ids", "documents", "metadatas"[, "embeddings"]} 형태로 반환합니다."""
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     filter: Optional[Dict] = None) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def get_documents(self, where: Optional[Dict] = None) -> List[Document]:
+        results = self.get(where=where)
+        return [Document(page_content=text, metadata=meta or {})
+                for text, meta in zip(results["documents"], results["metadatas"]) if text]
+
+    def count(self, where: Optional[Dict] = None) -> int:
+        return len(self.get(where=where)["ids"])
+
+    def get_vectors(self, ids: List[str], manual_id: Optional[str] = None) -> np.ndarray:
+        """ID 순서대로 정규화된 float32 임베딩을 반환합니다. (양자화 검색의 재점수용)"""
+        results = self.get(where={"manual_id": manual_id} if manual_id else None, include_embeddings=True)
+        positions = {chunk_id: idx for idx, chunk_id in enumerate(results["ids"])}
+        rows = np.asarray([results["embeddings"][positions[chunk_id]] for chunk_id in ids], dtype=np.float32)
+        return _normalize_rows(rows)
+
+    def disk_usage(self) -> int:
+        """저장소가 차지하는 디스크 용량(bytes)"""
+        return 0
+
+    def compact(self):
+        """삭제 후 남은 디스크 공간을 정리합니다. 백엔드별로 재정의합니다."""
+
+
+class ChromaVectorStore(VectorStore):
+    """기존 langchain Chroma DB 어댑터. Chroma 내부 객체(_collection) 접근은 이 클래스 안으로 한정합니다."""
+
+    def __init__(self, embedding_function, persist_directory: str = CHROMA_DIR):
+        super().__init__(embedding_function)
+        self.persist_directory = persist_directory
+        self._chroma = Chroma(persist_directory=persist_directory, embedding_function=embedding_function)
+
+    @staticmethod
+    def _to_chroma_where(where: Optional[Dict]) -> Optional[Dict]:
+        # Chroma는 최상위에 조건이 2개 이상이면 $and로 묶어야 합니다.
+        if not where or len(where) <= 1:
+            return where or None
+        return {"$and": [{key: value} for key, value in where.items()]}
+
+    def add_documents(self, docs, ids=None, embeddings=None):
+        if embeddings is None:
+            embeddings = self.embedding_function.embed_documents([d.page_content for d in docs])
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in docs]
+        # 단위 벡터로 저장해야 거리 → 코사인 유사도 변환이 정확합니다. (OpenAI 임베딩은 이미 정규화되어 있음)
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        self._chroma._collection.upsert(
+            ids=ids,
+            embeddings=vectors.tolist(),
+            documents=[d.page_content for d in docs],
+            metadatas=[{k: v for k, v in d.metadata.items() if v is not None} for d in docs],
+        )
+        return ids
+
+    def delete(self, ids):
+        if ids:
+            self._chroma._collection.delete(ids=ids)
+
+    def delete_manual(self, manual_id):
+        ids = self.get(where={"manual_id": manual_id})["ids"]
+        self.delete(ids)
+        return len(ids)
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None):
+        query = _normalize_rows(np.asarray([embedding], dtype=np.float32))
+        results = self._chroma._collection.query(
+            query_embeddings=query.tolist(),
+            n_results=k,
+            where=self._to_chroma_where(filter),
+            include=["documents", "metadatas", "distances"],
+        )
+        # Chroma 기본 거리(제곱 L2)를 단위 벡터 기준 코사인 유사도로 변환
+        return [
+            (Document(page_content=text, metadata=meta or {}), 1.0 - distance / 2.0)
+            for text, meta, distance in zip(results["documents"][0], results["metadatas"][0], results["distances"][0])
+        ]
+
+    def get(self, where=None, include_embeddings=False):
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        results = self._chroma.get(where=self._to_chroma_where(where), include=include)
+        output = {"ids": results["ids"], "documents": results["documents"], "metadatas": results["metadatas"]}
+        if include_embeddings:
+            output["embeddings"] = results["embeddings"]
+        return output
+
+    def get_vectors(self, ids, manual_id=None):
+        results = self._chroma._collection.get(ids=list(ids), include=["embeddings"])
+        positions = {chunk_id: idx for idx, chunk_id in enumerate(results["ids"])}
+        return np.asarray([results["embeddings"][positions[chunk_id]] for chunk_id in ids], dtype=np.float32)
+
+    def count(self, where=None):
+        if not where:
+            return self._chroma._collection.count()
+        return len(self._chroma.get(where=self._to_chroma_where(where), include=[])["ids"])
+
+    def disk_usage(self):
+        return dir_size(self.persist_directory)
+
+    def compact(self):
+        # Chroma는 삭제된 레코드의 SQLite 페이지를 반환하지 않으므로 VACUUM으로 파일을 줄입니다.
+        # (HNSW 인덱스의 삭제 슬롯은 이후 추가되는 벡터가 재사용합니다)
+        sqlite_path = os.path.join(self.persist_directory, "chroma.sqlite3")
+        if not os.path.exists(sqlite_path):
+            return
+        conn = sqlite3.connect(sqlite_path, timeout=30)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+
+class _ManualSegment:
+    """
+    매뉴얼 하나의 청크 묶음: 연속된 float32 행렬(memmap) 및/또는 양자화 행렬 + 텍스트/메타데이터
+    양자화 모드에서는 양자화 행렬로 전체를 훑고, 상위 후보만 float32 행렬에서 읽어 정확한 점수를 계산합니다.
+    """
+
+    def __init__(self, ids: List[str], texts: List[str], metadatas: List[Dict],
+                 matrix: Optional[np.ndarray], quantized: Optional[QuantizedMatrix] = None):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.matrix = matrix
+        self.quantized = quantized
+        self.signature: Optional[Tuple[int, int, int]] = None  # 읽은 메타 파일의 (inode, mtime_ns, size)
+        self._positions: Optional[Dict[str, int]] = None
+
+    def positions(self, ids: List[str]) -> List[int]:
+        if self._positions is None:
+            self._positions = {chunk_id: idx for idx, chunk_id in enumerate(self.ids)}
+        return [self._positions[chunk_id] for chunk_id in ids]
+
+    def rows(self, indices) -> np.ndarray:
+        if self.matrix is not None:
+            return np.asarray(self.matrix[indices], dtype=np.float32)
+        return self.quantized.rows(indices)
+
+    def full_matrix(self) -> np.ndarray:
+        return self.rows(slice(None))
+
+    def search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if self.quantized is not None:
+            exact_rows = (lambda idx: self.matrix[idx]) if self.matrix is not None else None
+            return self.quantized.search(query, k, mask=mask, exact_rows=exact_rows)
+        scores = self.matrix @ query
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        best = top_k_indices(scores, k)
+        best = best[np.isfinite(scores[best])]
+        return best, scores[best]
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    프로세스 내 NumPy 벡터 엔진.
+    매뉴얼마다 정규화된 임베딩을 {manual_id}.f32 파일(memmap)에 연속 행렬로 저장하고,
+    필터된 top-k는 행렬-벡터 곱 한 번과 argpartition으로 정확하게 계산합니다.
+
+    quantization이 float16/int8이면 {manual_id}.q(와 int8의 행별 {manual_id}.scale)도 저장하여
+    검색 시 메모리에 올라오는 양을 1/2~1/4로 줄입니다. keep_float32=False이면 .f32 파일을 쓰지 않아
+    디스크도 줄어들지만, 이때 재점수는 역양자화 값으로 계산됩니다.
+    """
+
+    def __init__(self, embedding_function, directory: str = NUMPY_STORE_DIR,
+                 quantization: str = VECTOR_QUANTIZATION, keep_float32: bool = VECTOR_KEEP_FLOAT32):
+        super().__init__(embedding_function)
+        self.directory = directory
+        self.quantization = quantization if quantization in QUANTIZED_DTYPES else None
+        self.keep_float32 = keep_float32 or self.quantization is None
+        os.makedirs(directory, exist_ok=True)
+        # 다른 워커가 파일을 바꿨을 수 있으므로 사용할 때마다 메타 파일의 서명과 비교합니다. (_load)
+        self._segments: "OrderedDict[str, _ManualSegment]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _paths(self, manual_id: str) -> Dict[str, str]:
+        base = os.path.join(self.directory, manual_id)
+        return {"f32": base + ".f32", "q": base + ".q", "scale": base + ".scale", "meta": base + ".json"}
+
+    def _manual_ids(self) -> List[str]:
+        return [os.path.basename(path)[:-len(".json")] for path in glob.glob(os.path.join(self.directory, "*.json"))]
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int, int]]:
+        """_write는 메타 파일을 마지막에 os.replace하므로, 메타 파일이 바뀌었으면 매뉴얼 전체가 바뀐 것입니다."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self, manual_id: str) -> Optional[_ManualSegment]:
+        with self._lock:
+            paths = self._paths(manual_id)
+            signature = self._signature(paths["meta"])
+            segment = self._segments.get(manual_id)
+            if segment is not None and segment.signature == signature:
+                self._segments.move_to_end(manual_id)
+                return segment
+            self._segments.pop(manual_id, None)
+            if signature is None:
+                return None
+            try:
+                with open(paths["meta"], "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                return None  # 확인한 직후 다른 워커가 매뉴얼을 지움
+            rows, dim = len(meta["ids"]), meta["dim"]
+            stored_mode = meta.get("quantization")
+
+            matrix = None
+            if os.path.exists(paths["f32"]):
+                matrix = np.memmap(paths["f32"], dtype=np.float32, mode="r", shape=(rows, dim))
+            quantized = None
+            if stored_mode in QUANTIZED_DTYPES and os.path.exists(paths["q"]):
+                data = np.memmap(paths["q"], dtype=QUANTIZED_DTYPES[stored_mode], mode="r", shape=(rows, dim))
+                scales = np.fromfile(paths["scale"], dtype=np.float32) if stored_mode == "int8" else None
+                quantized = QuantizedMatrix(data, scales)
+
+            segment = _ManualSegment(meta["ids"], meta["texts"], meta["metadatas"], matrix, quantized)
+            if stored_mode != self.quantization and (matrix is not None or quantized is not None):
+                # 설정이 바뀐 뒤 처음 읽는 매뉴얼은 현재 양자화 방식으로 다시 저장
+                self._write(manual_id, segment.ids, segment.texts, segment.metadatas, segment.full_matrix())
+                return self._load(manual_id)
+            segment.signature = signature
+            self._segments[manual_id] = segment
+            while len(self._segments) > NUMPY_STORE_SEGMENT_CACHE_SIZE:
+                self._segments.popitem(last=False)
+            return segment
+
+    def _write(self, manual_id: str, ids, texts, metadatas, matrix: np.ndarray):
+        paths = self._paths(manual_id)
+        with self._lock:
+            self._segments.pop(manual_id, None)
+            if not ids:
+                # 메타데이터를 먼저 지워 다른 워커가 행렬 없는 매뉴얼을 읽지 않도록 합니다.
+                for path in (paths["meta"], paths["f32"], paths["q"], paths["scale"]):
+                    if os.path.exists(path):
+                        os.remove(path)
+                return
+            # 새 파일을 모두 임시 파일에 쓴 뒤 교체합니다. 기존 파일은 교체 전까지 그대로 남아 있으므로
+            # 다른 워커가 행렬 파일이 없는 순간을 보지 않고, 도중에 죽어도 기존 벡터는 잃지 않습니다.
+            # 임시 파일 이름은 쓰기마다 달라서 다른 워커의 동시 쓰기와 겹치지 않습니다.
+            suffix = f".{uuid.uuid4().hex}.tmp"
+            matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+            written = []
+            try:
+                if self.keep_float32:
+                    written.append(paths["f32"])
+                    matrix.tofile(paths["f32"] + suffix)
+                if self.quantization:
+                    data, scales = quantize(matrix, self.quantization)
+                    written.append(paths["q"])
+                    data.tofile(paths["q"] + suffix)
+                    if scales is not None:
+                        written.append(paths["scale"])
+                        scales.tofile(paths["scale"] + suffix)
+                with open(paths["meta"] + suffix, "w", encoding="utf-8") as f:
+                    json.dump({"dim": int(matrix.shape[1]), "quantization": self.quantization,
+                               "ids": ids, "texts": texts, "metadatas": metadatas}, f, ensure_ascii=False)
+            except Exception:
+                for path in written + [paths["meta"]]:
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                raise
+            for path in written + [paths["meta"]]:
+                os.replace(path + suffix, path)
+            # 교체가 끝난 뒤, 현재 설정에서 더 이상 쓰지 않는 형식의 파일만 지웁니다.
+            for path in (paths["f32"], paths["q"], paths["scale"]):
+                if path not in written and os.path.exists(path):
+                    os.remove(path)
+
+    def add_documents(self, docs, ids=None, embeddings=None):
+        if embeddings is None:
+            embeddings = self.embedding_function.embed_documents([d.page_content for d in docs])
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in docs]
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+
+        grouped: Dict[str, List[int]] = {}
+        for row, doc in enumerate(docs):
+            grouped.setdefault(doc.metadata.get("manual_id") or _DEFAULT_MANUAL, []).append(row)
+
+        with self._lock:
+            for manual_id, rows in grouped.items():
+                segment = self._load(manual_id)
+                new_ids = [ids[r] for r in rows]
+                new_texts = [docs[r].page_content for r in rows]
+                new_metas = [docs[r].metadata for r in rows]
+                if segment is not None:
+                    matrix = np.vstack([segment.full_matrix(), vectors[rows]])
+                    self._write(manual_id, segment.ids + new_ids, segment.texts + new_texts,
+                                segment.metadatas + new_metas, matrix)
+                else:
+                    self._write(manual_id, new_ids, new_texts, new_metas, vectors[rows])
+        return ids
+
+    def delete(self, ids):
+        targets = set(ids)
+        with self._lock:
+            for manual_id in self._manual_ids():
+                segment = self._load(manual_id)
+                if segment is None:
+                    continue  # 목록을 만든 뒤 delete_manual 등으로 지워진 매뉴얼
+                keep = [i for i, chunk_id in enumerate(segment.ids) if chunk_id not in targets]
+                if len(keep) == len(segment.ids):
+                    continue
+                self._write(manual_id, [segment.ids[i] for i in keep], [segment.texts[i] for i in keep],
+                            [segment.metadatas[i] for i in keep], segment.rows(keep))
+
+    def delete_manual(self, manual_id):
+        with self._lock:
+            segment = self._load(manual_id)
+            if segment is None:
+                return 0
+            self._write(manual_id, [], [], [], np.zeros((0, 0), np.float32))
+            return len(segment.ids)
+
+    def disk_usage(self):
+        return dir_size(self.directory)
+
+    def compact(self):
+        # 삭제 시 파일을 다시 쓰므로 행렬 자체는 항상 밀집 상태입니다. 중단된 쓰기의 임시 파일만 정리합니다.
+        # 다른 워커가 지금 쓰고 있는 임시 파일은 지우지 않도록 NUMPY_STORE_TMP_MAX_AGE보다 오래된 것만 지웁니다.
+        cutoff = time.time() - NUMPY_STORE_TMP_MAX_AGE
+        with self._lock:
+            for path in glob.glob(os.path.join(self.directory, "*.tmp")):
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass  # 그 사이 쓰기가 끝나 교체된 파일
+
+    def _segments_for(self, where: Optional[Dict]) -> List[_ManualSegment]:
+        manual_id = manual_id_of(where)
+        manual_ids = [manual_id] if manual_id else self._manual_ids()
+        return [segment for segment in (self._load(m) for m in manual_ids) if segment is not None]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None):
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= (np.linalg.norm(query) or 1.0)
+        candidates: List[Tuple[float, _ManualSegment, int]] = []
+        for segment in self._segments_for(filter):
+            if not segment.ids:
+                continue
+            mask = None
+            if filter and set(filter) != {"manual_id"}:
+                mask = np.fromiter((matches_where(m, filter) for m in segment.metadatas), dtype=bool, count=len(segment.ids))
+            indices, scores = segment.search(query, k, mask)
+            candidates.extend((float(score), segment, int(idx)) for idx, score in zip(indices, scores))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        return [
+            (Document(page_content=segment.texts[idx], metadata=segment.metadatas[idx]), score)
+            for score, segment, idx in candidates[:k]
+        ]
+
+    def get_vectors(self, ids, manual_id=None):
+        if manual_id is None:
+            return super().get_vectors(ids)
+        segment = self._load(manual_id)
+        return segment.rows(segment.positions(ids))
+
+    def get(self, where=None, include_embeddings=False):
+        output = {"ids": [], "documents": [], "metadatas": []}
+        if include_embeddings:
+            output["embeddings"] = []
+        for segment in self._segments_for(where):
+            for idx, meta in enumerate(segment.metadatas):
+                if not matches_where(meta, where):
+                    continue
+                output["ids"].append(segment.ids[idx])
+                output["documents"].append(segment.texts[idx])
+                output["metadatas"].append(meta)
+                if include_embeddings:
+                    output["embeddings"].append(segment.rows(idx))
+        return output
+
+
+_embeddings: Optional[OpenAIEmbeddings] = None
+_vector_store: Optional[VectorStore] = None
+_init_lock = threading.Lock()
+
+
+def get_embeddings() -> OpenAIEmbeddings:
+    """프로세스 전역 임베딩 클라이언트"""
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+    return _embeddings
+
+
+def get_vector_store() -> VectorStore:
+    """VECTOR_BACKEND 설정에 따른 벡터 저장소 싱글턴을 반환합니다."""
+    global _vector_store
+    if _vector_store is None:
+        with _init_lock:
+            if _vector_store is None:
+                if VECTOR_BACKEND == "numpy":
+                    backend = NumpyVectorStore(get_embeddings())
+                else:
+                    backend = ChromaVectorStore(get_embeddings())
+                from app.db.hot_vector_cache import CachedVectorStore, HOT_CACHE_MAX_BYTES
+                # 자주 쓰는 매뉴얼은 메모리 행렬에서 바로 검색 (HOT_CACHE_MAX_BYTES=0이면 비활성화)
+                _vector_store = CachedVectorStore(backend) if HOT_CACHE_MAX_BYTES > 0 else backend
+    return _vector_store
+
+
+def warm_manual(manual_id: str):
+    """매뉴얼의 임베딩을 핫 캐시에 미리 올립니다. (채팅 연결 직후 백그라운드에서 호출)"""
+    vector_store = get_vector_store()
+    if hasattr(vector_store, "warm"):
+        vector_store.warm(manual_id)
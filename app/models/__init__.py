@@ -2,5 +2,8 @@ from .user import User
 from .companies import Company
 from .manuals import Manual
 from .chat_logs import ChatLog
+from .chat_log_archive import ChatLogArchive
 from .reports import Report
 from .risk_analysis import RiskAnalysis
+from .experiment import Experiment
+from .experiment_log import ExperimentLog
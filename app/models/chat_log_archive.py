@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from app.db.database import Base
+from datetime import datetime
+
+class ChatLogArchive(Base):
+    """
+    보존 기간(CHAT_LOG_RETENTION_DAYS)이 지난 채팅 로그. chat_logs에서 id를 그대로 옮겨 오므로
+    keyset 커서(채팅 로그 id)는 두 테이블 어디에 있든 그대로 쓸 수 있습니다.
+    매뉴얼/사용자 삭제를 막지 않도록 외래 키는 두지 않습니다.
+    """
+    __tablename__ = "chat_logs_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer)
+    manual_id = Column(Integer)
+    experiment_id = Column(Integer, nullable=False)
+    sender = Column(String(50))
+    message = Column(Text)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_chat_logs_archive_experiment_id_created_at_id", "experiment_id", "created_at", "id"),
+    )
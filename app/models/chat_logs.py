@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from datetime import datetime
 
 class ChatLog(Base):
+    """
+    채팅 로그. 실험별 대화 조회/페이지 이동은 (experiment_id, created_at, id) 인덱스를 탑니다.
+    (기존 DB에는 app.db.migrations가 인덱스를 추가합니다)
+    """
     __tablename__ = "chat_logs"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -15,3 +19,7 @@ class ChatLog(Base):
 
     user = relationship("User", back_populates="chat_logs")
     manual = relationship("Manual", back_populates="chat_logs")
+
+    __table_args__ = (
+        Index("ix_chat_logs_experiment_id_created_at_id", "experiment_id", "created_at", "id"),
+    )
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Index
+from app.db.database import Base
+from datetime import datetime
+
+class ExperimentLog(Base):
+    """
+    실험 진행 로그 (추가 전용). 사용자별 최근 로그 조회는 (user_id, timestamp) 인덱스를 탑니다.
+    """
+    __tablename__ = "experiment_logs"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id = Column(String(100), nullable=False)
+    type = Column(String(20), nullable=False, default="progress")  # progress, result, observation, issue
+    content = Column(Text, nullable=False)
+    timestamp = Column(DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        Index("ix_experiment_logs_user_id_timestamp", "user_id", "timestamp"),
+    )
@@ -1,8 +1,9 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 
 class ChatLogOut(BaseModel):
-    id: int
+    id: Optional[int] = None  # Redis에 버퍼링되어 아직 DB에 저장되지 않은 메시지는 None
     sender: str
     message: str
     created_at: datetime
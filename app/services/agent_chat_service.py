@@ -1,22 +1,36 @@
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Awaitable, Tuple
 from dotenv import load_dotenv, find_dotenv
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_openai import ChatOpenAI
 from langchain.agents import initialize_agent, Tool, AgentType
 from langchain_core.documents import Document
 from pydantic import BaseModel, Field
 import time
 import json
+import random
+import asyncio
 from datetime import datetime
 from app.schemas.query import ManualSearchInput
 from app.services.chat_log_service import chat_log_service
+from app.services.lexical_index import hybrid_search, get_lexical_index, lexical_fast_path
+from app.db.vector_store import warm_manual
+from app.services import answer_cache, message_classifier, conversation_memory
+from app.services.context_builder import build_context
+from app.core import metrics
+from app.db.database import SessionLocal
+from app.models.experiment_log import ExperimentLog
+from app.crud.experiment_log_crud import (
+    create_experiment_log, create_experiment_log_batch, get_recent_experiment_logs
+)
 import uuid
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
 from sqlalchemy.orm import Session
 from langchain.agents import create_openai_functions_agent, AgentExecutor
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_community.callbacks import get_openai_callback
 
 # 환경 변수 로드
 dotenv_path = find_dotenv()
@@ -26,45 +40,85 @@ else:
     load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-CHROMA_DIR = "./chroma_db"
-EXPERIMENT_LOG_FILE = "./experiment_logs.json"
+# 메시지 분류와 동시에 매뉴얼 검색을 미리 시작할지 여부 (실험 로그로 분류되면 결과를 버림)
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+EXPERIMENT_LOG_FILE = "./experiment_logs.json"  # 이전 버전의 JSON 로그 (시작 시 한 번 테이블로 옮김)
 
 # 실험 로그 관리 클래스
 class ExperimentLogger:
-    def __init__(self, log_file: str = EXPERIMENT_LOG_FILE):
-        self.log_file = log_file
-        self.experiments = self.load_experiments()
-    
-    def load_experiments(self) -> List[Dict]:
+    """
+    실험 로그를 experiment_logs 테이블에 추가 전용으로 기록합니다.
+    기록은 INSERT 한 번, 조회는 (user_id, timestamp) 인덱스로 최근 N개만 읽습니다.
+    """
+    def __init__(self, legacy_log_file: str = EXPERIMENT_LOG_FILE):
+        self.legacy_log_file = legacy_log_file
+
+    @staticmethod
+    def _to_dict(log: ExperimentLog) -> Dict:
+        return {
+            "timestamp": log.timestamp.isoformat(),
+            "user_id": log.user_id,
+            "type": log.type,
+            "content": log.content
+        }
+
+    def import_legacy_file(self) -> int:
+        """
+        JSON 파일에 남아 있던 로그를 테이블로 옮기고 파일 이름을 *.imported로 바꿉니다. (한 번만 실행됨)
+        """
+        # 여러 워커가 동시에 시작해도 파일 이름을 먼저 바꾼 한 곳만 이전 작업을 수행
+        claimed_file = f"{self.legacy_log_file}.importing"
         try:
-            if os.path.exists(self.log_file):
-                with open(self.log_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            print(f"로그 파일 로드 실패: {e}")
-        return []
-    
-    def save_experiments(self):
+            os.rename(self.legacy_log_file, claimed_file)
+        except OSError:
+            return 0
         try:
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                json.dump(self.experiments, f, ensure_ascii=False, indent=2)
+            with open(claimed_file, 'r', encoding='utf-8') as f:
+                legacy_logs = json.load(f)
+            rows = [{
+                "timestamp": datetime.fromisoformat(log["timestamp"]),
+                "user_id": str(log.get("user_id")),
+                "type": log.get("type") or "progress",
+                "content": log.get("content") or ""
+            } for log in legacy_logs if log.get("timestamp")]
+            db = SessionLocal()
+            try:
+                create_experiment_log_batch(db, rows)
+            finally:
+                db.close()
+            os.replace(claimed_file, f"{self.legacy_log_file}.imported")
+            print(f"[ExperimentLog] 기존 JSON 로그 {len(rows)}건을 테이블로 옮김")
+            return len(rows)
         except Exception as e:
-            print(f"로그 파일 저장 실패: {e}")
-    
+            os.replace(claimed_file, self.legacy_log_file)  # 다음 시작 때 다시 시도
+            print(f"[ExperimentLog] 기존 로그 파일 이전 실패: {e}")
+            return 0
+
     def add_experiment_log(self, user_id: str, content: str, experiment_type: str = "progress"):
-        log_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "user_id": user_id,
-            "type": experiment_type,  # progress, result, observation, issue
-            "content": content
-        }
-        self.experiments.append(log_entry)
-        self.save_experiments()
-        return log_entry
-    
+        db = SessionLocal()
+        try:
+            return self._to_dict(create_experiment_log(db, str(user_id), content, experiment_type))
+        except Exception as e:
+            db.rollback()
+            print(f"[ExperimentLog] 실험 로그 저장 실패: {e}")
+            return {
+                "timestamp": datetime.now().isoformat(),
+                "user_id": user_id,
+                "type": experiment_type,
+                "content": content
+            }
+        finally:
+            db.close()
+
     def get_user_experiments(self, user_id: str, limit: int = 10) -> List[Dict]:
-        user_logs = [exp for exp in self.experiments if exp.get("user_id") == user_id]
-        return user_logs[-limit:]
+        db = SessionLocal()
+        try:
+            return [self._to_dict(log) for log in get_recent_experiment_logs(db, str(user_id), limit)]
+        except Exception as e:
+            print(f"[ExperimentLog] 실험 로그 조회 실패: {e}")
+            return []
+        finally:
+            db.close()
     
     def generate_report(self, user_id: str) -> str:
         user_logs = self.get_user_experiments(user_id, limit=50)
@@ -108,26 +162,95 @@ class ExperimentLogger:
 # 실험 로거 인스턴스
 experiment_logger = ExperimentLogger()
 
-# LLM 기반 메시지 타입 분류 함수
-def llm_classify_message_type(message: str) -> str:
-    """
-    LLM(GPT-4o 등)을 사용해 메시지가 '질문'인지 '실험기록'인지 분류한다.
-    반드시 '질문' 또는 '실험기록' 둘 중 하나로만 답변하도록 프롬프트를 구성한다.
-    """
-    llm = ChatOpenAI(model_name="gpt-4o-mini", openai_api_key=OPENAI_API_KEY, temperature=0)
-    prompt = f"""
+# 에이전트 실행기 캐시 설정
+AGENT_CACHE_MAX_SIZE = int(os.getenv("AGENT_CACHE_MAX_SIZE", 64))
+AGENT_CACHE_IDLE_SECONDS = int(os.getenv("AGENT_CACHE_IDLE_SECONDS", 1800))  # 30분
+AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "false").lower() == "true"
+
+# 답변 방식: fast(검색 1회 + LLM 1회) / agent(함수 호출 에이전트) / auto(질문에 따라 선택)
+CHAT_ANSWER_MODE = os.getenv("CHAT_ANSWER_MODE", "auto")
+AGENT_ROUTE_MIN_CHARS = int(os.getenv("AGENT_ROUTE_MIN_CHARS", 120))  # 이보다 긴 질문은 에이전트로
+AGENT_ROUTE_CUES = ("비교", "차이", "각각", "모두", "전부", "단계별", "순서대로", "정리해", "요약")
+FAST_RAG_HISTORY_TURNS = 3  # fast 모드 프롬프트에 넣는 최근 대화 턴 수
+
+FAST_RAG_PROMPT = """
+너는 실험실 매뉴얼 QA 도우미야.
+아래 매뉴얼 발췌만 근거로 답하고, 발췌에 없는 내용은 모른다고 답해.
+{experiment_context}
+[매뉴얼 발췌]
+{context}
+"""
+
+_llms: Dict[Tuple[str, Optional[float]], ChatOpenAI] = {}
+
+def _get_llm(model_name: str, temperature: Optional[float] = None) -> ChatOpenAI:
+    """모델별 ChatOpenAI 클라이언트를 재사용합니다. (HTTP 연결 풀 공유)"""
+    key = (model_name, temperature)
+    if key not in _llms:
+        options = {"temperature": temperature} if temperature is not None else {}
+        # stream_usage: 스트리밍 응답에서도 토큰 사용량을 받아 모드별 비교에 사용
+        _llms[key] = ChatOpenAI(model_name=model_name, openai_api_key=OPENAI_API_KEY, stream_usage=True, **options)
+    return _llms[key]
+
+# LLM 기반 메시지 타입 분류 프롬프트
+CLASSIFY_PROMPT = """
 아래 메시지가 '질문'인지 '실험기록'인지 한 단어로 답해. 
 질문: 실험 방법, 매뉴얼 등 궁금증. 
 실험기록: 진행/관찰/결과/이슈 등. 
 반드시 '질문' 또는 '실험기록' 둘 중 하나로만 답해. 
 메시지: {message}
 """
-    result = llm.predict(prompt).strip().lower()
+
+def _parse_classification(result: str) -> str:
+    result = result.strip().lower()
     # 혹시라도 LLM이 엉뚱하게 답할 경우 방어
     if "experiment" in result:
         return "experiment_log"
     return "message"
 
+# LLM 기반 메시지 타입 분류 함수
+def llm_classify_message_type(message: str) -> str:
+    """
+    LLM(GPT-4o 등)을 사용해 메시지가 '질문'인지 '실험기록'인지 분류한다.
+    반드시 '질문' 또는 '실험기록' 둘 중 하나로만 답변하도록 프롬프트를 구성한다.
+    """
+    llm = _get_llm("gpt-4o-mini", temperature=0)
+    return _parse_classification(llm.predict(CLASSIFY_PROMPT.format(message=message)))
+
+async def allm_classify_message_type(message: str) -> str:
+    """llm_classify_message_type의 비동기 버전 (이벤트 루프를 막지 않음)"""
+    llm = _get_llm("gpt-4o-mini", temperature=0)
+    result = await llm.ainvoke(CLASSIFY_PROMPT.format(message=message))
+    return _parse_classification(result.content)
+
+# 메시지 타입 분류: 로컬 분류기 우선, 경계 사례만 LLM
+def classify_message_type(message: str) -> str:
+    start = time.perf_counter()
+    label, confidence = message_classifier.predict(message)
+    if label is not None:
+        metrics.incr("classifier.local")
+        metrics.observe("classifier.local_ms", (time.perf_counter() - start) * 1000)
+        return label
+    metrics.incr("classifier.llm_fallback")
+    label = llm_classify_message_type(message)
+    metrics.observe("classifier.llm_ms", (time.perf_counter() - start) * 1000)
+    print(f"[Classifier] 로컬 확신도 {confidence:.2f} → LLM 분류: {label}")
+    return label
+
+async def aclassify_message_type(message: str) -> str:
+    """classify_message_type의 비동기 버전 (LLM 대체 경로만 await)"""
+    start = time.perf_counter()
+    label, confidence = message_classifier.predict(message)
+    if label is not None:
+        metrics.incr("classifier.local")
+        metrics.observe("classifier.local_ms", (time.perf_counter() - start) * 1000)
+        return label
+    metrics.incr("classifier.llm_fallback")
+    label = await allm_classify_message_type(message)
+    metrics.observe("classifier.llm_ms", (time.perf_counter() - start) * 1000)
+    print(f"[Classifier] 로컬 확신도 {confidence:.2f} → LLM 분류: {label}")
+    return label
+
 # 실험 로그 타입 분류
 def classify_experiment_type(message: str) -> str:
     """실험 로그의 세부 타입 분류"""
@@ -142,30 +265,229 @@ def classify_experiment_type(message: str) -> str:
     else:
         return "progress"
 
+# 분류와 동시에 시작한 추측 검색 작업 ({"task": asyncio.Task}); 도구의 첫 검색이 꺼내 씁니다.
+# 도구는 복사된 컨텍스트에서 실행되므로 dict를 공유해 한 번만 쓰이도록 합니다.
+_speculative_search: ContextVar[Optional[Dict]] = ContextVar("speculative_search", default=None)
+
+def _format_search_results(docs: List[Document], query: str = "") -> str:
+    # 청크 겹침·반복 문장을 지우고 질문과 관련된 문장 위주로 CONTEXT_TOKEN_BUDGET 안에 담음
+    return build_context(docs, query)
+
+def _discard_speculative(*tasks: Optional[asyncio.Task]):
+    for task in tasks:
+        if task is None:
+            continue
+        if task.done():
+            if not task.cancelled():
+                task.exception()  # 실패한 작업의 예외를 회수해 경고가 남지 않도록
+        else:
+            task.cancel()  # 스레드의 작업은 끝까지 돌지만 결과는 버려짐
+        metrics.incr("speculative_search.discarded")
+
+def _use_answer_cache(message: str, history: Optional[List[Dict[str, str]]], summary: str = "") -> bool:
+    """
+    답변 캐시는 질문만으로 키를 잡으므로, 이전 대화에 기대는 후속 질문("그럼 그 농도는?")에
+    다른 대화의 답이 나가지 않도록 대화 기록이나 요약이 있는 세션에서는 쓰지 않습니다.
+    """
+    return answer_cache.is_cacheable(message) and not history and not summary
+
+def _start_retrieval(manual_id: str, message: str, use_cache: bool, speculative: bool
+                     ) -> Tuple[Optional[asyncio.Task], Optional[asyncio.Task], Optional[asyncio.Task]]:
+    """
+    분류와 동시에 검색/답변 캐시 조회를 시작합니다. 질문 임베딩은 한 번만 계산해 둘이 함께 씁니다.
+    어휘 검색 fast path로 결과가 정해지는 질문은 임베딩을 계산하지 않고 캐시 조회도 건너뜁니다.
+    Returns: (준비 작업, 검색 작업, 캐시 조회 작업) - 필요 없는 작업은 None
+    """
+    if not use_cache and not speculative:
+        return None, None, None
+
+    async def prepare():
+        docs = await asyncio.to_thread(lexical_fast_path, manual_id, message, 4)
+        if docs is not None or not use_cache:
+            return docs, None
+        try:
+            return None, await asyncio.to_thread(answer_cache.embed_question, message)
+        except Exception as e:
+            print(f"질문 임베딩 실패: {e}")
+            return None, None
+
+    async def search():
+        docs, embedding = await asyncio.shield(prepared)
+        if docs is not None:
+            return docs
+        return await asyncio.to_thread(hybrid_search, manual_id, message, 4, None, embedding)
+
+    async def lookup():
+        docs, embedding = await asyncio.shield(prepared)
+        if embedding is None:
+            if docs is not None:
+                metrics.incr("answer_cache.skipped_fast_path")
+            return None, None
+        return await asyncio.to_thread(answer_cache.lookup, manual_id, message, embedding)
+
+    prepared = asyncio.create_task(prepare())
+    search_task = asyncio.create_task(search()) if speculative else None
+    cache_task = asyncio.create_task(lookup()) if use_cache else None
+    return prepared, search_task, cache_task
+
 # manual_id로 벡터DB에서 검색하는 Tool 정의
 def get_manual_search_tool(manual_id):
     def search_manual_func(input_text: str) -> str:
         print(f"[Tool] input_text: {input_text}")
         print(f"[Tool] manual_id: {manual_id}")
         start = time.time()
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-        docs = vectorstore.similarity_search(input_text, k=4, filter={"manual_id": manual_id})
+        docs = hybrid_search(manual_id, input_text, k=4)
         elapsed = time.time() - start
         print(f"[Tool] 검색 시간: {elapsed:.2f}초")
         print(f"[Tool] 검색된 문서 개수: {len(docs)}")
-        if not docs:
-            return "관련 문서를 찾을 수 없습니다."
-        return "\n".join([doc.page_content for doc in docs])
+        return _format_search_results(docs, input_text)
+
+    async def asearch_manual_func(input_text: str) -> str:
+        # 분류와 동시에 시작해 둔 추측 검색이 있으면 첫 검색은 그 결과를 그대로 사용
+        speculative = _speculative_search.get()
+        task = speculative.pop("task", None) if speculative else None
+        if task is not None:
+            try:
+                docs = await task
+                metrics.incr("speculative_search.used")
+                print(f"[Tool] 추측 검색 결과 사용: {len(docs)}개")
+                return _format_search_results(docs, input_text)
+            except Exception as e:
+                print(f"[Tool] 추측 검색 실패, 다시 검색: {e}")
+        # 검색(벡터/어휘 색인)은 CPU·파일 I/O라 스레드로 넘겨 이벤트 루프를 막지 않음
+        return await asyncio.to_thread(search_manual_func, input_text)
+
     return Tool(
         name=f"manual_search_{manual_id}",
         func=search_manual_func,
+        coroutine=asearch_manual_func,
         description=f"{manual_id} 매뉴얼에서 검색합니다."
     )
 
+def warm_manual_resources(manual_id: str):
+    """
+    채팅 세션이 시작될 때 매뉴얼의 임베딩(핫 캐시)과 어휘 색인을 미리 메모리에 올립니다.
+    첫 질문이 적재 시간을 기다리지 않도록 WebSocket 연결 직후 백그라운드에서 호출합니다.
+    """
+    try:
+        warm_manual(manual_id)
+        get_lexical_index(manual_id)
+    except Exception as e:
+        print(f"매뉴얼 예열 실패 ({manual_id}): {e}")
+
+# 실험 로그에 대한 응답 문구
+EXPERIMENT_LOG_RESPONSES = {
+    "progress": ["실험 진행 상황을 기록했습니다! 계속 진행하시고 결과가 나오면 알려주세요."],
+    "result": ["실험 결과를 기록했습니다! 흥미로운 결과네요. 추가 분석이 필요하시면 알려주세요."],
+    "observation": ["관찰 내용을 기록했습니다. 좋은 관찰이네요! 이런 세심한 관찰이 실험의 성공 비결입니다."],
+    "issue": ["문제 상황을 기록했습니다. 해결 방법을 매뉴얼에서 찾아볼까요?"]
+}
+
+def _experiment_log_result(exp_type: str, experiment_id) -> Dict:
+    response = random.choice(EXPERIMENT_LOG_RESPONSES.get(exp_type, EXPERIMENT_LOG_RESPONSES["progress"]))
+    return {
+        "response": response,
+        "type": "experiment_log",
+        "logged": False, # This is not a Q&A chat log
+        "experiment_id": experiment_id
+    }
+
+SYSTEM_PROMPT_TEMPLATE = """
+너는 실험실 매뉴얼 QA 도우미야.
+manual_id {manual_id}에 해당하는 매뉴얼만 검색해야 한다.
+매뉴얼 내용을 벗어나지 말고, 모르는 건 모른다고 답해.
+{experiment_context}
+사용자의 질문에 대해 매뉴얼을 검색해서 정확한 답변을 제공해줘.
+"""
+
+def _build_experiment_context(user_id: str) -> str:
+    """사용자별로 달라지는 부분(최근 실험 로그)은 캐시된 에이전트에 프롬프트 변수로 넘깁니다."""
+    recent_logs = experiment_logger.get_user_experiments(user_id, limit=5)
+    experiment_context = ""
+    if recent_logs:
+        experiment_context = "\\n최근 실험 진행 상황:\\n"
+        for log in recent_logs:
+            experiment_context += f"- {log['timestamp'][:16]}: {log['content']}\\n"
+    return experiment_context
+
+def _to_chat_history(history: List[Dict[str, str]], summary: str = "") -> List:
+    chat_history_messages = []
+    if summary:
+        chat_history_messages.append(SystemMessage(content=f"이전 대화 요약:\n{summary}"))
+    for turn in history or []:
+        if turn["role"] == "user":
+            chat_history_messages.append(HumanMessage(content=turn["content"]))
+        elif turn["role"] == "assistant":
+            chat_history_messages.append(AIMessage(content=turn["content"]))
+    return chat_history_messages
+
+def _build_agent_executor(manual_id: str) -> AgentExecutor:
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT_TEMPLATE),
+        MessagesPlaceholder(variable_name="chat_history", optional=True),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ]).partial(manual_id=manual_id)
+    
+    tool = get_manual_search_tool(manual_id)
+    
+    agent = create_openai_functions_agent(_get_llm("gpt-4.1-mini"), [tool], prompt)
+    return AgentExecutor(agent=agent, tools=[tool], verbose=AGENT_VERBOSE)
+
+class AgentRuntimeCache:
+    """
+    manual_id별 AgentExecutor(프롬프트·도구·에이전트) 캐시.
+    실행기는 호출 간 상태가 없으므로 여러 세션이 함께 써도 되고,
+    AGENT_CACHE_MAX_SIZE를 넘거나 AGENT_CACHE_IDLE_SECONDS 동안 쓰이지 않은 매뉴얼은 정리합니다.
+    """
+
+    def __init__(self, max_size: int = AGENT_CACHE_MAX_SIZE, idle_seconds: int = AGENT_CACHE_IDLE_SECONDS):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._entries: "OrderedDict[str, Tuple[AgentExecutor, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, manual_id: str) -> AgentExecutor:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entries.get(manual_id)
+            if entry is not None:
+                self._entries[manual_id] = (entry[0], now)
+                self._entries.move_to_end(manual_id)
+                metrics.incr("agent_cache.hit")
+                return entry[0]
+
+        metrics.incr("agent_cache.miss")
+        executor = _build_agent_executor(manual_id)
+        with self._lock:
+            self._entries[manual_id] = (executor, now)
+            self._entries.move_to_end(manual_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                metrics.incr("agent_cache.evicted")
+        return executor
+
+    def _evict_idle(self, now: float):
+        while self._entries:
+            manual_id, (_, last_used) = next(iter(self._entries.items()))
+            if now - last_used < self.idle_seconds:
+                break
+            del self._entries[manual_id]
+            metrics.incr("agent_cache.evicted")
+
+    def invalidate(self, manual_id: Optional[str] = None):
+        with self._lock:
+            if manual_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(manual_id, None)
+
+agent_runtime_cache = AgentRuntimeCache()
+
 def agent_chat_answer(manual_id: str, sender: str, message: str, user_id: str = "default_user", experiment_id: int = None, history: List[Dict[str, str]] = None) -> Dict[str, str]:
     """
-    개선된 에이전트 답변 함수 (LLM 기반 메시지 분류)
+    개선된 에이전트 답변 함수 (로컬 분류기 + LLM 대체 메시지 분류)
     Returns: {"response": str, "type": str, "logged": bool, "experiment_id": int}
     """
     if history is None:
@@ -174,97 +496,224 @@ def agent_chat_answer(manual_id: str, sender: str, message: str, user_id: str =
     if not experiment_id:
         experiment_id = int(time.time())
 
-    # === LLM 기반 메시지 타입 분류 ===
-    message_type = llm_classify_message_type(message)
+    # === 메시지 타입 분류 (로컬 분류기, 애매하면 LLM) ===
+    message_type = classify_message_type(message)
     
     if message_type == "experiment_log":
         # 실험 로그로 처리
         exp_type = classify_experiment_type(message)
         experiment_logger.add_experiment_log(user_id, message, exp_type)
-        
-        # 실험 로그에 대한 응답 생성
-        responses = {
-            "progress": ["실험 진행 상황을 기록했습니다! 계속 진행하시고 결과가 나오면 알려주세요."],
-            "result": ["실험 결과를 기록했습니다! 흥미로운 결과네요. 추가 분석이 필요하시면 알려주세요."],
-            "observation": ["관찰 내용을 기록했습니다. 좋은 관찰이네요! 이런 세심한 관찰이 실험의 성공 비결입니다."],
-            "issue": ["문제 상황을 기록했습니다. 해결 방법을 매뉴얼에서 찾아볼까요?"]
-        }
-        
-        import random
-        response = random.choice(responses.get(exp_type, responses["progress"]))
-        
-        return {
-            "response": response,
-            "type": "experiment_log",
-            "logged": False, # This is not a Q&A chat log
-            "experiment_id": experiment_id
-        }
-    else:
-        # 질문으로 처리 - RAG 방식
-        recent_logs = experiment_logger.get_user_experiments(user_id, limit=5)
-        experiment_context = ""
-        if recent_logs:
-            experiment_context = "\\n최근 실험 진행 상황:\\n"
-            for log in recent_logs:
-                experiment_context += f"- {log['timestamp'][:16]}: {log['content']}\\n"
-        
-        system_prompt = f"""
-너는 실험실 매뉴얼 QA 도우미야.
-manual_id {manual_id}에 해당하는 매뉴얼만 검색해야 한다.
-매뉴얼 내용을 벗어나지 말고, 모르는 건 모른다고 답해.
-{experiment_context}
-사용자의 질문에 대해 매뉴얼을 검색해서 정확한 답변을 제공해줘.
-"""
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            MessagesPlaceholder(variable_name="chat_history", optional=True),
-            ("human", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-        
-        llm = ChatOpenAI(model_name="gpt-4.1-mini", openai_api_key=OPENAI_API_KEY)
-        tool = get_manual_search_tool(manual_id)
-        
-        agent = create_openai_functions_agent(llm, [tool], prompt)
-        agent_executor = AgentExecutor(agent=agent, tools=[tool], verbose=True)
+        return _experiment_log_result(exp_type, experiment_id)
 
-        chat_history_messages = []
-        if history:
-            for turn in history:
-                if turn["role"] == "user":
-                    chat_history_messages.append(HumanMessage(content=turn["content"]))
-                elif turn["role"] == "assistant":
-                    chat_history_messages.append(AIMessage(content=turn["content"]))
+    # 질문으로 처리 - RAG 방식
+    # === 의미 기반 답변 캐시 조회 ===
+    cached_answer, question_embedding = None, None
+    if _use_answer_cache(message, history) and lexical_fast_path(manual_id, message) is None:
+        cached_answer, question_embedding = answer_cache.lookup(manual_id, message)
 
+    if cached_answer is not None:
+        answer = cached_answer
+    else:
+        agent_executor = agent_runtime_cache.get(manual_id)
         response = agent_executor.invoke({
             "input": message,
-            "chat_history": chat_history_messages
+            "experiment_context": _build_experiment_context(user_id),
+            "chat_history": _to_chat_history(history)
         })
         answer = response.get("output", "죄송합니다, 답변을 생성하지 못했습니다.")
+        if question_embedding is not None:
+            answer_cache.store(manual_id, message, answer, question_embedding)
 
-        # === 채팅 로그 저장 ===
-        chat_log_service.add_chat_to_cache(
-            experiment_id=experiment_id,
-            user_id=user_id,
-            manual_id=manual_id,
-            sender='user',
-            message=message
-        )
-        chat_log_service.add_chat_to_cache(
-            experiment_id=experiment_id,
-            user_id=user_id,
-            manual_id=manual_id,
-            sender='ai',
-            message=answer
-        )
-        
-        return {
-            "response": answer,
-            "type": "message",
-            "logged": True,
-            "experiment_id": experiment_id
-        }
+    # === 채팅 로그 저장 ===
+    chat_log_service.add_chat_to_cache(
+        experiment_id=experiment_id,
+        user_id=user_id,
+        manual_id=manual_id,
+        sender='user',
+        message=message
+    )
+    chat_log_service.add_chat_to_cache(
+        experiment_id=experiment_id,
+        user_id=user_id,
+        manual_id=manual_id,
+        sender='ai',
+        message=answer
+    )
+    
+    return {
+        "response": answer,
+        "type": "message",
+        "logged": True,
+        "experiment_id": experiment_id
+    }
+
+async def _run_agent(agent_executor: AgentExecutor, inputs: Dict, on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+    """
+    에이전트를 실행하고 최종 답변을 반환합니다.
+    on_token이 있으면 astream_events로 LLM 토큰을 받아 그대로 넘깁니다.
+    (도구 호출을 결정하는 단계의 출력은 function_call이라 content가 비어 있어 전달되지 않음)
+    """
+    if on_token is None:
+        response = await agent_executor.ainvoke(inputs)
+        return response.get("output", "죄송합니다, 답변을 생성하지 못했습니다.")
+
+    output = None
+    async for event in agent_executor.astream_events(inputs, version="v2"):
+        if event["event"] == "on_chat_model_stream":
+            token = event["data"]["chunk"].content
+            if token:
+                await on_token(token)
+        elif event["event"] == "on_chain_end" and not event.get("parent_ids"):
+            output = (event["data"].get("output") or {}).get("output")
+    return output or "죄송합니다, 답변을 생성하지 못했습니다."
+
+def choose_answer_mode(message: str, requested: Optional[str] = None) -> str:
+    """
+    답변 방식 선택: "fast"(검색 1회 + LLM 1회) 또는 "agent"(함수 호출 에이전트).
+    요청에 mode가 없거나 "auto"이면, 비교·여러 항목·단계별 설명처럼 검색을 여러 번 해야 할 것 같은
+    질문만 에이전트로 보내고 나머지는 fast로 처리합니다.
+    """
+    requested = (requested or CHAT_ANSWER_MODE).lower()
+    if requested in ("fast", "agent"):
+        return requested
+    if len(message) > AGENT_ROUTE_MIN_CHARS or message.count("?") > 1:
+        return "agent"
+    if any(cue in message for cue in AGENT_ROUTE_CUES):
+        return "agent"
+    return "fast"
+
+async def _fast_answer(manual_id: str, message: str, user_id: str, history: List[Dict[str, str]], summary: str,
+                       speculative: Optional[Dict], on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+                       query_embedding: Optional[List[float]] = None) -> str:
+    """검색 결과로 프롬프트를 한 번에 구성해 LLM을 한 번만 호출합니다. (추측 검색 결과나 캐시 조회의 임베딩이 있으면 재사용)"""
+    task = speculative.pop("task", None) if speculative else None
+    if task is not None:
+        docs = await task
+    else:
+        docs = await asyncio.to_thread(hybrid_search, manual_id, message, 4, None, query_embedding)
+    system_prompt = FAST_RAG_PROMPT.format(
+        experiment_context=await asyncio.to_thread(_build_experiment_context, user_id),
+        context=_format_search_results(docs, message),
+    )
+    messages = [SystemMessage(content=system_prompt)]
+    messages += _to_chat_history((history or [])[-FAST_RAG_HISTORY_TURNS * 2:], summary)
+    messages.append(HumanMessage(content=message))
+
+    llm = _get_llm("gpt-4.1-mini")
+    if on_token is None:
+        return (await llm.ainvoke(messages)).content
+    parts = []
+    async for chunk in llm.astream(messages):
+        if chunk.content:
+            parts.append(chunk.content)
+            await on_token(chunk.content)
+    return "".join(parts)
+
+def _record_answer_usage(mode: str, started: float, usage) -> Dict:
+    report = {
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "llm_calls": usage.successful_requests,
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+    }
+    metrics.incr(f"chat.mode.{mode}")
+    for name, value in report.items():
+        metrics.observe(f"chat.{mode}.{name}", value)
+    print(f"[Answer] mode={mode} {report}")
+    return report
+
+async def agent_chat_answer_async(manual_id: str, sender: str, message: str, user_id: str = "default_user", experiment_id: int = None, history: List[Dict[str, str]] = None, on_token: Optional[Callable[[str], Awaitable[None]]] = None, mode: Optional[str] = None) -> Dict[str, str]:
+    """
+    agent_chat_answer의 비동기 버전 (WebSocket/음성 엔드포인트용).
+    LLM 호출은 ainvoke로, 검색·답변 캐시·실험 로그·MySQL 조회처럼 남은 블로킹 작업은 스레드로 넘겨
+    한 사용자의 응답을 기다리는 동안 같은 워커의 다른 요청이 멈추지 않도록 합니다.
+    on_token을 주면 답변 토큰이 생성되는 대로 전달합니다. (캐시 응답/실험 로그 응답은 한 번에 전달)
+    mode: "fast" | "agent" | "auto" (기본값 CHAT_ANSWER_MODE, choose_answer_mode 참고)
+    history를 주지 않으면 experiment_id를 세션으로 삼아 서버에 저장된 대화 기록(conversation_memory)을 사용하고,
+    이번 턴도 그 기록에 추가합니다.
+    Returns: {"response": str, "type": str, "logged": bool, "experiment_id": int, "mode": str}
+    """
+    if not experiment_id:
+        experiment_id = int(time.time())
+
+    summary = ""
+    if history is None:
+        summary, history = await conversation_memory.load(experiment_id)
+
+    # 분류 결과를 기다리지 않고 매뉴얼 검색과 답변 캐시 조회를 먼저 시작 (질문 임베딩 1회를 함께 사용)
+    prepare_task, search_task, cache_task = _start_retrieval(
+        manual_id, message, _use_answer_cache(message, history, summary), SPECULATIVE_RETRIEVAL
+    )
+
+    try:
+        message_type = await aclassify_message_type(message)
+    except BaseException:
+        _discard_speculative(prepare_task, search_task, cache_task)
+        raise
+
+    if message_type == "experiment_log":
+        _discard_speculative(prepare_task, search_task, cache_task)
+        exp_type = classify_experiment_type(message)
+        await asyncio.to_thread(experiment_logger.add_experiment_log, user_id, message, exp_type)
+        result = _experiment_log_result(exp_type, experiment_id)
+        result["mode"] = "experiment_log"
+        if on_token is not None:
+            await on_token(result["response"])
+        await conversation_memory.append_turn(experiment_id, message, result["response"])
+        return result
+
+    cached_answer, question_embedding = None, None
+    if cache_task is not None:
+        try:
+            cached_answer, question_embedding = await cache_task
+        except BaseException:
+            # 턴이 취소되면(새 메시지, 연결 종료) 미리 시작한 검색도 함께 버림
+            _discard_speculative(prepare_task, search_task, cache_task)
+            raise
+
+    usage_report = None
+    if cached_answer is not None:
+        _discard_speculative(search_task)
+        mode = "cache"
+        answer = cached_answer
+        if on_token is not None:
+            await on_token(answer)
+    else:
+        mode = choose_answer_mode(message, mode)
+        speculative = {"task": search_task} if search_task is not None else None
+        started = time.perf_counter()
+        with get_openai_callback() as usage:
+            try:
+                if mode == "fast":
+                    answer = await _fast_answer(manual_id, message, user_id, history, summary, speculative, on_token,
+                                                question_embedding)
+                else:
+                    _speculative_search.set(speculative)
+                    answer = await _run_agent(agent_runtime_cache.get(manual_id), {
+                        "input": message,
+                        "experiment_context": await asyncio.to_thread(_build_experiment_context, user_id),
+                        "chat_history": _to_chat_history(history, summary)
+                    }, on_token)
+            finally:
+                # 에이전트가 검색 도구를 쓰지 않고 답한 경우
+                if speculative:
+                    _discard_speculative(speculative.pop("task", None))
+        usage_report = _record_answer_usage(mode, started, usage)
+        if question_embedding is not None:
+            await asyncio.to_thread(answer_cache.store, manual_id, message, answer, question_embedding)
+
+    await chat_log_service.add_chat_to_cache_async(experiment_id, user_id, manual_id, 'user', message)
+    await chat_log_service.add_chat_to_cache_async(experiment_id, user_id, manual_id, 'ai', answer)
+    await conversation_memory.append_turn(experiment_id, message, answer)
+
+    return {
+        "response": answer,
+        "type": "message",
+        "logged": True,
+        "experiment_id": experiment_id,
+        "mode": mode,
+        "usage": usage_report
+    }
 
 # DB에 저장되지 않은 모든 채팅 로그를 강제로 저장하는 함수
 def flush_all_chat_logs():
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import uuid
+import base64
+from typing import List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.core import metrics
+from app.db.redis_conn import get_redis_conn
+from app.db.vector_store import get_embeddings
+
+load_dotenv()
+
+# 코사인 유사도가 이 값 이상이면 같은 질문으로 보고 저장된 답변을 재사용합니다.
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 60 * 60 * 24))  # 마지막 사용 후 24시간
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 200))  # 매뉴얼당 최대 항목 수
+ANSWER_CACHE_MIN_QUESTION_CHARS = int(os.getenv("ANSWER_CACHE_MIN_QUESTION_CHARS", 6))  # "왜?" 같은 후속 질문은 제외
+ANSWER_CACHE_KEY_PREFIX = "answer_cache"
+
+def _keys(manual_id: str) -> Tuple[str, str, str]:
+    base = f"{ANSWER_CACHE_KEY_PREFIX}:{manual_id}"
+    # vectors: entry_id → 질문 임베딩(float16, base64) / answers: entry_id → JSON / lru: entry_id → 마지막 사용 시각
+    return f"{base}:vectors", f"{base}:answers", f"{base}:lru"
+
+
+def _encode(vector: np.ndarray) -> str:
+    return base64.b64encode(vector.astype(np.float16).tobytes()).decode("ascii")
+
+
+def _decode(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float16).astype(np.float32)
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def is_cacheable(question: str) -> bool:
+    return len(question.strip()) >= ANSWER_CACHE_MIN_QUESTION_CHARS
+
+
+def embed_question(question: str) -> List[float]:
+    return get_embeddings().embed_query(question)
+
+
+def lookup(manual_id: str, question: str, embedding: Optional[List[float]] = None) -> Tuple[Optional[str], Optional[List[float]]]:
+    """
+    manual_id 범위에서 의미상 같은 질문의 답변을 찾습니다.
+
+    Returns:
+        (캐시된 답변 또는 None, 질문 임베딩) - 임베딩은 저장 시 재사용할 수 있도록 함께 반환합니다.
+        임베딩 호출이 실패하면 임베딩 자리에 None을 반환합니다.
+    """
+    with metrics.timer("answer_cache.lookup_ms"):
+        try:
+            if embedding is None:
+                embedding = embed_question(question)
+            vectors_key, answers_key, lru_key = _keys(manual_id)
+            redis_conn = get_redis_conn()
+            _evict_expired(redis_conn, manual_id)
+            stored = redis_conn.hgetall(vectors_key)
+            if not stored:
+                metrics.incr("answer_cache.miss")
+                return None, embedding
+
+            entry_ids = list(stored.keys())
+            matrix = np.stack([_decode(stored[entry_id]) for entry_id in entry_ids])
+            similarities = matrix @ _normalize(embedding)
+            best = int(np.argmax(similarities))
+            if similarities[best] < ANSWER_CACHE_THRESHOLD:
+                metrics.incr("answer_cache.miss")
+                return None, embedding
+
+            entry_id = entry_ids[best]
+            entry = redis_conn.hget(answers_key, entry_id)
+            if entry is None:
+                metrics.incr("answer_cache.miss")
+                return None, embedding
+            # LRU 갱신
+            pipe = redis_conn.pipeline()
+            pipe.zadd(lru_key, {entry_id: time.time()})
+            for key in (vectors_key, answers_key, lru_key):
+                pipe.expire(key, ANSWER_CACHE_TTL)
+            pipe.execute()
+            metrics.incr("answer_cache.hit")
+            print(f"[AnswerCache] hit: manual_id={manual_id}, similarity={similarities[best]:.4f}")
+            return json.loads(entry)["answer"], embedding
+        except Exception as e:
+            print(f"답변 캐시 조회 실패: {e}")
+            metrics.incr("answer_cache.error")
+            return None, embedding
+
+
+def store(manual_id: str, question: str, answer: str, embedding: List[float]):
+    """답변을 캐시에 저장하고, 매뉴얼당 항목 수가 상한을 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다."""
+    try:
+        vectors_key, answers_key, lru_key = _keys(manual_id)
+        entry_id = uuid.uuid4().hex
+        redis_conn = get_redis_conn()
+        pipe = redis_conn.pipeline()
+        pipe.hset(vectors_key, entry_id, _encode(_normalize(embedding)))
+        pipe.hset(answers_key, entry_id, json.dumps({"question": question, "answer": answer}, ensure_ascii=False))
+        pipe.zadd(lru_key, {entry_id: time.time()})
+        for key in (vectors_key, answers_key, lru_key):
+            pipe.expire(key, ANSWER_CACHE_TTL)
+        pipe.execute()
+
+        overflow = redis_conn.zcard(lru_key) - ANSWER_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            _remove_entries(redis_conn, manual_id, redis_conn.zrange(lru_key, 0, overflow - 1))
+            metrics.incr("answer_cache.evicted", overflow)
+    except Exception as e:
+        print(f"답변 캐시 저장 실패: {e}")
+
+
+def _remove_entries(redis_conn, manual_id: str, entry_ids: List[str]):
+    if not entry_ids:
+        return
+    vectors_key, answers_key, lru_key = _keys(manual_id)
+    pipe = redis_conn.pipeline()
+    pipe.hdel(vectors_key, *entry_ids)
+    pipe.hdel(answers_key, *entry_ids)
+    pipe.zrem(lru_key, *entry_ids)
+    pipe.execute()
+
+
+def _evict_expired(redis_conn, manual_id: str):
+    """키 전체 TTL과 별개로, 오래 사용되지 않은 개별 항목을 정리합니다."""
+    _, _, lru_key = _keys(manual_id)
+    expired = redis_conn.zrangebyscore(lru_key, 0, time.time() - ANSWER_CACHE_TTL)
+    if expired:
+        _remove_entries(redis_conn, manual_id, expired)
+        metrics.incr("answer_cache.expired", len(expired))
+
+
+def invalidate_manual(manual_id: str):
+    """매뉴얼이 삭제되거나 다시 임베딩되면 해당 매뉴얼의 캐시를 모두 제거합니다."""
+    try:
+        get_redis_conn().delete(*_keys(manual_id))
+        metrics.incr("answer_cache.invalidated")
+    except Exception as e:
+        print(f"답변 캐시 무효화 실패: {e}")
@@ -0,0 +1,113 @@
+"""
+채팅 로그 보존/아카이브 작업: 보존 기간(CHAT_LOG_RETENTION_DAYS)이 지난 chat_logs 행을 chat_logs_archive로 옮깁니다.
+
+- chat_logs를 작게 유지해 인덱스, 백업, flusher의 INSERT가 오래된 실험 데이터만큼 느려지지 않게 합니다.
+- 배치(CHAT_LOG_ARCHIVE_BATCH_SIZE)마다 아카이브 INSERT + 원본 DELETE를 한 트랜잭션으로 처리합니다.
+- CHAT_LOG_ARCHIVE_EXPORT_DIR를 지정하면 옮긴 행을 월별 gzip JSONL 파일(chat_logs_YYYY-MM.jsonl.gz)에도 덧붙여
+  콜드 스토리지로 보낼 수 있게 합니다. (파일은 gzip 멤버를 이어 붙이는 방식이라 gzip/zcat으로 그대로 읽힘)
+- 조회(chat_log_crud.load_chat_logs)는 chat_logs로 페이지가 차지 않으면 아카이브를 이어서 읽습니다.
+  옮긴 실험의 Redis tail(chat_log_tail:{experiment_id})은 지워 다음 조회 때 다시 채웁니다.
+- 여러 워커가 동시에 실행하지 않도록 Redis 잠금을 잡습니다.
+
+수동 실행: python -m app.services.chat_log_archive_service
+"""
+import os
+import gzip
+import json
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.core import metrics
+from app.crud import chat_log_crud
+from app.db.database import SessionLocal
+from app.db.redis_conn import get_redis_conn
+from app.services.chat_log_service import chat_log_service
+
+CHAT_LOG_RETENTION_DAYS = int(os.getenv("CHAT_LOG_RETENTION_DAYS", 180))
+CHAT_LOG_ARCHIVE_BATCH_SIZE = int(os.getenv("CHAT_LOG_ARCHIVE_BATCH_SIZE", 1000))
+CHAT_LOG_ARCHIVE_INTERVAL = int(os.getenv("CHAT_LOG_ARCHIVE_INTERVAL", 60 * 60 * 24))  # 하루
+CHAT_LOG_ARCHIVE_EXPORT_DIR = os.getenv("CHAT_LOG_ARCHIVE_EXPORT_DIR", "")  # 비우면 파일로 내보내지 않음
+CHAT_LOG_ARCHIVE_LOCK_KEY = "chat_log_archive:lock"
+CHAT_LOG_ARCHIVE_REPORT_KEY = "chat_log_archive:last_report"
+
+
+def export_jsonl(records: List[Dict], export_dir: str) -> List[str]:
+    """옮긴 행을 created_at 기준 월별 gzip JSONL 파일에 덧붙이고, 쓴 파일 경로를 반환합니다."""
+    by_month: Dict[str, List[Dict]] = defaultdict(list)
+    for record in records:
+        month = record["created_at"].strftime("%Y-%m") if record["created_at"] else "unknown"
+        by_month[month].append(record)
+    os.makedirs(export_dir, exist_ok=True)
+    paths = []
+    for month, month_records in sorted(by_month.items()):
+        path = os.path.join(export_dir, f"chat_logs_{month}.jsonl.gz")
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for record in month_records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        paths.append(path)
+    return paths
+
+
+def archive_old_chat_logs(retention_days: int = CHAT_LOG_RETENTION_DAYS,
+                          export_dir: Optional[str] = CHAT_LOG_ARCHIVE_EXPORT_DIR) -> Optional[Dict]:
+    """
+    보존 기간이 지난 채팅 로그를 아카이브로 옮깁니다.
+    Returns: 처리 결과 (다른 워커가 실행 중이면 None)
+    """
+    redis_conn = get_redis_conn()
+    token = uuid.uuid4().hex
+    if not redis_conn.set(CHAT_LOG_ARCHIVE_LOCK_KEY, token, nx=True, ex=CHAT_LOG_ARCHIVE_INTERVAL):
+        return None
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    start = time.perf_counter()
+    archived, last_id, files, error = 0, 0, set(), None
+    db = SessionLocal()
+    try:
+        while True:
+            records = chat_log_crud.archive_chat_log_batch(db, cutoff, last_id, CHAT_LOG_ARCHIVE_BATCH_SIZE)
+            if not records:
+                break
+            archived += len(records)
+            last_id = records[-1]["id"]
+            chat_log_service.clear_tails(record["experiment_id"] for record in records)
+            if export_dir:
+                try:
+                    files.update(export_jsonl(records, export_dir))
+                except OSError as e:
+                    # 아카이브 테이블이 원본이므로 내보내기 실패는 기록만 하고 계속 진행
+                    metrics.incr("chat_log_archive.export_error")
+                    print(f"[ChatLogArchive] 파일 내보내기 실패: {e}")
+    except Exception as e:
+        error = str(e)
+        metrics.incr("chat_log_archive.failed")
+        print(f"[ChatLogArchive] 아카이브 실패 ({archived}행 처리 후): {e}")
+    finally:
+        db.close()
+
+    report = {
+        "cutoff": cutoff.isoformat(),
+        "archived": archived,
+        "files": sorted(files),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "finished_at": time.time(),
+        "error": error,
+    }
+    redis_conn.set(CHAT_LOG_ARCHIVE_REPORT_KEY, json.dumps(report))
+    metrics.incr("chat_log_archive.rows", archived)
+    metrics.observe("chat_log_archive.elapsed_ms", report["elapsed_ms"])
+    print(f"[ChatLogArchive] {'실패' if error else '완료'}: {report}")
+    if error:
+        # 실패하면 잠금을 풀어 다음 주기에 (어느 워커든) 다시 시도하게 합니다. 만료 후 다른 워커가 잡은 잠금은 건드리지 않음
+        if redis_conn.get(CHAT_LOG_ARCHIVE_LOCK_KEY) == token:
+            redis_conn.delete(CHAT_LOG_ARCHIVE_LOCK_KEY)
+    # 성공하면 잠금은 간격(CHAT_LOG_ARCHIVE_INTERVAL) 동안 유지하여 다른 워커가 곧바로 다시 실행하지 않게 합니다.
+    return report
+
+
+if __name__ == "__main__":
+    get_redis_conn().delete(CHAT_LOG_ARCHIVE_LOCK_KEY)
+    archive_old_chat_logs()
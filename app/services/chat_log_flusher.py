@@ -0,0 +1,125 @@
+"""
+채팅 로그 백그라운드 flusher: Redis Stream(chat_logs_stream)에 쌓인 채팅 로그를 MySQL로 옮깁니다.
+
+요청 경로(add_chat_to_cache)는 Redis에 XADD만 하고, DB 저장은 이 작업이 맡습니다.
+- 크기 조건: 아직 읽지 않은 로그가 CHAT_LOG_FLUSH_THRESHOLD개 이상
+- 시간 조건: 가장 오래된 미저장 로그가 CHAT_LOG_FLUSH_MAX_DELAY초 이상 대기
+  (실패해 pending으로 남은 로그가 있으면 같은 주기로 재시도하여 XAUTOCLAIM/dead-letter 처리가 진행되게 함)
+- 리더 1개: 워커마다 작업이 돌지만 Redis 잠금을 잡은 워커만 flush합니다. 리더가 죽으면
+  잠금이 CHAT_LOG_FLUSHER_LEADER_TTL 후 만료되어 다른 워커가 이어받습니다.
+- 지표: chat_log.flush_lag_ms(가장 오래된 로그의 대기 시간), chat_log.flush_batch_size,
+  chat_log.flush_ms, chat_log.flushed, chat_log.flush_error
+"""
+import os
+import time
+import uuid
+import asyncio
+from typing import Dict, Optional
+
+from app.core import metrics
+from app.db.redis_conn import get_async_redis_conn
+from app.services.chat_log_service import (
+    chat_log_service, CHAT_LOG_STREAM_KEY, CHAT_LOG_CONSUMER_GROUP, CHAT_LOG_REDIS_KEY, CHAT_LOG_FLUSH_THRESHOLD
+)
+
+CHAT_LOG_FLUSH_POLL_INTERVAL = float(os.getenv("CHAT_LOG_FLUSH_POLL_INTERVAL", 1.0))  # 조건 확인 주기(초)
+CHAT_LOG_FLUSH_MAX_DELAY = float(os.getenv("CHAT_LOG_FLUSH_MAX_DELAY", 30))  # 로그가 Redis에 머무는 최대 시간(초)
+CHAT_LOG_FLUSHER_LEADER_TTL = int(os.getenv("CHAT_LOG_FLUSHER_LEADER_TTL", 15))
+CHAT_LOG_FLUSHER_LEADER_KEY = "chat_log_flusher:leader"
+
+
+def _entry_time_ms(entry_id: str) -> int:
+    """스트림 ID("<ms>-<seq>")의 추가 시각"""
+    return int(entry_id.split("-", 1)[0])
+
+
+class ChatLogFlusher:
+    def __init__(self):
+        self.token = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+        self._last_flush = time.monotonic()
+        self._group_ready = False
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """작업을 멈추고, 남은 로그를 한 번 저장한 뒤 리더 잠금을 놓습니다. (앱 종료 시)"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(chat_log_service.flush_chat_logs_from_cache_to_db)
+        try:
+            redis_conn = get_async_redis_conn()
+            if await redis_conn.get(CHAT_LOG_FLUSHER_LEADER_KEY) == self.token:
+                await redis_conn.delete(CHAT_LOG_FLUSHER_LEADER_KEY)
+        except Exception as e:
+            print(f"[ChatLogFlusher] 리더 잠금 해제 실패: {e}")
+
+    async def _is_leader(self) -> bool:
+        redis_conn = get_async_redis_conn()
+        if await redis_conn.get(CHAT_LOG_FLUSHER_LEADER_KEY) == self.token:
+            await redis_conn.expire(CHAT_LOG_FLUSHER_LEADER_KEY, CHAT_LOG_FLUSHER_LEADER_TTL)
+            return True
+        return bool(await redis_conn.set(
+            CHAT_LOG_FLUSHER_LEADER_KEY, self.token, nx=True, ex=CHAT_LOG_FLUSHER_LEADER_TTL
+        ))
+
+    async def buffer_status(self) -> Dict:
+        """
+        unread: 아직 어떤 flusher도 읽지 않은 로그 수 (CHAT_LOG_FLUSH_THRESHOLD까지만 셈)
+        lag_ms: 그중 가장 오래된 로그의 대기 시간, pending: 읽었지만 저장이 확인되지 않은 로그 수
+        """
+        redis_conn = get_async_redis_conn()
+        groups = await redis_conn.xinfo_groups(CHAT_LOG_STREAM_KEY)
+        group = next((g for g in groups if g["name"] == CHAT_LOG_CONSUMER_GROUP), None)
+        last_delivered = group["last-delivered-id"] if group else "0-0"
+        pipe = redis_conn.pipeline()
+        pipe.xrange(CHAT_LOG_STREAM_KEY, min=f"({last_delivered}", max="+", count=CHAT_LOG_FLUSH_THRESHOLD)
+        pipe.llen(CHAT_LOG_REDIS_KEY)
+        unread, legacy = await pipe.execute()
+        lag_ms = time.time() * 1000 - _entry_time_ms(unread[0][0]) if unread else 0.0
+        return {
+            "unread": len(unread) + legacy,
+            "lag_ms": max(lag_ms, 0.0),
+            "pending": group["pending"] if group else 0,
+        }
+
+    def _is_due(self, status: Dict) -> bool:
+        if status["unread"] >= CHAT_LOG_FLUSH_THRESHOLD:
+            return True
+        if status["unread"] and status["lag_ms"] >= CHAT_LOG_FLUSH_MAX_DELAY * 1000:
+            return True
+        return bool(status["pending"]) and time.monotonic() - self._last_flush >= CHAT_LOG_FLUSH_MAX_DELAY
+
+    async def _tick(self):
+        if not await self._is_leader():
+            return
+        if not self._group_ready:
+            await asyncio.to_thread(chat_log_service.ensure_consumer_group)
+            self._group_ready = True
+        status = await self.buffer_status()
+        if not self._is_due(status):
+            return
+        metrics.observe("chat_log.flush_lag_ms", status["lag_ms"])
+        with metrics.timer("chat_log.flush_ms"):
+            await asyncio.to_thread(chat_log_service.flush_chat_logs_from_cache_to_db)
+        self._last_flush = time.monotonic()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._group_ready = False  # 스트림이 지워졌으면 다음 주기에 그룹을 다시 만듦
+                metrics.incr("chat_log.flush_error")
+                print(f"[ChatLogFlusher] flush 실패: {e}")
+            await asyncio.sleep(CHAT_LOG_FLUSH_POLL_INTERVAL)
+
+
+# 워커당 하나의 flusher
+chat_log_flusher = ChatLogFlusher()
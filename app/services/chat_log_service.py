@@ -1,74 +1,369 @@
+import os
 import json
-from typing import List, Dict
+import socket
+import asyncio
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
 import redis
-from app.db.redis_conn import get_redis_conn
+from app.core import metrics
+from app.db.redis_conn import get_redis_conn, get_async_redis_conn
 from app.db.database import SessionLocal
-from app.crud import chat_log_crud, user_crud, manuals_crud
+from app.crud import chat_log_crud
+from app.services import id_resolver
+
+# Buffered chat logs live in a Redis Stream read through a consumer group:
+# entries are acknowledged (XACK + XDEL) only after the DB commit, entries left pending by a crashed
+# or failed flush are reclaimed (XAUTOCLAIM) once idle, and entries that keep failing go to a dead-letter stream.
+CHAT_LOG_STREAM_KEY = "chat_logs_stream"
+CHAT_LOG_CONSUMER_GROUP = "chat_log_flushers"
+CHAT_LOG_DEAD_LETTER_KEY = "chat_logs_dead_letter"
+CHAT_LOG_REDIS_KEY = "chat_logs_buffer"  # Legacy list buffer, drained into the stream on flush
+CHAT_LOG_FLUSH_THRESHOLD = int(os.getenv("CHAT_LOG_FLUSH_THRESHOLD", 10))  # Flusher persists once this many are buffered
+CHAT_LOG_FLUSH_BATCH_SIZE = int(os.getenv("CHAT_LOG_FLUSH_BATCH_SIZE", 500))  # Rows per INSERT/transaction
+CHAT_LOG_CLAIM_IDLE_MS = int(os.getenv("CHAT_LOG_CLAIM_IDLE_MS", 60_000))  # Reclaim entries pending this long
+CHAT_LOG_MAX_DELIVERIES = int(os.getenv("CHAT_LOG_MAX_DELIVERIES", 5))  # Then move them to the dead-letter stream
+
+# Per-experiment tail of the most recent messages (flushed or not), so "continue" reads can skip MySQL.
+# The ":seeded" marker means the tail was filled from the full history, i.e. a short tail is the whole conversation.
+CHAT_LOG_TAIL_KEY_PREFIX = "chat_log_tail"
+CHAT_LOG_TAIL_SIZE = int(os.getenv("CHAT_LOG_TAIL_SIZE", 50))
+CHAT_LOG_TAIL_TTL = int(os.getenv("CHAT_LOG_TAIL_TTL", 60 * 60 * 24))
+CHAT_LOG_DEDUP_WINDOW_SECONDS = 1  # MySQL DATETIME drops/rounds the microseconds of the buffered timestamp
+
+StreamEntry = Tuple[str, Dict[str, str]]
+
+
+def _tail_keys(experiment_id: int) -> Tuple[str, str]:
+    base = f"{CHAT_LOG_TAIL_KEY_PREFIX}:{experiment_id}"
+    return base, f"{base}:seeded"
+
+
+def _to_out(log: Dict) -> Dict:
+    """Shapes a buffered entry or a DB row dict like ChatLogOut (buffered entries have no id yet)."""
+    created_at = log.get("created_at")
+    return {
+        "id": log.get("id"),
+        "sender": log.get("sender"),
+        "message": log.get("message"),
+        "created_at": datetime.fromisoformat(created_at) if isinstance(created_at, str) else created_at,
+    }
+
+
+def _row_to_out(row) -> Dict:
+    return {"id": row.id, "sender": row.sender, "message": row.message, "created_at": row.created_at}
+
+
+def _merge(rows: List[Dict], buffered: List[Dict]) -> List[Dict]:
+    """
+    Merges DB rows with buffered entries in time order. A buffered entry that was already committed
+    (the flusher has not acknowledged it yet) matches a row with the same sender and message
+    within CHAT_LOG_DEDUP_WINDOW_SECONDS and is dropped.
+    """
+    committed: Dict[Tuple, List[datetime]] = {}
+    for row in rows:
+        committed.setdefault((row["sender"], row["message"]), []).append(row["created_at"])
+    merged = list(rows)
+    for log in buffered:
+        times = committed.get((log["sender"], log["message"]), [])
+        if any(abs((log["created_at"] - t).total_seconds()) <= CHAT_LOG_DEDUP_WINDOW_SECONDS for t in times if t):
+            continue
+        merged.append(log)
+    return sorted(merged, key=lambda log: (log["created_at"] or datetime.min, log["id"] is None, log["id"] or 0))
 
-CHAT_LOG_REDIS_KEY = "chat_logs_buffer"
-CHAT_LOG_FLUSH_THRESHOLD = 10  # Persist to DB every 10 messages
 
 class ChatLogService:
     def __init__(self):
         self.redis_conn = get_redis_conn()
 
+    @staticmethod
+    def _build_log_entry(experiment_id: int, db_user_id, db_manual_id, sender: str, message: str) -> Dict:
+        return {
+            "experiment_id": experiment_id,
+            "user_id": db_user_id,
+            "manual_id": db_manual_id,
+            "sender": sender,
+            "message": message,
+            # Buffer time, so rows flushed together keep their real order
+            "created_at": datetime.utcnow().isoformat()
+        }
+
+    def _consumer_name(self) -> str:
+        return f"{socket.gethostname()}-{os.getpid()}"
+
+    def ensure_consumer_group(self):
+        try:
+            self.redis_conn.xgroup_create(CHAT_LOG_STREAM_KEY, CHAT_LOG_CONSUMER_GROUP, id="0", mkstream=True)
+        except redis.exceptions.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @staticmethod
+    def _append(pipe, experiment_id: int, data: str):
+        """Queues the stream append and the per-experiment tail update on a (sync or async) pipeline."""
+        tail_key, seeded_key = _tail_keys(experiment_id)
+        pipe.xadd(CHAT_LOG_STREAM_KEY, {"data": data})
+        pipe.rpush(tail_key, data)
+        pipe.ltrim(tail_key, -CHAT_LOG_TAIL_SIZE, -1)
+        pipe.expire(tail_key, CHAT_LOG_TAIL_TTL)
+        pipe.expire(seeded_key, CHAT_LOG_TAIL_TTL)
+
     def add_chat_to_cache(self, experiment_id: int, user_id: str, manual_id: str, sender: str, message: str):
-        """Adds a chat message to the Redis cache and checks if it needs to be flushed."""
+        """
+        Adds a chat message to the Redis stream.
+        Persisting to the DB is left to the background flusher (chat_log_flusher), so requests never wait on MySQL.
+        """
+        # Convert string IDs to integer primary keys (cached, so MySQL is only hit on the first message)
+        log_entry = self._build_log_entry(experiment_id, id_resolver.resolve("user", user_id),
+                                          id_resolver.resolve("manual", manual_id), sender, message)
+        pipe = self.redis_conn.pipeline()
+        self._append(pipe, experiment_id, json.dumps(log_entry))
+        pipe.execute()
+
+    async def add_chat_to_cache_async(self, experiment_id: int, user_id: str, manual_id: str, sender: str, message: str):
+        """
+        Async variant for the event loop: IDs come from the resolution cache (a cache miss queries MySQL
+        in a worker thread) and the Redis append uses the async client.
+        """
+        db_user_id, db_manual_id = await asyncio.gather(
+            id_resolver.aresolve("user", user_id), id_resolver.aresolve("manual", manual_id)
+        )
+        log_entry = self._build_log_entry(experiment_id, db_user_id, db_manual_id, sender, message)
+        pipe = get_async_redis_conn().pipeline()
+        self._append(pipe, experiment_id, json.dumps(log_entry))
+        await pipe.execute()
+
+    def _migrate_legacy_buffer(self):
+        """Moves entries left in the old list buffer into the stream (at-least-once: copy, then trim)."""
+        legacy = self.redis_conn.lrange(CHAT_LOG_REDIS_KEY, 0, CHAT_LOG_FLUSH_BATCH_SIZE - 1)
+        if not legacy:
+            return
+        pipe = self.redis_conn.pipeline()
+        for raw in legacy:
+            pipe.xadd(CHAT_LOG_STREAM_KEY, {"data": raw})
+        pipe.ltrim(CHAT_LOG_REDIS_KEY, len(legacy), -1)
+        pipe.execute()
+        print(f"Moved {len(legacy)} chat logs from the legacy list buffer to the stream.")
+
+    def _acknowledge(self, entry_ids: List[str]):
+        if not entry_ids:
+            return
+        pipe = self.redis_conn.pipeline()
+        pipe.xack(CHAT_LOG_STREAM_KEY, CHAT_LOG_CONSUMER_GROUP, *entry_ids)
+        pipe.xdel(CHAT_LOG_STREAM_KEY, *entry_ids)
+        pipe.execute()
+
+    def _dead_letter(self, entries: List[StreamEntry], reason: str):
+        if not entries:
+            return
+        pipe = self.redis_conn.pipeline()
+        for entry_id, fields in entries:
+            pipe.xadd(CHAT_LOG_DEAD_LETTER_KEY, {"data": fields.get("data", ""), "source_id": entry_id, "reason": reason})
+        pipe.execute()
+        self._acknowledge([entry_id for entry_id, _ in entries])
+        metrics.incr("chat_log.dead_lettered", len(entries))
+        print(f"Moved {len(entries)} chat logs to {CHAT_LOG_DEAD_LETTER_KEY}: {reason}")
+
+    def _reclaim_stale(self, consumer: str) -> List[StreamEntry]:
+        """Claims entries another (crashed) consumer or a failed flush left pending for CHAT_LOG_CLAIM_IDLE_MS."""
+        _, claimed, *_ = self.redis_conn.xautoclaim(
+            CHAT_LOG_STREAM_KEY, CHAT_LOG_CONSUMER_GROUP, consumer,
+            min_idle_time=CHAT_LOG_CLAIM_IDLE_MS, start_id="0-0", count=CHAT_LOG_FLUSH_BATCH_SIZE
+        )
+        claimed = [(entry_id, fields) for entry_id, fields in claimed if fields]
+        if not claimed:
+            return []
+        metrics.incr("chat_log.reclaimed", len(claimed))
+
+        pipe = self.redis_conn.pipeline()
+        for entry_id, _ in claimed:
+            pipe.xpending_range(CHAT_LOG_STREAM_KEY, CHAT_LOG_CONSUMER_GROUP, min=entry_id, max=entry_id, count=1)
+        deliveries = {
+            info[0]["message_id"]: info[0]["times_delivered"] for info in pipe.execute() if info
+        }
+        exhausted = [entry for entry in claimed if deliveries.get(entry[0], 0) > CHAT_LOG_MAX_DELIVERIES]
+        self._dead_letter(exhausted, f"failed {CHAT_LOG_MAX_DELIVERIES} deliveries")
+        return [entry for entry in claimed if deliveries.get(entry[0], 0) <= CHAT_LOG_MAX_DELIVERIES]
+
+    def _persist(self, entries: List[StreamEntry]) -> int:
+        """
+        Inserts the entries in one batch and acknowledges them after the commit.
+        If the batch fails, rows are retried one by one so a single bad row does not hold back the rest;
+        rows that still fail stay pending and are retried (then dead-lettered) via _reclaim_stale.
+        """
+        logs, malformed = [], []
+        for entry_id, fields in entries:
+            try:
+                logs.append((entry_id, json.loads(fields["data"])))
+            except (KeyError, ValueError):
+                malformed.append((entry_id, fields))
+        self._dead_letter(malformed, "malformed entry")
+        if not logs:
+            return 0
+
+        metrics.observe("chat_log.flush_batch_size", len(logs))
         db = SessionLocal()
         try:
-            # Convert string IDs to integer primary keys
-            user = user_crud.get_user_by_id(db, user_id=user_id)
-            db_user_id = user.id if user else None
-            if db_user_id is None:
-                print(f"Warning: User with user_id '{user_id}' not found.")
-
-            manual = manuals_crud.get_manual_by_manual_id(db, manual_id=manual_id)
-            db_manual_id = manual.id if manual else None
-            
-            if db_manual_id is None:
-                print(f"Warning: Manual with manual_id '{manual_id}' not found. Storing chat log with manual_id=NULL.")
-
-            log_entry = {
-                "experiment_id": experiment_id,
-                "user_id": db_user_id,
-                "manual_id": db_manual_id,
-                "sender": sender,
-                "message": message
-            }
-            print("rpush", log_entry)
-            result = self.redis_conn.rpush(CHAT_LOG_REDIS_KEY, json.dumps(log_entry))
-            print("rpush result", result)
-            
-            if self.redis_conn.llen(CHAT_LOG_REDIS_KEY) >= CHAT_LOG_FLUSH_THRESHOLD:
-                print("flush_chat_logs_from_cache_to_db")
-                self.flush_chat_logs_from_cache_to_db()
+            try:
+                chat_log_crud.create_chat_log_batch(db, [log for _, log in logs])
+                self._acknowledge([entry_id for entry_id, _ in logs])
+                return len(logs)
+            except Exception as e:
+                print(f"Batch insert of {len(logs)} chat logs failed, retrying row by row: {e}")
+            persisted = []
+            for entry_id, log in logs:
+                try:
+                    chat_log_crud.create_chat_log_batch(db, [log])
+                    persisted.append(entry_id)
+                except Exception as e:
+                    metrics.incr("chat_log.flush_error")
+                    print(f"Error flushing chat log {entry_id} to DB (left pending): {e}")
+            self._acknowledge(persisted)
+            return len(persisted)
         finally:
             db.close()
 
-    def flush_chat_logs_from_cache_to_db(self):
-        """Flushes chat logs from Redis to the main database."""
+    def flush_chat_logs_from_cache_to_db(self) -> int:
+        """
+        Flushes chat logs from the Redis stream to the main database and returns the number of rows written.
+        Safe to run from several workers at once: the consumer group hands each entry to one consumer.
+        """
+        try:
+            self.ensure_consumer_group()
+            self._migrate_legacy_buffer()
+            consumer = self._consumer_name()
+            flushed = self._persist(self._reclaim_stale(consumer))
+            while True:
+                response = self.redis_conn.xreadgroup(
+                    CHAT_LOG_CONSUMER_GROUP, consumer, {CHAT_LOG_STREAM_KEY: ">"}, count=CHAT_LOG_FLUSH_BATCH_SIZE
+                )
+                entries = response[0][1] if response else []
+                if not entries:
+                    break
+                flushed += self._persist(entries)
+            if flushed:
+                metrics.incr("chat_log.flushed", flushed)
+                print(f"Flushed {flushed} chat logs from Redis to DB.")
+            return flushed
+        except Exception as e:
+            metrics.incr("chat_log.flush_error")
+            print(f"Error flushing chat logs to DB: {e}")
+            return 0
+
+    def get_buffered_logs(self, experiment_id: int) -> List[Dict]:
+        """
+        Entries for the experiment that are still in the stream (not yet acknowledged by the flusher).
+        The flusher keeps the stream short, so a full XRANGE is cheap.
+        """
+        try:
+            entries = self.redis_conn.xrange(CHAT_LOG_STREAM_KEY)
+        except Exception as e:
+            print(f"Error reading buffered chat logs (serving DB history only): {e}")
+            return []
+        buffered = []
+        for _, fields in entries:
+            try:
+                log = json.loads(fields["data"])
+            except (KeyError, ValueError):
+                continue
+            # Session state restored from Redis may carry the id as a string
+            if str(log.get("experiment_id")) == str(experiment_id):
+                buffered.append(_to_out(log))
+        return buffered
+
+    def get_chat_history(self, db, experiment_id: int, limit: int = 100,
+                         before: Optional[int] = None, after: Optional[int] = None) -> List[Dict]:
+        """
+        One page of the conversation (see chat_log_crud.load_chat_logs for the cursors).
+        Pages that reach the newest end also include the still-buffered Redis entries.
+        """
+        rows = [_row_to_out(row) for row in chat_log_crud.load_chat_logs(db, experiment_id, limit, before, after)]
+        if before is not None or (after is not None and len(rows) >= limit):
+            return rows
+        if after is not None and not rows and chat_log_crud.get_chat_log_cursor(db, experiment_id, after) is None:
+            return []  # Unknown cursor
+        merged = _merge(rows, self.get_buffered_logs(experiment_id))
+        return merged[:limit] if after is not None else merged[-limit:]
+
+    def get_recent_chat_history(self, db, experiment_id: int, limit: int = 10,
+                                before: Optional[int] = None) -> List[Dict]:
+        """
+        The latest `limit` messages. Served from the experiment's Redis tail when it is long enough
+        (or seeded from the full history) and its id-less entries are still buffered; otherwise read
+        from MySQL + the stream and used to seed the tail.
+        Older pages (before=<chat log id>) are read from MySQL.
+        """
+        if before is not None:
+            return [_row_to_out(row) for row in chat_log_crud.continue_chat_logs(db, experiment_id, limit, before)]
+        tail_key, seeded_key = _tail_keys(experiment_id)
         try:
             pipe = self.redis_conn.pipeline()
-            pipe.lrange(CHAT_LOG_REDIS_KEY, 0, -1)
-            pipe.delete(CHAT_LOG_REDIS_KEY)
-            logs_json, _ = pipe.execute()
+            pipe.lrange(tail_key, -limit, -1)
+            pipe.exists(seeded_key)
+            tail, seeded = pipe.execute()
+            if limit <= CHAT_LOG_TAIL_SIZE and (len(tail) >= limit or seeded) and self._tail_ids_current(tail):
+                metrics.incr("chat_log.tail_hit")
+                return [_to_out(json.loads(raw)) for raw in tail]
+        except Exception as e:
+            print(f"Error reading chat log tail for experiment {experiment_id}: {e}")
+        metrics.incr("chat_log.tail_miss")
 
-            if not logs_json:
-                print("No chat logs in Redis cache to flush.")
-                return
+        rows = [_row_to_out(row) for row in
+                chat_log_crud.continue_chat_logs(db, experiment_id, limit=max(limit, CHAT_LOG_TAIL_SIZE))]
+        merged = _merge(rows, self.get_buffered_logs(experiment_id))
+        if limit <= CHAT_LOG_TAIL_SIZE:
+            self._seed_tail(experiment_id, merged[-CHAT_LOG_TAIL_SIZE:])
+        return merged[-limit:]
 
-            logs_to_db = [json.loads(log) for log in logs_json]
-            
-            db = SessionLocal()
+    def _tail_ids_current(self, tail: List[str]) -> bool:
+        """
+        Tail entries appended by add_chat_to_cache have no id. They are only served while still buffered;
+        once flushed, the tail is re-seeded from MySQL so every message carries the id clients page with.
+        """
+        key = lambda log: (log.get("sender"), log.get("message"), log.get("created_at"))
+        unflushed = {key(log) for log in map(json.loads, tail) if log.get("id") is None}
+        if not unflushed:
+            return True
+        buffered = set()
+        for _, fields in self.redis_conn.xrange(CHAT_LOG_STREAM_KEY):
             try:
-                for log in logs_to_db:
-                    chat_log_crud.create_chat_log(db, log)
-                print(f"Flushed {len(logs_to_db)} chat logs from Redis to DB.")
-            finally:
-                db.close()
+                buffered.add(key(json.loads(fields["data"])))
+            except (KeyError, ValueError):
+                continue
+        return unflushed <= buffered
 
+    def clear_tails(self, experiment_ids):
+        """
+        Drops the tails (and ":seeded" markers) of experiments whose stored rows were deleted or archived,
+        so they are not served until the TTL runs out; the next read re-seeds from MySQL.
+        """
+        keys = [key for experiment_id in set(experiment_ids) for key in _tail_keys(experiment_id)]
+        if not keys:
+            return
+        try:
+            self.redis_conn.delete(*keys)
         except Exception as e:
-            print(f"Error flushing chat logs to DB: {e}")
+            print(f"Error clearing chat log tails: {e}")
+
+    def _seed_tail(self, experiment_id: int, logs: List[Dict]):
+        """Replaces the tail with `logs` unless a message was appended meanwhile (WATCH)."""
+        tail_key, seeded_key = _tail_keys(experiment_id)
+        try:
+            with self.redis_conn.pipeline() as pipe:
+                pipe.watch(tail_key)
+                pipe.multi()
+                pipe.delete(tail_key)
+                if logs:
+                    pipe.rpush(tail_key, *[
+                        json.dumps({**log, "created_at": log["created_at"].isoformat() if log["created_at"] else None})
+                        for log in logs
+                    ])
+                    pipe.expire(tail_key, CHAT_LOG_TAIL_TTL)
+                pipe.set(seeded_key, 1, ex=CHAT_LOG_TAIL_TTL)
+                pipe.execute()
+        except redis.exceptions.WatchError:
+            pass  # A newer message arrived; the next read seeds again
+        except Exception as e:
+            print(f"Error seeding chat log tail for experiment {experiment_id}: {e}")
 
 # Create a singleton instance
-chat_log_service = ChatLogService() 
\ No newline at end of file
+chat_log_service = ChatLogService()
@@ -0,0 +1,103 @@
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core import metrics
+
+# 세션당 처리 대기 중인 메시지 상한 (넘으면 새 메시지를 거절)
+WS_SESSION_QUEUE_SIZE = int(os.getenv("WS_SESSION_QUEUE_SIZE", 4))
+# 답변 생성 중 새 메시지가 오면 진행 중인 턴을 취소할지 (메시지의 "interrupt" 필드로 덮어쓸 수 있음)
+WS_INTERRUPT_ON_NEW_MESSAGE = os.getenv("WS_INTERRUPT_ON_NEW_MESSAGE", "true").lower() == "true"
+
+TurnHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+CancelHandler = Callable[[Dict[str, Any], str], Awaitable[None]]
+ErrorHandler = Callable[[Dict[str, Any], BaseException], Awaitable[None]]
+
+
+class TurnRunner:
+    """
+    WebSocket 세션 하나의 턴 실행기.
+    메시지를 순서대로 하나씩 처리하되, 각 턴은 별도 작업으로 실행되어 언제든 취소할 수 있습니다.
+    - 새 메시지(interrupt): 진행 중인 턴과 대기 중인 메시지를 취소하고 새 메시지를 처리
+    - 연결 종료(close): 진행 중인 LLM/검색 작업을 모두 취소
+    - 대기열이 가득 차면 submit이 False를 반환 (호출 측이 거절 응답)
+    """
+
+    def __init__(self, handle_turn: TurnHandler, on_cancelled: CancelHandler, on_error: ErrorHandler,
+                 queue_size: int = WS_SESSION_QUEUE_SIZE):
+        self.handle_turn = handle_turn
+        self.on_cancelled = on_cancelled
+        self.on_error = on_error
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.current: Optional[asyncio.Task] = None
+        self.current_data: Optional[Dict[str, Any]] = None
+        self._cancel_reason: Optional[str] = None
+        self._worker = asyncio.create_task(self._work())
+
+    @property
+    def busy(self) -> bool:
+        return self.current is not None and not self.current.done()
+
+    async def submit(self, data: Dict[str, Any]) -> bool:
+        interrupt = data.get("interrupt")
+        if interrupt is None:
+            interrupt = WS_INTERRUPT_ON_NEW_MESSAGE
+        if interrupt:
+            await self._drop_pending("superseded")
+            self.cancel_current("superseded")
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            metrics.incr("chat.turn.rejected")
+            return False
+        return True
+
+    def cancel_current(self, reason: str) -> bool:
+        if not self.busy:
+            return False
+        self._cancel_reason = reason
+        self.current.cancel()
+        return True
+
+    async def _drop_pending(self, reason: str) -> List[Dict[str, Any]]:
+        dropped = []
+        while not self.queue.empty():
+            dropped.append(self.queue.get_nowait())
+        for data in dropped:
+            metrics.incr(f"chat.turn.cancelled.{reason}")
+            await self.on_cancelled(data, reason)
+        return dropped
+
+    async def _work(self):
+        while True:
+            data = await self.queue.get()
+            self.current_data = data
+            self._cancel_reason = None
+            self.current = asyncio.create_task(self.handle_turn(data))
+            # 자식 작업이 취소되어도 실행기는 계속 돌도록 결과를 wait로 기다림
+            await asyncio.wait({self.current})
+            task, reason = self.current, self._cancel_reason
+            self.current, self.current_data = None, None
+            try:
+                if task.cancelled():
+                    metrics.incr(f"chat.turn.cancelled.{reason or 'unknown'}")
+                    if reason != "disconnect":
+                        await self.on_cancelled(data, reason or "cancelled")
+                elif task.exception() is not None:
+                    await self.on_error(data, task.exception())
+            except Exception as e:
+                # 알림 전송 실패(연결이 이미 끊긴 경우 등)로 실행기가 멈추지 않도록
+                print(f"[TurnRunner] 턴 결과 알림 실패: {e}")
+
+    async def close(self):
+        """연결 종료: 진행 중인 턴과 대기 중인 메시지를 버리고 실행기를 멈춤"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            metrics.incr("chat.turn.cancelled.disconnect")
+        current = self.current
+        self.cancel_current("disconnect")
+        self._worker.cancel()
+        pending = [t for t in (current, self._worker) if t is not None]
+        await asyncio.gather(*pending, return_exceptions=True)
+        if current is not None and current.cancelled():
+            metrics.incr("chat.turn.cancelled.disconnect")
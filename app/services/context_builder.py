@@ -0,0 +1,247 @@
+"""
+검색된 매뉴얼 청크를 프롬프트용 컨텍스트로 정리합니다. (채팅, query_manual, 분석기, 요약 공용)
+
+1. 상용구 제거: 쪽 번호, 마크다운 기호, 비전 모델 설명의 인사말 같은 정보 없는 줄
+2. 겹침 제거: 청크 분할 시 이웃 청크와 겹치는 구간(chunk_overlap=200), 여러 청크에 반복되는 머리글,
+   이미 나온 문장과 같은 문장
+3. 예산 맞추기: 남은 문장의 토큰 수가 token_budget 이하이면 모두 사용하고,
+   넘으면 질의와 겹치는 문장 → 그 앞뒤 문장 → 나머지 순서로 예산이 찰 때까지 채웁니다.
+   선택된 문장은 원래 순서대로 이어 붙이고, 생략된 구간은 " … "로 표시합니다.
+"""
+import os
+import re
+import math
+from collections import Counter
+from typing import List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from app.core import metrics
+from app.core.tokens import count_tokens
+from app.services.lexical_index import tokenize
+
+# 채팅/질의 응답 프롬프트에 넣는 매뉴얼 발췌의 토큰 상한
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+# 분석기·요약처럼 여러 청크를 한 번에 넣는 프롬프트의 토큰 상한
+ANALYSIS_CONTEXT_TOKEN_BUDGET = int(os.getenv("ANALYSIS_CONTEXT_TOKEN_BUDGET", 4000))
+
+# 위험/안전 분석기에서 문장 선택에 쓰는 질의
+RISK_QUERY = "위험 주의 경고 안전 수칙 금지 보호장비 장갑 보안경 환기 화재 폭발 독성 부식 유해 응급 폐기"
+
+EMPTY_CONTEXT = "관련 문서를 찾을 수 없습니다."
+GAP_MARKER = " … "
+
+_MIN_OVERLAP_CHARS = 30  # 이보다 짧은 일치는 우연으로 보고 겹침으로 치지 않음
+_MAX_OVERLAP_CHARS = 400  # 청크 분할 겹침(200자) + 공백 차이 여유
+_MIN_DEDUP_CHARS = 10  # 이보다 짧은 문장(번호, 단위 등)은 반복되어도 지우지 않음
+_MAX_HEADER_CHARS = 80
+
+_SPACES = re.compile(r"\s+")
+_UNIT_BREAK = re.compile(r"(?<=[.!?。])\s+|\n+")
+_BOILERPLATE_LINES = [
+    re.compile(r"^\s*[-–—]?\s*\d{1,4}\s*[-–—]?\s*$"),  # 쪽 번호 "- 12 -"
+    re.compile(r"^\s*\d{1,4}\s*/\s*\d{1,4}\s*$"),  # "3 / 20"
+    re.compile(r"^\s*(page|p\.)\s*\d+\s*$", re.IGNORECASE),
+    re.compile(r"^\s*[-=_*#]{3,}\s*$"),  # 구분선
+    # 비전 모델 설명 앞뒤의 인사말 (내용 없음)
+    re.compile(r"^\s*(네|물론입니다|알겠습니다)[,.!]?\s*$"),
+    re.compile(r"^\s*(다음은|아래는|이미지를).{0,30}(설명|묘사)(입니다|합니다|드리겠습니다|해 드리겠습니다)[.:]?\s*$"),
+]
+_MARKDOWN = re.compile(r"\*\*|__|^#{1,6}\s*", re.MULTILINE)
+
+
+def _normalize(text: str) -> str:
+    return _SPACES.sub(" ", text).strip()
+
+
+def _strip_boilerplate(text: str) -> str:
+    text = _MARKDOWN.sub("", text)
+    lines = [line for line in text.splitlines() if not any(p.match(line) for p in _BOILERPLATE_LINES)]
+    return "\n".join(lines).strip()
+
+
+def _overlap_length(left: str, right: str) -> int:
+    """left의 끝부분과 right의 앞부분이 겹치는 길이 (공백은 그대로 비교)"""
+    tail = left[-_MAX_OVERLAP_CHARS:]
+    probe = right[:_MIN_OVERLAP_CHARS]
+    if len(probe) < _MIN_OVERLAP_CHARS:
+        return 0
+    start = tail.find(probe)
+    while start != -1:
+        length = len(tail) - start
+        if right.startswith(tail[start:]):
+            return length
+        start = tail.find(probe, start + 1)
+    return 0
+
+
+def _position(doc: Document) -> Tuple:
+    meta = doc.metadata or {}
+    return (meta.get("page_num", meta.get("page", 0)) or 0, meta.get("chunk_idx", 0) or 0)
+
+
+def _remove_overlaps(texts: List[str]) -> List[str]:
+    """앞서 나온 청크와 겹치는 앞/뒤 구간을 잘라 냅니다. (검색 순위 순서와 문서 순서가 달라도 양방향 비교)"""
+    kept: List[str] = []
+    for text in texts:
+        for previous in kept:
+            if not text:
+                break
+            cut = _overlap_length(previous, text)
+            if cut:
+                text = text[cut:].lstrip()
+            cut = _overlap_length(text, previous)
+            if cut:
+                text = text[:-cut].rstrip()
+        kept.append(text)
+    return kept
+
+
+def _remove_repeated_lines(texts: List[str]) -> List[str]:
+    """여러 청크에 반복되는 짧은 줄(머리글/바닥글)은 처음 한 번만 남깁니다."""
+    seen: Set[str] = set()
+    cleaned = []
+    for text in texts:
+        lines = []
+        for line in text.splitlines():
+            key = _normalize(line)
+            if key and len(key) <= _MAX_HEADER_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line)
+        cleaned.append("\n".join(lines).strip())
+    return cleaned
+
+
+class _Unit:
+    """컨텍스트 선택 단위 (문장 또는 줄)"""
+    __slots__ = ("doc", "index", "position", "start", "end", "text", "tokens", "score")
+
+    def __init__(self, doc: int, position: int, start: int, end: int, text: str):
+        # index: 중복 제거 후 순번, position: 원문에서의 순번 (사이에 지운 문장이 있으면 이어 붙이지 않음)
+        self.doc, self.index, self.position = doc, position, position
+        self.start, self.end, self.text = start, end, text
+        self.tokens = count_tokens(text)
+        self.score = 0.0
+
+
+def _split_units(doc: int, text: str) -> List[_Unit]:
+    units, start = [], 0
+    for match in list(_UNIT_BREAK.finditer(text)) + [None]:
+        end = match.start() if match else len(text)
+        if text[start:end].strip():
+            units.append(_Unit(doc, len(units), start, end, text[start:end].strip()))
+        if match:
+            start = match.end()
+    return units
+
+
+def _score_units(units: List[_Unit], query: str):
+    """질의어(BM25와 같은 토큰)와 겹치는 정도를 IDF 가중치로 점수화"""
+    query_terms = set(tokenize(query or ""))
+    if not query_terms:
+        return
+    matches = [set(tokenize(unit.text)) & query_terms for unit in units]
+    df = Counter(term for terms in matches for term in terms)
+    idf = {term: math.log(1 + len(units) / count) for term, count in df.items()}
+    for unit, terms in zip(units, matches):
+        unit.score = sum(idf[term] for term in terms)
+
+
+def _select(doc_units: List[List[_Unit]], token_budget: int) -> Set[Tuple[int, int]]:
+    units = [unit for units in doc_units for unit in units]
+    matched = sorted((u for u in units if u.score > 0), key=lambda u: (-u.score, u.doc, u.index))
+    neighbors = []
+    for unit in matched:
+        siblings = doc_units[unit.doc]
+        neighbors.extend(siblings[i] for i in (unit.index - 1, unit.index + 1) if 0 <= i < len(siblings))
+
+    selected: Set[Tuple[int, int]] = set()
+    used = 0
+    for unit in matched + neighbors + units:
+        key = (unit.doc, unit.index)
+        if key in selected or used + unit.tokens > token_budget:
+            continue
+        selected.add(key)
+        used += unit.tokens
+    return selected
+
+
+def _render(text: str, units: List[_Unit], selected: Set[Tuple[int, int]]) -> str:
+    """선택된 문장을 원문 그대로(연속 구간은 원래 줄바꿈 포함) 이어 붙입니다."""
+    pieces, run, previous = [], None, None
+    for unit in units:
+        if (unit.doc, unit.index) in selected:
+            if run and previous is not None and unit.position == previous + 1:
+                run[1] = unit.end
+            else:
+                if run:
+                    pieces.append(text[run[0]:run[1]].strip())
+                run = [unit.start, unit.end]
+            previous = unit.position
+        elif run:
+            pieces.append(text[run[0]:run[1]].strip())
+            run, previous = None, None
+    if run:
+        pieces.append(text[run[0]:run[1]].strip())
+    rendered = GAP_MARKER.join(pieces)
+    if units and pieces:
+        if (units[0].doc, 0) not in selected:
+            rendered = GAP_MARKER.lstrip() + rendered
+        if (units[-1].doc, units[-1].index) not in selected:
+            rendered = rendered + GAP_MARKER.rstrip()
+    return rendered
+
+
+def build_context(docs: List[Document], query: str = "", token_budget: Optional[int] = CONTEXT_TOKEN_BUDGET,
+                  label_chunks: bool = False, sort_by_position: bool = False,
+                  empty_text: str = EMPTY_CONTEXT) -> str:
+    """
+    Args:
+        docs: 검색 결과(순위 순) 또는 한 실험/매뉴얼의 청크 목록
+        query: 문장 선택 기준 질의 (비우면 예산 초과 시 앞에서부터 채움)
+        token_budget: 컨텍스트 토큰 상한 (None이면 정리만 하고 자르지 않음)
+        label_chunks: 청크마다 "[청크 n]" 머리표를 붙일지 (분석기 프롬프트 형식)
+        sort_by_position: 순위 대신 문서 내 위치(page_num, chunk_idx) 순으로 정렬할지
+    """
+    if not docs:
+        return empty_text
+    if sort_by_position:
+        docs = sorted(docs, key=_position)
+
+    raw_texts = [doc.page_content or "" for doc in docs]
+    texts = _remove_repeated_lines(_remove_overlaps([_strip_boilerplate(text) for text in raw_texts]))
+
+    # 이미 나온 문장과 같은 문장(비전 설명이 본문을 반복하는 경우 등)은 건너뜀
+    seen: Set[str] = set()
+    doc_units: List[List[_Unit]] = []
+    for doc_index, text in enumerate(texts):
+        units = []
+        for unit in _split_units(doc_index, text):
+            key = _normalize(unit.text)
+            if len(key) >= _MIN_DEDUP_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            unit.index = len(units)
+            units.append(unit)
+        doc_units.append(units)
+
+    total_tokens = sum(unit.tokens for units in doc_units for unit in units)
+    if token_budget is None or total_tokens <= token_budget:
+        selected = {(unit.doc, unit.index) for units in doc_units for unit in units}
+    else:
+        _score_units([unit for units in doc_units for unit in units], query)
+        selected = _select(doc_units, token_budget)
+
+    sections = []
+    for doc_index, units in enumerate(doc_units):
+        rendered = _render(texts[doc_index], units, selected)
+        if rendered:
+            sections.append(f"[청크 {len(sections) + 1}]\n{rendered}" if label_chunks else rendered)
+    context = ("\n\n" if label_chunks else "\n").join(sections) or empty_text
+
+    metrics.observe("context.input_tokens", sum(count_tokens(text) for text in raw_texts))
+    metrics.observe("context.output_tokens", count_tokens(context))
+    return context
@@ -0,0 +1,183 @@
+import os
+import re
+import json
+import asyncio
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from langchain_openai import ChatOpenAI
+
+from app.core import metrics
+from app.core.tokens import count_tokens
+from app.db.redis_conn import get_async_redis_conn
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# 프롬프트에 넣는 대화 기록(요약 + 최근 턴)의 토큰 상한
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", 1500))
+# 요약으로 접을 때 원문 그대로 남겨 둘 최근 메시지 수 (사용자/어시스턴트 각각 1개)
+CONVERSATION_KEEP_MESSAGES = int(os.getenv("CONVERSATION_KEEP_MESSAGES", 4))
+CONVERSATION_SUMMARY_MAX_CHARS = int(os.getenv("CONVERSATION_SUMMARY_MAX_CHARS", 600))
+CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", 60 * 60 * 24))  # 마지막 대화 후 24시간
+# 요약이 실패하거나 늦어져도 세션 버퍼가 무한히 커지지 않도록 보관하는 최대 메시지 수
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", 100))
+CONVERSATION_KEY_PREFIX = "conversation"
+
+# 예전 음성 채팅이 대화마다 repr 문자열로 쌓던 키 (TTL/길이 제한 없음). 내용은 chat_logs와 대화 기록에 이미 있음
+LEGACY_VOICE_KEY_PATTERN = "chat:*"
+_LEGACY_VOICE_KEY = re.compile(r"^chat:\d+$")
+
+SUMMARY_PROMPT = """
+다음은 실험실 매뉴얼 QA 도우미와 사용자의 대화야.
+기존 요약과 이어지는 대화를 합쳐 {max_chars}자 이내의 한국어 요약으로 다시 써.
+사용자가 진행 중인 실험, 질문한 주제, 도우미가 안내한 수치·절차처럼 이후 답변에 필요한 사실만 남겨.
+
+[기존 요약]
+{summary}
+
+[이어지는 대화]
+{turns}
+"""
+
+_summary_llm: Optional[ChatOpenAI] = None
+_folding: Dict[str, asyncio.Task] = {}
+
+
+def _keys(session_id) -> Tuple[str, str, str]:
+    base = f"{CONVERSATION_KEY_PREFIX}:{session_id}"
+    # turns: {"role", "content"} JSON 리스트 / summary: 접힌 이전 대화 요약 / lock: 요약 작업 잠금
+    return f"{base}:turns", f"{base}:summary", f"{base}:fold_lock"
+
+
+def _get_summary_llm() -> ChatOpenAI:
+    global _summary_llm
+    if _summary_llm is None:
+        _summary_llm = ChatOpenAI(model_name="gpt-4o-mini", openai_api_key=OPENAI_API_KEY, temperature=0)
+    return _summary_llm
+
+
+def _fit_to_budget(summary: str, turns: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """요약 작업이 끝나기 전이라도 예산을 넘지 않도록 오래된 턴부터 잘라 냅니다."""
+    budget = CONVERSATION_TOKEN_BUDGET - count_tokens(summary)
+    kept, used = [], 0
+    for turn in reversed(turns):
+        used += count_tokens(turn["content"])
+        if used > budget and kept:
+            break
+        kept.append(turn)
+    return list(reversed(kept))
+
+
+async def load(session_id) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    프롬프트에 넣을 (요약, 최근 턴 목록)을 반환합니다. 합계는 CONVERSATION_TOKEN_BUDGET 이내입니다.
+    """
+    turns_key, summary_key, _ = _keys(session_id)
+    try:
+        redis_conn = get_async_redis_conn()
+        raw_turns, summary = await asyncio.gather(redis_conn.lrange(turns_key, 0, -1), redis_conn.get(summary_key))
+    except Exception as e:
+        print(f"[Memory] 대화 기록 조회 실패 ({session_id}): {e}")
+        return "", []
+    summary = summary or ""
+    return summary, _fit_to_budget(summary, [json.loads(raw) for raw in raw_turns])
+
+
+async def recent_turns(session_id, limit: int = 10) -> List[Dict[str, str]]:
+    turns_key, _, _ = _keys(session_id)
+    try:
+        return [json.loads(raw) for raw in await get_async_redis_conn().lrange(turns_key, -limit, -1)]
+    except Exception as e:
+        print(f"[Memory] 대화 기록 조회 실패 ({session_id}): {e}")
+        return []
+
+
+async def append_turn(session_id, user_message: str, assistant_message: str):
+    """한 턴(질문/답변)을 기록하고, 예산을 넘으면 오래된 턴을 요약으로 접는 작업을 백그라운드로 시작합니다."""
+    turns_key, summary_key, _ = _keys(session_id)
+    redis_conn = get_async_redis_conn()
+    try:
+        pipe = redis_conn.pipeline()
+        pipe.rpush(turns_key,
+                   json.dumps({"role": "user", "content": user_message}, ensure_ascii=False),
+                   json.dumps({"role": "assistant", "content": assistant_message}, ensure_ascii=False))
+        pipe.ltrim(turns_key, -CONVERSATION_MAX_MESSAGES, -1)
+        pipe.expire(turns_key, CONVERSATION_TTL)
+        pipe.expire(summary_key, CONVERSATION_TTL)
+        pipe.lrange(turns_key, 0, -1)
+        pipe.get(summary_key)
+        *_, raw_turns, summary = await pipe.execute()
+    except Exception as e:
+        print(f"[Memory] 대화 기록 저장 실패 ({session_id}): {e}")
+        return
+
+    tokens = count_tokens(summary or "") + sum(count_tokens(json.loads(raw)["content"]) for raw in raw_turns)
+    metrics.observe("conversation.history_tokens", tokens)
+    key = str(session_id)
+    if tokens > CONVERSATION_TOKEN_BUDGET and len(raw_turns) > CONVERSATION_KEEP_MESSAGES and key not in _folding:
+        task = asyncio.create_task(fold(session_id))
+        _folding[key] = task
+        task.add_done_callback(lambda _: _folding.pop(key, None))
+
+
+async def fold(session_id):
+    """
+    최근 CONVERSATION_KEEP_MESSAGES개를 제외한 턴을 기존 요약과 합쳐 새 요약으로 만듭니다.
+    요약하는 동안 새로 추가된 턴은 건드리지 않도록, 접은 개수만큼만 리스트 앞에서 잘라 냅니다.
+    """
+    turns_key, summary_key, lock_key = _keys(session_id)
+    redis_conn = get_async_redis_conn()
+    token = uuid.uuid4().hex
+    if not await redis_conn.set(lock_key, token, nx=True, ex=120):
+        return  # 다른 워커가 요약 중
+    try:
+        raw_turns = await redis_conn.lrange(turns_key, 0, -1)
+        folded = raw_turns[:-CONVERSATION_KEEP_MESSAGES]
+        if not folded:
+            return
+        summary = await redis_conn.get(summary_key) or "(없음)"
+        transcript = "\n".join(
+            f"{'사용자' if turn['role'] == 'user' else '도우미'}: {turn['content']}"
+            for turn in (json.loads(raw) for raw in folded)
+        )
+        result = await _get_summary_llm().ainvoke(SUMMARY_PROMPT.format(
+            max_chars=CONVERSATION_SUMMARY_MAX_CHARS, summary=summary, turns=transcript
+        ))
+        new_summary = result.content.strip()[:CONVERSATION_SUMMARY_MAX_CHARS]
+
+        pipe = redis_conn.pipeline()
+        pipe.set(summary_key, new_summary, ex=CONVERSATION_TTL)
+        pipe.ltrim(turns_key, len(folded), -1)
+        await pipe.execute()
+        metrics.incr("conversation.folded_messages", len(folded))
+        print(f"[Memory] 대화 {len(folded)}개 메시지를 요약으로 접음 ({session_id})")
+    except Exception as e:
+        metrics.incr("conversation.fold_error")
+        print(f"[Memory] 대화 요약 실패 ({session_id}): {e}")
+    finally:
+        if await redis_conn.get(lock_key) == token:
+            await redis_conn.delete(lock_key)
+
+
+async def purge_legacy_voice_buffers(batch_size: int = 500) -> int:
+    """
+    예전 음성 채팅의 chat:{experiment_id} 리스트를 지웁니다. (음성/텍스트 모두 이 모듈의 대화 기록을 사용)
+    여러 번 실행해도 안전하며, 지운 키 수를 반환합니다.
+    """
+    redis_conn = get_async_redis_conn()
+    removed, batch = 0, []
+    try:
+        async for key in redis_conn.scan_iter(match=LEGACY_VOICE_KEY_PATTERN, count=batch_size):
+            if _LEGACY_VOICE_KEY.match(key):
+                batch.append(key)
+            if len(batch) >= batch_size:
+                removed += await redis_conn.unlink(*batch)
+                batch = []
+        if batch:
+            removed += await redis_conn.unlink(*batch)
+    except Exception as e:
+        print(f"[Memory] 예전 음성 채팅 버퍼 정리 실패: {e}")
+    if removed:
+        metrics.incr("conversation.legacy_voice_keys_removed", removed)
+        print(f"[Memory] 예전 음성 채팅 버퍼 {removed}개 삭제")
+    return removed
@@ -6,15 +6,14 @@ from langchain_core.documents import Document
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
 from langchain_openai import ChatOpenAI
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+from app.db.vector_store import get_vector_store
+from app.services.context_builder import build_context, RISK_QUERY, ANALYSIS_CONTEXT_TOKEN_BUDGET
 from langgraph.prebuilt import create_react_agent
 from dotenv import load_dotenv
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-CHROMA_DIR = "./chroma_db"
 
 if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY not found in environment variables.")
@@ -26,6 +25,9 @@ llm = ChatOpenAI(
     openai_api_key=OPENAI_API_KEY
 )
 
+# 구성 요소 추출 시 예산을 넘으면 우선 담을 문장의 기준 질의
+ELEMENTS_QUERY = "기구 장비 도구 시약 화학물질 농도 절차 단계 방법 " + RISK_QUERY
+
 # 전역 변수로 청크 데이터 저장 
 _current_chunks: List[Document] = []  # 단순한 청크 리스트로 변경
 
@@ -34,14 +36,8 @@ def load_manual_chunks(manual_id: str) -> List[Document]:
     벡터DB에서 manual_id에 해당하는 모든 청크를 불러옵니다.
     """
     try:
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(
-            persist_directory=CHROMA_DIR,
-            embedding_function=embeddings
-        )
-        
         # manual_id로 필터링하여 문서 검색
-        docs = vectorstore.get(where={"manual_id": manual_id})
+        docs = get_vector_store().get(where={"manual_id": manual_id})
         
         if not docs['documents']:
             return []
@@ -100,12 +96,8 @@ def extract_experiments(manual_id: str) -> str:
         if not chunks:
             continue
         
-        # 모든 청크의 텍스트를 결합하여 더 정확한 분석
-        combined_text = "\n".join([chunk.page_content for chunk in chunks[:5]])  # 최대 5개 청크
-        
-        # 토큰 제한 고려
-        if len(combined_text) > 3000:
-            combined_text = combined_text[:3000] + "..."
+        # 제목/설명은 실험 앞부분에 있으므로 문서 순서대로, 겹침을 지운 뒤 토큰 예산까지만 사용
+        combined_text = build_context(chunks, token_budget=ANALYSIS_CONTEXT_TOKEN_BUDGET // 2, sort_by_position=True)
         
         prompt = f"""
 다음은 실험 매뉴얼의 내용입니다. 이 실험의 제목, 설명, 키워드를 정확히 추출해주세요.
@@ -237,15 +229,9 @@ def extract_experiment_elements(experiment_data: str) -> str:
                 })
                 continue
             
-            # 검색된 청크들을 텍스트로 결합
-            context_text = "\n\n".join([
-                f"[청크 {i+1}]\n{chunk.page_content}" 
-                for i, chunk in enumerate(experiment_chunks[:10])  # 최대 10개
-            ])
-            
-            # 토큰 제한 고려
-            if len(context_text) > 12000:
-                context_text = context_text[:12000] + "\n\n[텍스트가 길어 일부 생략됨]"
+            # 검색된 청크들을 겹침·반복 없이 결합하고, 예산을 넘으면 기구/시약/절차/위험 관련 문장 위주로 선택
+            context_text = build_context(experiment_chunks, ELEMENTS_QUERY, token_budget=ANALYSIS_CONTEXT_TOKEN_BUDGET,
+                                         label_chunks=True, sort_by_position=True)
             
             # LLM 프롬프트 구성
             prompt = f"""
@@ -707,12 +693,7 @@ def analyze_single_experiment(manual_id: str, experiment_id: str) -> Dict[str, A
         단일 실험의 위험 분석 결과
     """
     try:
-        # ChromaDB 직접 접근
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(
-            persist_directory=CHROMA_DIR,
-            embedding_function=embeddings
-        )
+        vectorstore = get_vector_store()
         
         # 특정 experiment_id와 manual_id로 필터링
         exp_filter = {
@@ -758,15 +739,9 @@ def analyze_single_experiment(manual_id: str, experiment_id: str) -> Dict[str, A
                 "experiment": None
             }
         
-        # 검색된 청크들을 텍스트로 결합
-        context_text = "\n\n".join([
-            f"[청크 {i+1}]\n{doc.page_content}" 
-            for i, doc in enumerate(unique_docs[:5])  # 최대 5개
-        ])
-        
-        # 토큰 제한 고려
-        if len(context_text) > 8000:
-            context_text = context_text[:8000] + "\n\n[텍스트가 길어 일부 생략됨]"
+        # 검색된 청크들을 겹침·반복 없이 결합하고, 예산을 넘으면 검색 질의와 관련된 문장 위주로 선택
+        context_text = build_context(unique_docs, " ".join(search_queries), token_budget=ANALYSIS_CONTEXT_TOKEN_BUDGET,
+                                     label_chunks=True, sort_by_position=True)
         
         # LLM 프롬프트 구성
         prompt = f"""
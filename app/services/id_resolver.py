@@ -0,0 +1,162 @@
+"""
+채팅 로그 버퍼링용 ID 변환 캐시: 요청의 user_id / manual_id(문자열) → DB 기본키(users.id, manuals.id)
+
+프로세스 내 LRU → Redis → MySQL 순으로 조회합니다. 한 세션의 메시지는 같은 사용자/매뉴얼을 반복하므로
+첫 메시지 이후에는 MySQL을 조회하지 않습니다. 존재하지 않는 ID도 짧게(ID_CACHE_MISS_TTL) 기억해
+잘못된 ID로 보내는 메시지마다 DB를 조회하지 않도록 합니다.
+매뉴얼/사용자 삭제 시 invalidate_manual / invalidate_user로 지웁니다. 다른 워커의 LRU는
+ID_CACHE_LOCAL_TTL이 지나면 Redis에서 다시 읽습니다.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core import metrics
+from app.db.database import SessionLocal
+from app.db.redis_conn import get_redis_conn, get_async_redis_conn
+from app.crud import user_crud, manuals_crud
+
+ID_CACHE_SIZE = int(os.getenv("ID_CACHE_SIZE", 4096))
+ID_CACHE_LOCAL_TTL = int(os.getenv("ID_CACHE_LOCAL_TTL", 60))
+ID_CACHE_TTL = int(os.getenv("ID_CACHE_TTL", 60 * 60 * 24))
+ID_CACHE_MISS_TTL = int(os.getenv("ID_CACHE_MISS_TTL", 60))
+ID_CACHE_KEY_PREFIX = "id_cache"
+
+_MISSING = ""  # Redis에 저장하는 '없음' 표시
+
+
+class _LocalCache:
+    """(kind, 외부 ID) → (DB ID 또는 None, 만료 시각) LRU"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Optional[int], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Tuple[bool, Optional[int]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[0]
+
+    def put(self, key: Tuple[str, str], value: Optional[int]):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ID_CACHE_LOCAL_TTL)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Tuple[str, str]):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+_local = _LocalCache(ID_CACHE_SIZE)
+
+
+def _redis_key(kind: str, external_id) -> str:
+    return f"{ID_CACHE_KEY_PREFIX}:{kind}:{external_id}"
+
+
+def _decode(raw: str) -> Optional[int]:
+    return int(raw) if raw else None
+
+
+def _lookup_user(db, user_id) -> Optional[int]:
+    user = user_crud.get_user_by_id(db, user_id=user_id)
+    if user is None:
+        print(f"Warning: User with user_id '{user_id}' not found.")
+    return user.id if user else None
+
+
+def _lookup_manual(db, manual_id) -> Optional[int]:
+    manual = manuals_crud.get_manual_by_manual_id(db, manual_id=manual_id)
+    if manual is None:
+        print(f"Warning: Manual with manual_id '{manual_id}' not found. Storing chat log with manual_id=NULL.")
+    return manual.id if manual else None
+
+
+_LOOKUPS: dict = {"user": _lookup_user, "manual": _lookup_manual}
+
+
+def _load_from_db(kind: str, external_id) -> Optional[int]:
+    metrics.incr(f"id_cache.db.{kind}")
+    db = SessionLocal()
+    try:
+        return _LOOKUPS[kind](db, external_id)
+    finally:
+        db.close()
+
+
+def _remember(kind: str, external_id, value: Optional[int]):
+    _local.put((kind, str(external_id)), value)
+    try:
+        get_redis_conn().set(_redis_key(kind, external_id), _MISSING if value is None else str(value),
+                             ex=ID_CACHE_MISS_TTL if value is None else ID_CACHE_TTL)
+    except Exception as e:
+        print(f"[IdCache] Redis 저장 실패 ({kind}:{external_id}): {e}")
+
+
+def resolve(kind: str, external_id) -> Optional[int]:
+    """kind: "user" | "manual"""
+    if external_id is None:
+        return None
+    found, value = _local.get((kind, str(external_id)))
+    if found:
+        return value
+    try:
+        raw = get_redis_conn().get(_redis_key(kind, external_id))
+    except Exception as e:
+        print(f"[IdCache] Redis 조회 실패 ({kind}:{external_id}): {e}")
+        raw = None
+    if raw is not None:
+        metrics.incr("id_cache.redis_hit")
+        value = _decode(raw)
+        _local.put((kind, str(external_id)), value)
+        return value
+    value = _load_from_db(kind, external_id)
+    _remember(kind, external_id, value)
+    return value
+
+
+async def aresolve(kind: str, external_id) -> Optional[int]:
+    """resolve의 비동기 버전: LRU/Redis 적중 시 스레드를 쓰지 않음"""
+    if external_id is None:
+        return None
+    found, value = _local.get((kind, str(external_id)))
+    if found:
+        return value
+    try:
+        raw = await get_async_redis_conn().get(_redis_key(kind, external_id))
+    except Exception as e:
+        print(f"[IdCache] Redis 조회 실패 ({kind}:{external_id}): {e}")
+        raw = None
+    if raw is not None:
+        metrics.incr("id_cache.redis_hit")
+        value = _decode(raw)
+        _local.put((kind, str(external_id)), value)
+        return value
+    value = await asyncio.to_thread(_load_from_db, kind, external_id)
+    await asyncio.to_thread(_remember, kind, external_id, value)
+    return value
+
+
+def _invalidate(kind: str, external_id):
+    _local.pop((kind, str(external_id)))
+    try:
+        get_redis_conn().delete(_redis_key(kind, external_id))
+    except Exception as e:
+        print(f"[IdCache] 무효화 실패 ({kind}:{external_id}): {e}")
+
+
+def invalidate_manual(manual_id: str):
+    _invalidate("manual", manual_id)
+
+
+def invalidate_user(user_id):
+    _invalidate("user", user_id)
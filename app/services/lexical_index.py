@@ -0,0 +1,262 @@
+import os
+import re
+import json
+import math
+import time
+import threading
+from collections import Counter, OrderedDict
+from typing import List, Dict, Tuple, Optional
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+from app.db.vector_store import get_vector_store, VectorStore
+
+load_dotenv()
+
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "./lexical_index")
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 하이브리드 검색 설정
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", 0.5))  # 최종 점수에서 어휘(BM25) 점수 비중
+LEXICAL_FAST_PATH_MARGIN = float(os.getenv("LEXICAL_FAST_PATH_MARGIN", 1.5))  # 1위/2위 점수 비율
+LEXICAL_FAST_PATH_COVERAGE = float(os.getenv("LEXICAL_FAST_PATH_COVERAGE", 0.8))  # 1위 문서의 질의어 포함률
+LEXICAL_INDEX_CACHE_SIZE = int(os.getenv("LEXICAL_INDEX_CACHE_SIZE", 32))
+
+_HANGUL_RUN = re.compile(r"[가-힣]+")
+_ALNUM_RUN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    한국어/영문 혼합 텍스트를 BM25용 토큰으로 분리합니다.
+    - 한글 구간: 문자 bigram (조사가 붙어도 어간 bigram이 일치하도록)
+    - 영문/숫자 구간: 소문자 단어 단위 (NaOH, 0.1M, 25°C의 25 등)
+    """
+    text = text.lower()
+    tokens = []
+    for run in _HANGUL_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(_ALNUM_RUN.findall(text))
+    return tokens
+
+
+class LexicalIndex:
+    """
+    매뉴얼 하나에 대한 BM25 역색인.
+    청크 텍스트와 메타데이터도 함께 보관하여, 어휘 검색만으로 결과가 확정되면
+    벡터DB를 거치지 않고 바로 Document를 돌려줄 수 있습니다.
+    """
+
+    def __init__(self, manual_id: str, texts: List[str], metadatas: List[Dict]):
+        self.manual_id = manual_id
+        self.texts = texts
+        self.metadatas = metadatas
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+        for doc_idx, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_idx, tf))
+        self.avg_doc_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.texts) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """BM25 점수 상위 k개의 (문서 인덱스, 점수)를 반환합니다."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_idx, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_idx] / (self.avg_doc_length or 1))
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def coverage(self, query: str, doc_idx: int) -> float:
+        """질의 토큰 중 해당 문서에 등장하는 토큰의 비율 (IDF 가중)"""
+        terms = set(tokenize(query))
+        if not terms:
+            return 0.0
+        doc_terms = set(tokenize(self.texts[doc_idx]))
+        total = sum(self.idf(t) for t in terms)
+        matched = sum(self.idf(t) for t in terms if t in doc_terms)
+        return matched / total if total else 0.0
+
+    def document(self, doc_idx: int) -> Document:
+        return Document(page_content=self.texts[doc_idx], metadata=self.metadatas[doc_idx])
+
+    def to_dict(self) -> Dict:
+        return {"manual_id": self.manual_id, "texts": self.texts, "metadatas": self.metadatas}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LexicalIndex":
+        return cls(data["manual_id"], data["texts"], data["metadatas"])
+
+
+# 로드된 색인 LRU 캐시 (asyncio.to_thread 작업자들이 동시에 접근하므로 _index_cache_lock으로 보호)
+_index_cache: "OrderedDict[str, LexicalIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _index_path(manual_id: str) -> str:
+    return os.path.join(LEXICAL_INDEX_DIR, f"{manual_id}.json")
+
+
+def _cache_index(index: LexicalIndex):
+    with _index_cache_lock:
+        _index_cache[index.manual_id] = index
+        _index_cache.move_to_end(index.manual_id)
+        while len(_index_cache) > LEXICAL_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+
+
+def _cached_index(manual_id: str) -> Optional[LexicalIndex]:
+    with _index_cache_lock:
+        index = _index_cache.get(manual_id)
+        if index is not None:
+            _index_cache.move_to_end(manual_id)
+        return index
+
+
+def build_lexical_index(manual_id: str, docs: List[Document]) -> LexicalIndex:
+    """
+    매뉴얼 청크로 BM25 색인을 만들고 디스크에 저장합니다. (임베딩 시점에 호출)
+    """
+    index = LexicalIndex(manual_id, [d.page_content for d in docs], [d.metadata for d in docs])
+    os.makedirs(LEXICAL_INDEX_DIR, exist_ok=True)
+    with open(_index_path(manual_id), "w", encoding="utf-8") as f:
+        json.dump(index.to_dict(), f, ensure_ascii=False)
+    _cache_index(index)
+    print(f"✅ 어휘 색인 생성: manual_id={manual_id}, 청크 {len(index)}개, 토큰 {len(index.postings)}종")
+    return index
+
+
+def delete_lexical_index(manual_id: str):
+    """매뉴얼 삭제 시 색인 파일과 캐시를 정리합니다."""
+    with _index_cache_lock:
+        _index_cache.pop(manual_id, None)
+    try:
+        os.remove(_index_path(manual_id))
+    except FileNotFoundError:
+        pass
+
+
+def get_lexical_index(manual_id: str) -> Optional[LexicalIndex]:
+    """
+    색인을 캐시 → 디스크 → 벡터DB 순서로 찾습니다.
+    색인이 도입되기 전에 업로드된 매뉴얼은 벡터DB의 청크로 한 번 생성해 둡니다.
+    """
+    index = _cached_index(manual_id)
+    if index is not None:
+        return index
+
+    path = _index_path(manual_id)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index = LexicalIndex.from_dict(json.load(f))
+            _cache_index(index)
+            return index
+        except Exception as e:
+            print(f"어휘 색인 로드 실패 ({manual_id}): {e}")
+
+    try:
+        docs = get_vector_store().get_documents(where={"manual_id": manual_id})
+    except Exception as e:
+        print(f"어휘 색인 생성용 청크 조회 실패 ({manual_id}): {e}")
+        return None
+    if not docs:
+        return None
+    return build_lexical_index(manual_id, docs)
+
+
+def _normalize(scores: Dict[str, float]) -> Dict[str, float]:
+    if not scores:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    if high - low < 1e-9:
+        return {key: 1.0 for key in scores}
+    return {key: (value - low) / (high - low) for key, value in scores.items()}
+
+
+def _fast_path(index, query: str, lexical_hits: List[Tuple[int, float]], k: int, start: float) -> Optional[List[Document]]:
+    if lexical_hits:
+        top_score = lexical_hits[0][1]
+        second_score = lexical_hits[1][1] if len(lexical_hits) > 1 else 0.0
+        decisive = (
+            index.coverage(query, lexical_hits[0][0]) >= LEXICAL_FAST_PATH_COVERAGE
+            and top_score >= LEXICAL_FAST_PATH_MARGIN * second_score
+        )
+        if decisive:
+            print(f"[Hybrid] 어휘 검색 fast path ({(time.time() - start) * 1000:.1f}ms)")
+            return [index.document(doc_idx) for doc_idx, _ in lexical_hits[:k]]
+    return None
+
+
+def lexical_fast_path(manual_id: str, query: str, k: int = 4) -> Optional[List[Document]]:
+    """어휘 검색만으로 결과가 정해지는 질의이면 그 결과를, 아니면 None을 반환합니다. (임베딩 호출 없음)"""
+    start = time.time()
+    index = get_lexical_index(manual_id)
+    lexical_hits = index.search(query, k=max(k * 3, 10)) if index else []
+    return _fast_path(index, query, lexical_hits, k, start)
+
+
+def hybrid_search(manual_id: str, query: str, k: int = 4, vector_store: Optional[VectorStore] = None,
+                  query_embedding: Optional[List[float]] = None) -> List[Document]:
+    """
+    BM25(어휘)와 벡터 검색 점수를 융합하여 상위 k개 청크를 반환합니다.
+
+    어휘 검색 1위가 질의어 대부분을 포함하고 2위와의 점수 차가 충분하면
+    (예: "NaOH 농도", "분광광도계 파장" 같은 키워드 질의) 임베딩 호출 없이 어휘 결과만 반환합니다.
+    query_embedding을 주면 (답변 캐시 조회 등에서 이미 계산한 임베딩) 다시 임베딩하지 않습니다.
+    """
+    start = time.time()
+    index = get_lexical_index(manual_id)
+    lexical_hits = index.search(query, k=max(k * 3, 10)) if index else []
+    fast = _fast_path(index, query, lexical_hits, k, start)
+    if fast is not None:
+        return fast
+
+    vector_store = vector_store or get_vector_store()
+    if query_embedding is not None:
+        vector_hits = vector_store.similarity_search_by_vector_with_score(
+            query_embedding, k=max(k * 3, 10), filter={"manual_id": manual_id})
+    else:
+        vector_hits = vector_store.similarity_search_with_score(query, k=max(k * 3, 10), filter={"manual_id": manual_id})
+
+    # page_content를 키로 두 결과를 합칩니다.
+    documents: Dict[str, Document] = {}
+    lexical_scores: Dict[str, float] = {}
+    vector_scores: Dict[str, float] = {}
+    for doc_idx, score in lexical_hits:
+        doc = index.document(doc_idx)
+        documents[doc.page_content] = doc
+        lexical_scores[doc.page_content] = score
+    for doc, similarity in vector_hits:
+        documents.setdefault(doc.page_content, doc)
+        vector_scores[doc.page_content] = similarity
+
+    lexical_norm = _normalize(lexical_scores)
+    vector_norm = _normalize(vector_scores)
+    fused = {
+        key: HYBRID_ALPHA * lexical_norm.get(key, 0.0) + (1 - HYBRID_ALPHA) * vector_norm.get(key, 0.0)
+        for key in documents
+    }
+    ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+    print(f"[Hybrid] 어휘 {len(lexical_hits)}건 + 벡터 {len(vector_hits)}건 융합 ({(time.time() - start) * 1000:.1f}ms)")
+    return [documents[key] for key in ranked]
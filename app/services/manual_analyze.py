@@ -5,15 +5,14 @@ from langchain_core.documents import Document
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
 from langchain_openai import ChatOpenAI
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+from app.db.vector_store import get_vector_store
+from app.services.context_builder import build_context, RISK_QUERY, ANALYSIS_CONTEXT_TOKEN_BUDGET
 from langgraph.prebuilt import create_react_agent
 from dotenv import load_dotenv
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-CHROMA_DIR = "./chroma_db"
 
 if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY not found in environment variables.")
@@ -33,14 +32,8 @@ def load_manual_chunks(manual_id: str) -> List[Document]:
     벡터DB에서 특정 manual_id에 해당하는 모든 청크를 불러옵니다.
     """
     try:
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma(
-            persist_directory=CHROMA_DIR,
-            embedding_function=embeddings
-        )
-        
         # manual_id로 필터링하여 문서 검색
-        docs = vectorstore.get(where={"manual_id": manual_id})
+        docs = get_vector_store().get(where={"manual_id": manual_id})
         
         if not docs['documents']:
             return []
@@ -91,14 +84,9 @@ def extract_risk_chunks(manual_id: str, chunk_text_sample: str = "") -> str:
     if not relevant_chunks:
         return json.dumps({"error": "해당 manual_id의 청크를 찾을 수 없습니다.", "risk_sentences": []})
     
-    # 모든 청크의 텍스트를 합침 (토큰 제한을 고려하여 앞부분만)
-    combined_text = ""
-    chunk_count = 0
-    for chunk in relevant_chunks[:10]:  # 처음 10개 청크만 처리
-        combined_text += f"[청크 {chunk_count}]\n{chunk.page_content}\n\n"
-        chunk_count += 1
-        if len(combined_text) > 8000:  # 토큰 제한
-            break
+    # 앞부분 청크만 자르는 대신, 전체 청크에서 위험/안전 관련 문장 위주로 토큰 예산 안에 담음
+    combined_text = build_context(relevant_chunks, RISK_QUERY, token_budget=ANALYSIS_CONTEXT_TOKEN_BUDGET,
+                                  label_chunks=True, sort_by_position=True)
     
     prompt = f"""
 당신은 실험 매뉴얼을 분석하여 **위험 요소를 식별하고, 숨겨진 위험성까지 추론하는 전문가**입니다.
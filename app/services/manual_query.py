@@ -1,9 +1,11 @@
 import os
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
+import asyncio
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 from langchain_core.documents import Document
+from app.services.lexical_index import hybrid_search, lexical_fast_path
+from app.services import answer_cache
+from app.services.context_builder import build_context
 
 dotenv_path = os.getenv("DOTENV_PATH", ".env")
 load_dotenv(dotenv_path)
@@ -12,21 +14,26 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY not found in environment variables.")
 
-CHROMA_DIR = "./chroma_db"
 
 async def query_manual(manual_id: str, sender: str, message: str, top_k: int = 4):
     """
-    Chroma 벡터DB에서 manual_id로 필터링된 문서 중 관련 문서를 검색하고 LLM으로 답변을 생성합니다.
+    manual_id로 필터링된 문서 중 관련 문서를 하이브리드(BM25 + 벡터) 검색하고 LLM으로 답변을 생성합니다.
     """
-    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-    vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-    # manual_id로 필터링된 chunk만 검색 (공식 메서드 사용)
-    relevant_docs = vectorstore.similarity_search(
-        message,
-        k=top_k,
-        filter={"manual_id": manual_id}
-    )
-    context = "\n".join([doc.page_content for doc in relevant_docs])
+    # 키워드 질의는 어휘 색인만으로 처리되어 임베딩 호출(과 답변 캐시 조회)이 생략됩니다.
+    # 검색/캐시 조회는 동기 네트워크·CPU 작업이므로 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+    relevant_docs = await asyncio.to_thread(lexical_fast_path, manual_id, message, top_k)
+    question_embedding = None
+    if relevant_docs is None:
+        # 같은 매뉴얼에 대한 (의미상) 같은 질문은 저장된 답변을 재사용하고,
+        # 조회에 쓴 질문 임베딩은 검색에도 그대로 사용합니다.
+        if answer_cache.is_cacheable(message):
+            cached_answer, question_embedding = await asyncio.to_thread(answer_cache.lookup, manual_id, message)
+            if cached_answer is not None:
+                return {"answer": cached_answer, "retrieved_chunks": 0, "cached": True}
+        relevant_docs = await asyncio.to_thread(
+            hybrid_search, manual_id, message, top_k, query_embedding=question_embedding
+        )
+    context = build_context(relevant_docs, message)
     llm = ChatOpenAI(model_name="gpt-4.1-mini", openai_api_key=OPENAI_API_KEY)
     prompt = f"""
 아래는 실험실 매뉴얼의 일부입니다.
@@ -41,5 +48,7 @@ async def query_manual(manual_id: str, sender: str, message: str, top_k: int = 4
 
 답변:
 """
-    answer = llm.predict(prompt)
-    return {"answer": answer.strip(), "retrieved_chunks": len(relevant_docs)} 
\ No newline at end of file
+    answer = (await llm.apredict(prompt)).strip()
+    if question_embedding is not None:
+        await asyncio.to_thread(answer_cache.store, manual_id, message, answer, question_embedding)
+    return {"answer": answer, "retrieved_chunks": len(relevant_docs), "cached": False} 
\ No newline at end of file
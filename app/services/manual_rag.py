@@ -6,8 +6,6 @@ import io
 from fastapi import UploadFile
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_core.documents import Document
 from dotenv import load_dotenv
 # import pytesseract
@@ -20,6 +18,9 @@ from PyPDF2 import PdfReader
 from PIL import Image
 from openai import OpenAI
 from google.generativeai import configure, GenerativeModel
+from app.services.lexical_index import build_lexical_index
+from app.db.vector_store import get_vector_store
+from app.services import answer_cache
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -34,7 +35,6 @@ client = OpenAI(api_key=OPENAI_API_KEY)
 configure(api_key=GOOGLE_API_KEY)
 
 
-CHROMA_DIR = "./chroma_db"  
 POPLER_PATH = r"C:\Users\201-13\Documents\poppler-24.08.0\Library\bin"
 
 # pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
@@ -313,9 +313,12 @@ async def embed_pdf_manual(file: UploadFile, manual_type: str = "UNKNOWN", user_
         # 할당된 고유 experiment_id 목록 추출
         assigned_experiment_ids = sorted(list(set(doc.metadata.get("experiment_id") for doc in all_docs if "experiment_id" in doc.metadata)))
         #벡터db저장
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = Chroma.from_documents(all_docs, embeddings, persist_directory=CHROMA_DIR)
-        vectorstore.persist()
+        chunk_ids = [f"{manual_id}:{i}" for i in range(len(all_docs))]
+        get_vector_store().add_documents(all_docs, ids=chunk_ids)
+        # 키워드 질의용 BM25 어휘 색인 생성
+        build_lexical_index(manual_id, all_docs)
+        # 같은 manual_id로 다시 임베딩된 경우 이전 내용 기반의 답변 캐시는 폐기
+        answer_cache.invalidate_manual(manual_id)
         return {
             "message": "PDF 임베딩 및 저장 완료",
             "manual_id": manual_id,
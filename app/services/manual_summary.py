@@ -5,6 +5,7 @@ from typing import List, Dict, Optional
 from langchain_core.documents import Document
 from openai import OpenAI
 from dotenv import load_dotenv
+from app.services.context_builder import build_context, ANALYSIS_CONTEXT_TOKEN_BUDGET
 
 # 환경 변수 로드
 load_dotenv()
@@ -33,11 +34,9 @@ def summarize_experiment_chunks(chunks: List[Document]) -> Dict[str, str]:
     # experiment_id 추출 (모든 청크가 동일한 experiment_id를 가져야 함)
     experiment_id = chunks[0].metadata.get("experiment_id", "unknown")
     
-    # 청크들의 텍스트 내용 결합
-    combined_text = "\n\n".join([
-        f"[청크 {i+1}]\n{chunk.page_content}" 
-        for i, chunk in enumerate(chunks)
-    ])
+    # 청크들의 텍스트 내용 결합 (청크 간 겹침·반복 문장 제거, 요약은 전체 내용이 필요하므로 예산을 넉넉히)
+    combined_text = build_context(chunks, token_budget=ANALYSIS_CONTEXT_TOKEN_BUDGET * 2,
+                                  label_chunks=True, sort_by_position=True)
     
     # LLM 프롬프트 구성
     prompt = f"""다음은 하나의 실험을 구성하는 매뉴얼 청크 텍스트입니다. OCR 또는 이미지 분석을 통해 얻어진 원시 텍스트이기 때문에, 일부 표현이 부정확하거나 반복될 수 있습니다.
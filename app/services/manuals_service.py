@@ -4,13 +4,12 @@ from app.crud.manuals_crud import (
 )
 from app.schemas.manuals import ManualCreate, ManualUpdate
 from app.services.manual_rag import embed_pdf_manual
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
+from app.services.lexical_index import delete_lexical_index
+from app.services import answer_cache, id_resolver
+from app.services.vector_purge_service import enqueue_manual_purge
+from app.services.agent_chat_service import agent_runtime_cache
 import os
 
-CHROMA_DIR = "./chroma_db"
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
 def create_manual_service(db: Session, manual: ManualCreate, user_id: int, company_id: int):
     return create_manual(db, manual, user_id, company_id)
 
@@ -27,18 +26,14 @@ def delete_manual_service(db: Session, manual_id: str, user_id: int):
     manual = delete_manual(db, manual_id, user_id)
     if manual:
         try:
-            embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-            vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=embeddings)
-            
-            # manual_id로 시작하는 모든 experiment_id를 삭제
-            filter_criteria = {"experiment_id": {"$regex": f"^{manual_id}"}}
-            vectorstore._collection.delete(where=filter_criteria)
-            
-            # 혹시 experiment_id가 없는 경우를 대비해 manual_id로도 삭제
-            vectorstore._collection.delete(where={"manual_id": str(manual_id)})
-            
+            # 벡터 삭제는 요청 경로 밖에서 배치로 수행 (app.services.vector_purge_service)
+            enqueue_manual_purge(str(manual_id))
         except Exception as e:
-            print(f"Vector DB deletion failed: {e}")
+            print(f"Vector DB deletion enqueue failed: {e}")
+        delete_lexical_index(manual_id)
+        answer_cache.invalidate_manual(manual_id)
+        agent_runtime_cache.invalidate(manual_id)
+        id_resolver.invalidate_manual(manual_id)
     return manual
 
 async def create_manual_with_embedding(
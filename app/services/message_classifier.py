@@ -0,0 +1,315 @@
+"""
+채팅 메시지 로컬 분류기: '질문'(message) vs '실험기록'(experiment_log)
+
+문자 n-gram(1~3) 다항 나이브 베이즈 모델입니다. 가중치는 message_classifier_weights.json으로 함께 배포되며,
+분류는 수십 마이크로초 안에 끝나므로 메시지마다 LLM을 호출하지 않아도 됩니다.
+확신도가 MESSAGE_CLASSIFIER_CONFIDENCE 미만인 경계 사례만 호출 측에서 LLM으로 넘깁니다.
+
+확신도 보정 배율(온도)은 학습 시 교차 검증으로 맞춥니다: 학습에 쓰지 않은 예시에 대한 로그 손실이 가장 작은 값.
+배포된 가중치는 아직 기본 예시로만 학습되어 있으므로, 실제 채팅 로그로 다시 학습하기 전까지는
+MESSAGE_CLASSIFIER_ENABLED=false(기본값)로 두어 모든 메시지를 LLM으로 분류합니다.
+
+가중치 재학습 (채팅 로그의 사용자 질문 + 실험 로그 + 기본 예시):
+    python -m app.services.message_classifier train
+"""
+import os
+import re
+import sys
+import json
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MESSAGE_CLASSIFIER_WEIGHTS = os.getenv(
+    "MESSAGE_CLASSIFIER_WEIGHTS",
+    os.path.join(os.path.dirname(__file__), "message_classifier_weights.json"),
+)
+# 로컬 분류기 사용 여부 (false면 predict가 항상 라벨 없음을 반환하여 LLM으로 분류)
+MESSAGE_CLASSIFIER_ENABLED = os.getenv("MESSAGE_CLASSIFIER_ENABLED", "false").lower() == "true"
+# 이 확신도 이상이면 로컬 결과를 그대로 사용, 미만이면 LLM으로 재분류
+MESSAGE_CLASSIFIER_CONFIDENCE = float(os.getenv("MESSAGE_CLASSIFIER_CONFIDENCE", 0.9))
+
+LABELS = ("message", "experiment_log")
+NGRAM_RANGE = (1, 3)
+_SMOOTHING = 0.5  # 라플라스 평활 계수
+_MIN_FEATURE_COUNT = 2  # 학습 시 이보다 적게 등장한 n-gram은 버림 (가중치 파일 크기 제한)
+# n-gram은 서로 겹쳐 독립 가정이 깨지므로 로그 오즈를 n-gram 수로 나누고 이 배율로 확신도를 보정
+# (가중치 파일에 값이 없을 때의 기본값, 학습 시에는 _CALIBRATION_GRID에서 교차 검증으로 고름)
+_CALIBRATION_SCALE = 5.0
+_CALIBRATION_GRID = tuple(x / 2 for x in range(1, 41))  # 0.5 ~ 20.0
+_CALIBRATION_FOLDS = 5
+
+_SPACES = re.compile(r"\s+")
+
+# 가중치 파일을 새로 학습할 때 함께 쓰는 기본 예시 (로그가 적은 초기 환경에서도 동작하도록)
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    "message": [
+        "PCR 온도는 몇도로 설정해야 하나요?",
+        "NaOH 농도는 얼마로 맞춰야 해?",
+        "원심분리기 회전 속도가 어떻게 돼?",
+        "이 실험에서 보호장비는 뭘 착용해야 하나요",
+        "시약은 어디에 보관해야 돼요?",
+        "분광광도계 파장은 몇 nm로 설정하나요?",
+        "다음 단계가 뭐야?",
+        "샘플은 몇 개 준비해야 하나요?",
+        "반응 시간은 얼마나 걸려?",
+        "폐액은 어떻게 처리하나요?",
+        "버퍼 pH는 얼마로 맞추나요",
+        "인큐베이터 온도 알려줘",
+        "피펫 사용법 알려줄래?",
+        "에탄올로 세척해도 되나요?",
+        "이 단계에서 주의할 점이 있을까요?",
+        "전기영동 전압은 몇 V야?",
+        "시료를 얼마나 희석해야 해?",
+        "실험 순서 다시 설명해줘",
+        "장갑은 니트릴로 껴야 하나요?",
+        "오토클레이브 시간은 얼마인가요",
+        "흄후드 안에서 해야 돼?",
+        "시약 유효기간은 어떻게 확인하나요?",
+        "측정값이 이상하면 어떻게 해야 하나요?",
+        "결과 분석은 어떻게 하면 돼?",
+        "냉장 보관이야 냉동 보관이야?",
+        "몇 분 동안 교반해야 하나요?",
+        "이 시약 위험한가요?",
+        "화재가 나면 어떻게 대처해야 하나요?",
+        "필요한 장비 목록 알려줘",
+        "표준용액은 어떻게 만들어?",
+        "what is the annealing temperature?",
+        "how long should I centrifuge the sample?",
+        "혹시 매뉴얼에 세척 방법 나와 있어?",
+        "그럼 농도를 두 배로 하면 돼?",
+        "왜 얼음 위에서 해야 하는 거예요?",
+        "밴드가 흐릿하면 원인이 뭘까요?",
+    ],
+    "experiment_log": [
+        "PCR 실험 시작했어요",
+        "시약 준비 완료했습니다",
+        "샘플 10개 원심분리 돌렸어요",
+        "PCR 결과가 나왔는데 밴드가 흐릿하게 나왔어요",
+        "흡광도 측정값 0.52 나왔습니다",
+        "용액 색이 파랗게 변하는 걸 관찰했어",
+        "인큐베이터에 넣고 30분 기다리는 중이에요",
+        "전기영동 끝났습니다",
+        "버퍼 pH 7.4로 맞췄어요",
+        "피펫 팁이 부족해서 실험 중단했어요",
+        "침전물이 생긴 것을 확인했습니다",
+        "오토클레이브 돌려놨어",
+        "두 번째 샘플 측정 완료",
+        "온도가 37도로 유지되고 있어요",
+        "반응이 예상보다 빨리 끝났어요",
+        "시료 희석 1:10으로 했습니다",
+        "장비 오류가 나서 다시 시작했어요",
+        "결과 데이터 엑셀에 정리했어",
+        "세척 끝내고 건조 중입니다",
+        "기포가 많이 생겼어요",
+        "방금 시약 넣었어",
+        "겔 굳히는 중",
+        "3번 샘플에서 오염이 발견됐어요",
+        "측정 수치가 이전보다 높게 나왔어요",
+        "실험 끝났습니다 정리 중이에요",
+        "교반 10분 진행했어요",
+        "냉장고에 샘플 보관했습니다",
+        "표준용액 5개 농도로 만들었어요",
+        "적정 끝났고 소비량 12.3mL였어",
+        "현미경으로 세포 관찰했는데 모양이 둥글었어요",
+        "started the PCR run",
+        "centrifuge finished, pellet looks small",
+        "결과가 안 나와서 한 번 더 돌리는 중이에요",
+        "흄후드에서 작업 시작했어",
+        "밴드가 두 개 보였어",
+        "실패했어요 다시 해볼게요",
+    ],
+}
+
+
+def normalize(text: str) -> str:
+    return _SPACES.sub(" ", (text or "").strip().lower())
+
+
+def extract_features(text: str) -> Counter:
+    """문장 앞뒤에 경계 기호(^, $)를 붙인 문자 n-gram 빈도 (어미 '나요?', '했어요$' 등이 강한 신호)"""
+    padded = f"^{normalize(text)}$"
+    features = Counter()
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(padded) - n + 1):
+            features[padded[i:i + n]] += 1
+    return features
+
+
+def _sigmoid(logit: float) -> float:
+    logit = max(min(logit, 50.0), -50.0)
+    return 1.0 / (1.0 + math.exp(-logit))
+
+
+def _log_loss(scored: List[Tuple[float, str]], scale: float) -> float:
+    """(보정 전 로그 오즈, 정답 라벨) 목록에 대한 평균 로그 손실"""
+    total = 0.0
+    for diff, label in scored:
+        p_experiment = min(max(_sigmoid(diff * scale), 1e-6), 1 - 1e-6)
+        total -= math.log(p_experiment if label == "experiment_log" else 1.0 - p_experiment)
+    return total / max(len(scored), 1)
+
+
+def held_out_scores(examples: List[Tuple[str, str]], folds: int = _CALIBRATION_FOLDS) -> List[Tuple[float, str]]:
+    """k-겹 교차 검증: 각 예시를 그 예시를 빼고 학습한 모델로 점수화한 (로그 오즈, 라벨) 목록"""
+    examples = [(text, label) for text, label in examples if label in LABELS and normalize(text)]
+    scored = []
+    for fold in range(folds):
+        train = [example for i, example in enumerate(examples) if i % folds != fold]
+        model = MessageClassifier.train(train, calibration_scale=1.0)
+        scored.extend((model.log_odds(text), label) for i, (text, label) in enumerate(examples) if i % folds == fold)
+    return scored
+
+
+def fit_calibration_scale(scored: List[Tuple[float, str]]) -> float:
+    """학습에 쓰지 않은 예시의 로그 손실이 가장 작은 보정 배율"""
+    return min(_CALIBRATION_GRID, key=lambda scale: _log_loss(scored, scale))
+
+
+class MessageClassifier:
+    """다항 나이브 베이즈: 클래스별 log P(n-gram | class)와 사전확률"""
+
+    def __init__(self, log_priors: Dict[str, float], log_likelihoods: Dict[str, Dict[str, float]],
+                 calibration_scale: float = _CALIBRATION_SCALE):
+        self.log_priors = log_priors
+        self.log_likelihoods = log_likelihoods
+        self.calibration_scale = calibration_scale
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str]],
+              calibration_scale: float = _CALIBRATION_SCALE) -> "MessageClassifier":
+        """examples: (텍스트, 라벨) 목록"""
+        doc_counts = Counter()
+        feature_counts = {label: Counter() for label in LABELS}
+        for text, label in examples:
+            if label not in feature_counts or not normalize(text):
+                continue
+            doc_counts[label] += 1
+            feature_counts[label].update(extract_features(text))
+
+        vocabulary = {
+            feature for feature, count in (feature_counts[LABELS[0]] + feature_counts[LABELS[1]]).items()
+            if count >= _MIN_FEATURE_COUNT
+        }
+        total_docs = sum(doc_counts.values())
+        log_priors, log_likelihoods = {}, {}
+        for label in LABELS:
+            counts = feature_counts[label]
+            denominator = sum(counts[f] for f in vocabulary) + _SMOOTHING * (len(vocabulary) + 1)
+            log_priors[label] = math.log((doc_counts[label] + 1) / (total_docs + len(LABELS)))
+            log_likelihoods[label] = {
+                feature: round(math.log((counts[feature] + _SMOOTHING) / denominator), 4)
+                for feature in vocabulary
+            }
+        return cls(log_priors, log_likelihoods, calibration_scale)
+
+    def log_odds(self, text: str) -> float:
+        """n-gram당 평균 로그 오즈 log P(experiment_log) - log P(message) (보정 배율 적용 전)"""
+        features = extract_features(text)
+        scores = {}
+        for label in LABELS:
+            table = self.log_likelihoods[label]
+            scores[label] = self.log_priors[label] + sum(
+                count * table[feature] for feature, count in features.items() if feature in table
+            )
+        # 학습 어휘에 없는 n-gram은 양쪽 클래스에서 모두 무시
+        return (scores["experiment_log"] - scores["message"]) / max(sum(features.values()), 1)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """(라벨, 확신도) - 확신도는 두 클래스 사후확률 중 큰 값 (0.5~1.0)"""
+        p_experiment = _sigmoid(self.log_odds(text) * self.calibration_scale)
+        if p_experiment >= 0.5:
+            return "experiment_log", p_experiment
+        return "message", 1.0 - p_experiment
+
+    def to_dict(self) -> Dict:
+        return {
+            "labels": list(LABELS),
+            "ngram_range": list(NGRAM_RANGE),
+            "calibration_scale": self.calibration_scale,
+            "log_priors": self.log_priors,
+            "log_likelihoods": self.log_likelihoods,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MessageClassifier":
+        return cls(data["log_priors"], data["log_likelihoods"], data.get("calibration_scale", _CALIBRATION_SCALE))
+
+
+_classifier: Optional[MessageClassifier] = None
+
+
+def get_classifier() -> Optional[MessageClassifier]:
+    """배포된 가중치를 한 번만 읽어 둡니다. 파일이 없으면 None (호출 측이 LLM으로 분류)"""
+    global _classifier
+    if _classifier is None:
+        try:
+            with open(MESSAGE_CLASSIFIER_WEIGHTS, "r", encoding="utf-8") as f:
+                _classifier = MessageClassifier.from_dict(json.load(f))
+        except Exception as e:
+            print(f"[Classifier] 가중치 로드 실패 ({MESSAGE_CLASSIFIER_WEIGHTS}): {e}")
+            return None
+    return _classifier
+
+
+def predict(message: str) -> Tuple[Optional[str], float]:
+    """
+    Returns:
+        (라벨, 확신도) - 확신도가 MESSAGE_CLASSIFIER_CONFIDENCE 미만이거나 모델이 없으면 라벨은 None
+    """
+    if not MESSAGE_CLASSIFIER_ENABLED:
+        return None, 0.0
+    classifier = get_classifier()
+    if classifier is None:
+        return None, 0.0
+    label, confidence = classifier.predict(message)
+    if confidence < MESSAGE_CLASSIFIER_CONFIDENCE:
+        return None, confidence
+    return label, confidence
+
+
+def load_training_examples() -> List[Tuple[str, str]]:
+    """
+    학습 데이터: 기본 예시 + chat_logs의 사용자 메시지(질문으로 처리되어 기록된 것) + 실험 로그 내용
+    """
+    examples = [(text, label) for label, texts in SEED_EXAMPLES.items() for text in texts]
+
+    from app.db.database import SessionLocal
+    from app.models.chat_logs import ChatLog
+    from app.models.experiment_log import ExperimentLog
+    db = SessionLocal()
+    try:
+        rows = db.query(ChatLog.message).filter(ChatLog.sender == "user").all()
+        examples.extend((message, "message") for (message,) in rows if message)
+        rows = db.query(ExperimentLog.content).all()
+        examples.extend((content, "experiment_log") for (content,) in rows if content)
+    except Exception as e:
+        print(f"[Classifier] 학습 로그 조회 실패: {e}")
+    finally:
+        db.close()
+    return examples
+
+
+def train_and_save(path: str = MESSAGE_CLASSIFIER_WEIGHTS) -> MessageClassifier:
+    examples = load_training_examples()
+    scored = held_out_scores(examples)
+    scale = fit_calibration_scale(scored)
+    classifier = MessageClassifier.train(examples, calibration_scale=scale)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(classifier.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+    counts = Counter(label for _, label in examples)
+    # 교차 검증(학습에 쓰지 않은 예시) 기준 정확도와 평균 확신도: 평균 확신도가 정확도보다 크게 높으면 과신
+    predictions = [(_sigmoid(diff * scale), label) for diff, label in scored]
+    accuracy = sum((p >= 0.5) == (label == "experiment_log") for p, label in predictions) / max(len(predictions), 1)
+    confidence = sum(max(p, 1 - p) for p, _ in predictions) / max(len(predictions), 1)
+    print(f"[Classifier] 학습 완료: {dict(counts)}, n-gram {len(classifier.log_likelihoods[LABELS[0]])}개 → {path}")
+    print(f"[Classifier] 보정 배율 {scale}, 교차 검증 정확도 {accuracy:.3f}, 평균 확신도 {confidence:.3f}")
+    return classifier
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "train":
+        train_and_save()
+    else:
+        for line in sys.stdin:
+            print(get_classifier().predict(line.strip()) if line.strip() else "")
@@ -4,6 +4,7 @@ from typing import List, Dict, Any
 import os
 from dotenv import load_dotenv, find_dotenv
 from langsmith import traceable
+from app.services.context_builder import build_context, RISK_QUERY, ANALYSIS_CONTEXT_TOKEN_BUDGET
 
 dotenv_path = find_dotenv()
 if dotenv_path:
@@ -19,7 +20,7 @@ def analyze_chunk_group_advices(chunks: List[Document]) -> Dict[str, List[str]]:
     chunk 그룹(10개)에 대해 위험 조언, 주의사항, 안전수칙 리스트를 추출합니다.
     """
     llm = ChatOpenAI(model_name="gpt-4.1-mini", temperature=0, openai_api_key=openai_api_key)
-    context = "\n".join([doc.page_content for doc in chunks])
+    context = build_context(chunks, RISK_QUERY, token_budget=ANALYSIS_CONTEXT_TOKEN_BUDGET, sort_by_position=True)
     prompt = f"""
 아래는 실험실 매뉴얼의 일부입니다.
 
@@ -0,0 +1,190 @@
+"""
+여러 uvicorn 워커에 걸친 채팅 WebSocket 세션 관리.
+
+- 세션 상태(experiment_id, user_id, manual_id 등)는 Redis 해시 ws_session:{session_id}에 두어
+  재연결이 어느 워커로 가더라도 같은 세션을 이어 갈 수 있습니다. (대화 기록은 conversation_memory가 보관)
+- 워커마다 Redis pub/sub 연결 하나로 자기에게 붙은 세션의 채널(ws_session:{session_id}:events)만 구독하고,
+  notify()로 발행된 이벤트를 해당 WebSocket으로 전달합니다. 따라서 어느 워커(또는 백그라운드 작업)든
+  다른 워커에 연결된 클라이언트에게 이벤트(예: TTS 완료)를 보낼 수 있습니다.
+- 연결된 워커가 없어 아무도 받지 못한 이벤트는 잠시 보관했다가 재연결 시 전달합니다.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core import metrics
+from app.db.redis_conn import get_async_redis_conn
+
+WS_SESSION_TTL = int(os.getenv("WS_SESSION_TTL", 60 * 60 * 24))  # 마지막 활동 후 24시간
+WS_PENDING_EVENTS_MAX = int(os.getenv("WS_PENDING_EVENTS_MAX", 50))
+SESSION_KEY_PREFIX = "ws_session"
+
+# 이 프로세스를 구분하는 ID (세션 상태의 worker 필드에 기록)
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+EventSender = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _state_key(session_id: str) -> str:
+    return f"{SESSION_KEY_PREFIX}:{session_id}"
+
+
+def _channel(session_id: str) -> str:
+    return f"{SESSION_KEY_PREFIX}:{session_id}:events"
+
+
+def _pending_key(session_id: str) -> str:
+    return f"{SESSION_KEY_PREFIX}:{session_id}:pending"
+
+
+async def load_state(session_id: str) -> Dict[str, str]:
+    try:
+        return await get_async_redis_conn().hgetall(_state_key(session_id))
+    except Exception as e:
+        print(f"[Session] 세션 상태 조회 실패 ({session_id}): {e}")
+        return {}
+
+
+async def save_state(session_id: str, **fields):
+    """세션 상태 일부를 갱신하고 TTL을 연장합니다. (None 값은 건너뜀)"""
+    mapping = {k: str(v) for k, v in fields.items() if v is not None}
+    mapping["updated_at"] = str(int(time.time()))
+    try:
+        pipe = get_async_redis_conn().pipeline()
+        pipe.hset(_state_key(session_id), mapping=mapping)
+        pipe.expire(_state_key(session_id), WS_SESSION_TTL)
+        await pipe.execute()
+    except Exception as e:
+        print(f"[Session] 세션 상태 저장 실패 ({session_id}): {e}")
+
+
+async def notify(session_id: str, event: Dict[str, Any]) -> bool:
+    """
+    세션에 서버 이벤트를 보냅니다. 어느 워커에서 호출해도 클라이언트가 붙어 있는 워커가 전달합니다.
+    Returns: 구독 중인 워커가 있어 바로 전달되었는지 여부 (없으면 재연결 시 전달하도록 보관)
+    """
+    payload = json.dumps(event, ensure_ascii=False)
+    try:
+        redis_conn = get_async_redis_conn()
+        if await redis_conn.publish(_channel(session_id), payload):
+            metrics.incr("session.event.delivered")
+            return True
+        pipe = redis_conn.pipeline()
+        pipe.rpush(_pending_key(session_id), payload)
+        pipe.ltrim(_pending_key(session_id), -WS_PENDING_EVENTS_MAX, -1)
+        pipe.expire(_pending_key(session_id), WS_SESSION_TTL)
+        await pipe.execute()
+        metrics.incr("session.event.pending")
+    except Exception as e:
+        print(f"[Session] 이벤트 발행 실패 ({session_id}): {e}")
+    return False
+
+
+class SessionConnectionManager:
+    """
+    이 워커에 연결된 WebSocket 세션 목록과, 그 세션들의 채널을 구독하는 pub/sub 연결 하나를 관리합니다.
+    """
+
+    def __init__(self):
+        self.connections: Dict[str, EventSender] = {}
+        # 세션별 현재 연결의 토큰: 같은 session_id로 재연결한 뒤 이전 소켓의 disconnect가 늦게 실행되어도
+        # 새 연결을 지우지 않도록 구분합니다.
+        self._tokens: Dict[str, str] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self, session_id: str, send: EventSender, **state) -> str:
+        """
+        세션을 이 워커에 등록하고 채널을 구독한 뒤, 보관 중이던 이벤트를 전달합니다.
+        Returns: 이 연결의 토큰 (disconnect에 그대로 넘김)
+        """
+        token = uuid.uuid4().hex
+        async with self._lock:
+            self.connections[session_id] = send
+            self._tokens[session_id] = token
+            try:
+                if self._pubsub is None:
+                    self._pubsub = get_async_redis_conn().pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(_channel(session_id))
+                if self._listener is None or self._listener.done():
+                    self._listener = asyncio.create_task(self._listen())
+            except Exception as e:
+                print(f"[Session] 채널 구독 실패 ({session_id}): {e}")
+        await save_state(session_id, worker=WORKER_ID, connection=token, **state)
+        metrics.incr("session.connect")
+        await self._deliver_pending(session_id, send)
+        return token
+
+    async def disconnect(self, session_id: str, token: str):
+        """
+        token의 연결이 아직 이 세션의 현재 연결일 때만 등록/구독/소유 워커를 정리합니다.
+        (이미 같은 session_id로 재연결했다면 새 연결은 그대로 둠)
+        """
+        async with self._lock:
+            if self._tokens.get(session_id) != token:
+                metrics.incr("session.disconnect_superseded")
+                return
+            self.connections.pop(session_id, None)
+            self._tokens.pop(session_id, None)
+            try:
+                if self._pubsub is not None:
+                    await self._pubsub.unsubscribe(_channel(session_id))
+            except Exception as e:
+                print(f"[Session] 채널 구독 해제 실패 ({session_id}): {e}")
+        await self._release_owner(session_id, token)
+
+    async def _release_owner(self, session_id: str, token: str):
+        """다른 워커에 재연결되어 소유자가 바뀌었으면 덮어쓰지 않습니다."""
+        try:
+            redis_conn = get_async_redis_conn()
+            if await redis_conn.hget(_state_key(session_id), "connection") != token:
+                return
+        except Exception as e:
+            print(f"[Session] 세션 상태 조회 실패 ({session_id}): {e}")
+            return
+        await save_state(session_id, worker="", connection="")
+
+    async def _deliver_pending(self, session_id: str, send: EventSender):
+        try:
+            redis_conn = get_async_redis_conn()
+            pipe = redis_conn.pipeline()
+            pipe.lrange(_pending_key(session_id), 0, -1)
+            pipe.delete(_pending_key(session_id))
+            raw_events, _ = await pipe.execute()
+        except Exception as e:
+            print(f"[Session] 보관된 이벤트 조회 실패 ({session_id}): {e}")
+            return
+        for raw in raw_events:
+            await send(json.loads(raw))
+
+    async def _listen(self):
+        """
+        구독 중인 모든 세션 채널의 메시지를 받아 해당 WebSocket으로 전달합니다.
+        이 워커에 연결된 세션이 없으면 종료하고, 다음 connect()에서 다시 시작됩니다.
+        """
+        prefix, suffix = f"{SESSION_KEY_PREFIX}:", ":events"
+        while self.connections:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception as e:
+                print(f"[Session] pub/sub 수신 실패: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            session_id = message["channel"][len(prefix):-len(suffix)]
+            send = self.connections.get(session_id)
+            if send is None:
+                continue
+            try:
+                await send(json.loads(message["data"]))
+            except Exception as e:
+                print(f"[Session] 이벤트 전달 실패 ({session_id}): {e}")
+
+
+# 워커당 하나의 연결 관리자
+connection_manager = SessionConnectionManager()
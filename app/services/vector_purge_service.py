@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from app.core import metrics
+from app.db.redis_conn import get_redis_conn
+from app.db.vector_store import get_vector_store
+
+VECTOR_PURGE_QUEUE_KEY = "vector_purge:queue"
+VECTOR_PURGE_PROCESSING_KEY = "vector_purge:processing"  # 처리 중 작업 (워커가 죽으면 다시 큐로 복구)
+VECTOR_PURGE_LEASES_KEY = "vector_purge:leases"  # 처리 중 작업 → 임대 만료 시각 (sorted set)
+VECTOR_PURGE_REPORT_KEY = "vector_purge:last_report"
+VECTOR_COMPACTION_REPORT_KEY = "vector_purge:last_compaction"
+VECTOR_PURGE_PENDING_COMPACTION_KEY = "vector_purge:deleted_since_compaction"
+VECTOR_COMPACTION_LOCK_KEY = "vector_purge:compaction_lock"
+VECTOR_COMPACTION_LAST_RUN_KEY = "vector_purge:last_compaction_at"  # 마지막으로 압축에 성공한 시각
+
+VECTOR_PURGE_BATCH_SIZE = int(os.getenv("VECTOR_PURGE_BATCH_SIZE", 500))
+VECTOR_PURGE_MAX_ATTEMPTS = 3
+# 처리 중 작업의 임대 시간(초). 배치마다 연장하며, 만료된 작업만 다른 워커가 큐로 되돌립니다.
+VECTOR_PURGE_LEASE_SECONDS = int(os.getenv("VECTOR_PURGE_LEASE_SECONDS", 300))
+VECTOR_COMPACTION_INTERVAL = int(os.getenv("VECTOR_COMPACTION_INTERVAL", 60 * 60 * 6))  # 6시간
+VECTOR_COMPACTION_MIN_DELETED = int(os.getenv("VECTOR_COMPACTION_MIN_DELETED", 1000))  # 이 이상 삭제되었을 때만 압축
+VECTOR_COMPACTION_CHECK_INTERVAL = int(os.getenv("VECTOR_COMPACTION_CHECK_INTERVAL", 60 * 10))  # 압축 조건 확인 주기
+VECTOR_COMPACTION_LOCK_TTL = int(os.getenv("VECTOR_COMPACTION_LOCK_TTL", 60 * 30))  # 압축 중 워커가 죽어도 풀리는 시간
+
+
+def enqueue_manual_purge(manual_id: str):
+    """매뉴얼 삭제 요청 시 벡터 삭제 작업을 큐에 넣습니다. 실제 삭제는 백그라운드 작업이 수행합니다."""
+    job = {"manual_id": manual_id, "enqueued_at": time.time(), "attempts": 0}
+    get_redis_conn().rpush(VECTOR_PURGE_QUEUE_KEY, json.dumps(job))
+    metrics.incr("vector_purge.enqueued")
+    print(f"[VectorPurge] 삭제 작업 등록: manual_id={manual_id}")
+
+
+def purge_manual_vectors(manual_id: str, on_batch: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    manual_id의 청크를 ID 목록 기준으로 배치 삭제하고, 남은 개수가 0인지 확인합니다.
+    on_batch: 배치마다 호출 (작업 임대 연장용)
+    """
+    start = time.perf_counter()
+    vector_store = get_vector_store()
+    ids = vector_store.get(where={"manual_id": manual_id})["ids"]
+    for offset in range(0, len(ids), VECTOR_PURGE_BATCH_SIZE):
+        vector_store.delete(ids[offset:offset + VECTOR_PURGE_BATCH_SIZE])
+        if on_batch is not None:
+            on_batch()
+    remaining = vector_store.count(where={"manual_id": manual_id})
+    return {
+        "manual_id": manual_id,
+        "deleted": len(ids),
+        "remaining": remaining,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "finished_at": time.time(),
+    }
+
+
+def _renew_lease(redis_conn, raw: str):
+    redis_conn.zadd(VECTOR_PURGE_LEASES_KEY, {raw: time.time() + VECTOR_PURGE_LEASE_SECONDS})
+
+
+def recover_stale_jobs() -> int:
+    """
+    임대가 만료된 처리 중 작업(처리하던 워커가 죽은 작업)을 다시 큐로 돌려놓습니다.
+    다른 워커가 아직 처리 중인 작업은 그대로 둡니다. (시작 시와 큐 처리 전에 호출)
+
+    Returns:
+        복구한 작업 수
+    """
+    redis_conn = get_redis_conn()
+    now = time.time()
+    recovered = 0
+    for raw in redis_conn.lrange(VECTOR_PURGE_PROCESSING_KEY, 0, -1):
+        lease = redis_conn.zscore(VECTOR_PURGE_LEASES_KEY, raw)
+        if lease is None:
+            # 처리 목록으로 옮긴 직후 임대를 기록하기 전일 수 있으므로, 지금부터 임대 시간만큼 기다립니다.
+            redis_conn.zadd(VECTOR_PURGE_LEASES_KEY, {raw: now + VECTOR_PURGE_LEASE_SECONDS}, nx=True)
+            continue
+        if lease > now:
+            continue
+        # 여러 워커가 동시에 복구해도 목록에서 지운 한 워커만 다시 넣습니다.
+        if redis_conn.lrem(VECTOR_PURGE_PROCESSING_KEY, 1, raw):
+            pipe = redis_conn.pipeline()
+            pipe.lpush(VECTOR_PURGE_QUEUE_KEY, raw)
+            pipe.zrem(VECTOR_PURGE_LEASES_KEY, raw)
+            pipe.execute()
+            recovered += 1
+            metrics.incr("vector_purge.recovered")
+    return recovered
+
+
+def process_purge_queue(max_jobs: int = 20) -> int:
+    """
+    큐에 쌓인 삭제 작업을 처리합니다. 삭제 후에도 청크가 남아 있으면 재시도하고,
+    VECTOR_PURGE_MAX_ATTEMPTS번 실패하면 포기하고 지표로 남깁니다.
+
+    Returns:
+        처리한 작업 수
+    """
+    redis_conn = get_redis_conn()
+    recover_stale_jobs()
+    processed = 0
+    while processed < max_jobs:
+        raw = redis_conn.lmove(VECTOR_PURGE_QUEUE_KEY, VECTOR_PURGE_PROCESSING_KEY, "LEFT", "RIGHT")
+        if raw is None:
+            break
+        _renew_lease(redis_conn, raw)
+        job = json.loads(raw)
+        try:
+            report = purge_manual_vectors(job["manual_id"], on_batch=lambda: _renew_lease(redis_conn, raw))
+            report["queue_wait_ms"] = round((time.time() - job["enqueued_at"]) * 1000, 1)
+            redis_conn.set(VECTOR_PURGE_REPORT_KEY, json.dumps(report))
+            redis_conn.incrby(VECTOR_PURGE_PENDING_COMPACTION_KEY, report["deleted"])
+            metrics.incr("vector_purge.deleted_vectors", report["deleted"])
+            metrics.observe("vector_purge.elapsed_ms", report["elapsed_ms"])
+            print(f"[VectorPurge] 삭제 완료: {report}")
+            if report["remaining"] > 0:
+                raise RuntimeError(f"{report['remaining']}개 청크가 삭제되지 않았습니다.")
+            metrics.incr("vector_purge.completed")
+        except Exception as e:
+            job["attempts"] += 1
+            print(f"[VectorPurge] 삭제 실패 (manual_id={job['manual_id']}, 시도 {job['attempts']}회): {e}")
+            if job["attempts"] < VECTOR_PURGE_MAX_ATTEMPTS:
+                redis_conn.rpush(VECTOR_PURGE_QUEUE_KEY, json.dumps(job))
+            else:
+                metrics.incr("vector_purge.failed")
+        finally:
+            pipe = redis_conn.pipeline()
+            pipe.lrem(VECTOR_PURGE_PROCESSING_KEY, 1, raw)
+            pipe.zrem(VECTOR_PURGE_LEASES_KEY, raw)
+            pipe.execute()
+        processed += 1
+    return processed
+
+
+def compact_vector_store(force: bool = False) -> Optional[Dict]:
+    """
+    삭제가 충분히 누적되었고 마지막 압축 후 VECTOR_COMPACTION_INTERVAL이 지났으면 벡터 저장소를 압축하고,
+    회수한 용량과 소요 시간을 기록합니다. 여러 워커가 동시에 압축하지 않도록 Redis 잠금을 잡습니다.
+    """
+    redis_conn = get_redis_conn()
+    deleted = int(redis_conn.get(VECTOR_PURGE_PENDING_COMPACTION_KEY) or 0)
+    if not force:
+        if deleted < VECTOR_COMPACTION_MIN_DELETED:
+            return None
+        last_run = float(redis_conn.get(VECTOR_COMPACTION_LAST_RUN_KEY) or 0)
+        if time.time() - last_run < VECTOR_COMPACTION_INTERVAL:
+            return None
+
+    token = uuid.uuid4().hex
+    if not redis_conn.set(VECTOR_COMPACTION_LOCK_KEY, token, nx=True, ex=VECTOR_COMPACTION_LOCK_TTL):
+        return None
+
+    try:
+        vector_store = get_vector_store()
+        start = time.perf_counter()
+        bytes_before = vector_store.disk_usage()
+        vector_store.compact()
+        bytes_after = vector_store.disk_usage()
+        report = {
+            "deleted_since_last": deleted,
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "reclaimed_bytes": bytes_before - bytes_after,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            "finished_at": time.time(),
+        }
+        pipe = redis_conn.pipeline()
+        pipe.decrby(VECTOR_PURGE_PENDING_COMPACTION_KEY, deleted)
+        pipe.set(VECTOR_COMPACTION_REPORT_KEY, json.dumps(report))
+        # 다음 압축까지의 간격은 잠금 TTL이 아니라 마지막 성공 시각으로 판단합니다. (실패하면 다음 확인 때 재시도)
+        pipe.set(VECTOR_COMPACTION_LAST_RUN_KEY, report["finished_at"])
+        pipe.execute()
+    except Exception as e:
+        metrics.incr("vector_compaction.failed")
+        print(f"[VectorPurge] 압축 실패: {e}")
+        return None
+    finally:
+        # 잠금이 만료되어 다른 워커가 잡은 경우에는 건드리지 않습니다.
+        try:
+            if redis_conn.get(VECTOR_COMPACTION_LOCK_KEY) == token:
+                redis_conn.delete(VECTOR_COMPACTION_LOCK_KEY)
+        except Exception as e:
+            print(f"[VectorPurge] 압축 잠금 해제 실패: {e}")
+    metrics.incr("vector_compaction.runs")
+    metrics.observe("vector_compaction.elapsed_ms", report["elapsed_ms"])
+    metrics.incr("vector_compaction.reclaimed_bytes", max(report["reclaimed_bytes"], 0))
+    print(f"[VectorPurge] 압축 완료: {report}")
+    return report
+
+
+def get_maintenance_report() -> Dict:
+    """최근 삭제/압축 결과와 대기 중인 작업 수"""
+    redis_conn = get_redis_conn()
+    last_purge = redis_conn.get(VECTOR_PURGE_REPORT_KEY)
+    last_compaction = redis_conn.get(VECTOR_COMPACTION_REPORT_KEY)
+    return {
+        "queued_jobs": redis_conn.llen(VECTOR_PURGE_QUEUE_KEY),
+        "processing_jobs": redis_conn.llen(VECTOR_PURGE_PROCESSING_KEY),
+        "deleted_since_compaction": int(redis_conn.get(VECTOR_PURGE_PENDING_COMPACTION_KEY) or 0),
+        "last_purge": json.loads(last_purge) if last_purge else None,
+        "last_compaction": json.loads(last_compaction) if last_compaction else None,
+    }
@@ -0,0 +1,66 @@
+"""
+답변 방식 비교: fast(검색 1회 + LLM 1회) vs agent(함수 호출 에이전트)
+
+같은 질문을 두 방식으로 답하게 하고 지연시간, LLM 호출 수, 프롬프트/완성 토큰 수를 나란히 출력합니다.
+답변 캐시를 거치지 않도록 캐시 조회를 끄고 실행하며, OpenAI API를 실제로 호출합니다.
+
+실행: python -m benchmarks.answer_mode_compare --manual-id <manual_id> [--questions questions.txt]
+"""
+import asyncio
+import argparse
+from typing import Dict, List
+
+from app.services import agent_chat_service, answer_cache
+
+DEFAULT_QUESTIONS = [
+    "이 실험에서 사용하는 시약의 농도는 얼마인가요?",
+    "실험 전에 확인해야 할 안전 수칙을 알려주세요.",
+    "장비 세척은 어떻게 하나요?",
+    "폐액은 어떻게 처리해야 하나요?",
+]
+MODES = ("fast", "agent")
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+async def run(manual_id: str, questions: List[str], user_id: str) -> Dict[str, List[Dict]]:
+    results = {mode: [] for mode in MODES}
+    for question in questions:
+        for mode in MODES:
+            result = await agent_chat_service.agent_chat_answer_async(
+                manual_id=manual_id, sender="user", message=question, user_id=user_id, mode=mode
+            )
+            if result.get("usage"):
+                results[mode].append(result["usage"])
+            print(f"[{mode}] {question} → {result['response'][:60]!r}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manual-id", required=True)
+    parser.add_argument("--questions", help="한 줄에 질문 하나씩 적은 파일")
+    parser.add_argument("--user-id", default="benchmark_user")
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    # 같은 질문을 반복하므로 캐시 적중이 결과를 왜곡하지 않도록 캐시를 끔
+    answer_cache.is_cacheable = lambda message: False
+    results = asyncio.run(run(args.manual_id, questions, args.user_id))
+
+    print(f"\n{'mode':<6} {'n':>3} {'latency(ms)':>12} {'llm calls':>10} {'prompt tok':>11} {'completion tok':>15}")
+    for mode in MODES:
+        rows = results[mode]
+        print(f"{mode:<6} {len(rows):>3} {_mean([r['latency_ms'] for r in rows]):>12.0f} "
+              f"{_mean([r['llm_calls'] for r in rows]):>10.1f} {_mean([r['prompt_tokens'] for r in rows]):>11.0f} "
+              f"{_mean([r['completion_tokens'] for r in rows]):>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
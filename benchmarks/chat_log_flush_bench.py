@@ -0,0 +1,99 @@
+"""
+채팅 로그 flush 처리량 비교: 행마다 INSERT + COMMIT (기존) vs 배치 INSERT (executemany, 배치당 트랜잭션 1회)
+
+합성 채팅 로그 N건을 두 방식으로 chat_logs 테이블에 넣고 초당 행 수를 출력합니다.
+기본값은 임시 SQLite 파일에 테이블을 만들어 측정하며, 실제 MySQL에서 재려면
+테스트용 DB URL을 --database-url로 넘기세요. (측정 후 넣은 행은 삭제합니다)
+
+실행: python -m benchmarks.chat_log_flush_bench [--rows 1000] [--batch-size 500] [--database-url mysql+pymysql://...]
+"""
+import os
+import time
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import chat_log_crud
+from app.models.chat_logs import ChatLog
+
+BENCH_EXPERIMENT_ID = -424242  # 측정용 행 구분 (정리 시 이 값으로 삭제)
+
+
+def make_logs(count: int) -> List[Dict]:
+    now = datetime.utcnow().isoformat()
+    return [{
+        "experiment_id": BENCH_EXPERIMENT_ID,
+        "user_id": None,
+        "manual_id": None,
+        "sender": "user" if i % 2 == 0 else "ai",
+        "message": f"벤치마크 메시지 {i} " + "가나다라마바사 " * 10,
+        "created_at": now,
+    } for i in range(count)]
+
+
+def row_by_row(session_factory, logs: List[Dict]) -> float:
+    db = session_factory()
+    try:
+        start = time.perf_counter()
+        for log in logs:
+            chat_log_crud.create_chat_log(db, {k: v for k, v in log.items() if k != "created_at"})
+        return time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def batched(session_factory, logs: List[Dict], batch_size: int) -> float:
+    db = session_factory()
+    try:
+        start = time.perf_counter()
+        for i in range(0, len(logs), batch_size):
+            chat_log_crud.create_chat_log_batch(db, logs[i:i + batch_size])
+        return time.perf_counter() - start
+    finally:
+        db.close()
+
+
+def cleanup(session_factory):
+    db = session_factory()
+    try:
+        db.query(ChatLog).filter(ChatLog.experiment_id == BENCH_EXPERIMENT_ID).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--database-url", help="측정할 DB (기본: 임시 SQLite 파일)")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'chat_log_bench.db')}"
+    engine = create_engine(database_url)
+    ChatLog.__table__.create(bind=engine, checkfirst=True)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    logs = make_logs(args.rows)
+    try:
+        before = row_by_row(session_factory, logs)
+        cleanup(session_factory)
+        after = batched(session_factory, logs, args.batch_size)
+    finally:
+        cleanup(session_factory)
+
+    print(f"DB: {engine.url.render_as_string(hide_password=True)}, 행 {args.rows}개")
+    print(f"{'method':<28} {'seconds':>8} {'rows/s':>10}")
+    print(f"{'row-by-row (commit each)':<28} {before:>8.3f} {args.rows / before:>10.0f}")
+    print(f"{f'batch (size {args.batch_size})':<28} {after:>8.3f} {args.rows / after:>10.0f}")
+    print(f"속도 향상: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+채팅 로그 조회 성능: (experiment_id, created_at, id) 인덱스 적용 전후 비교
+
+chat_logs에 여러 실험의 메시지가 섞인 합성 데이터 N행을 넣고, 인덱스 없이 / 마이그레이션으로 인덱스를 만든 뒤
+다음 조회의 평균 지연시간(ms)을 출력합니다.
+- full: 기존 load_chat_logs (실험 전체 대화, created_at 정렬, 제한 없음)
+- latest: 최신 10개 (continue)
+- before: 대화 중간의 커서 이전 100개 (이전 페이지)
+- after: 대화 앞부분의 커서 이후 100개 (다음 페이지)
+
+기본값은 임시 SQLite 파일을 사용하며, 실제 MySQL에서 재려면 비어 있는 테스트용 DB URL을 --database-url로 넘기세요.
+(chat_logs 테이블이 없으면 만들고, 측정 후 넣은 행은 삭제합니다)
+
+실행: python -m benchmarks.chat_log_query_bench [--rows 200000] [--experiments 2000] [--queries 50] [--database-url ...]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import chat_log_crud
+from app.db.migrations import add_chat_log_experiment_index
+from app.models.chat_logs import ChatLog
+
+BENCH_EXPERIMENT_OFFSET = 10_000_000  # 측정용 실험 ID 범위 (정리 시 이 범위를 삭제)
+SEED_CHUNK = 10_000
+
+
+def seed(engine, rows: int, experiments: int):
+    """실험들이 번갈아 대화하는 것처럼 행을 섞어 넣습니다. (한 실험의 행이 테이블 전체에 흩어지도록)"""
+    start = datetime.utcnow() - timedelta(seconds=rows)
+    with engine.begin() as conn:
+        for offset in range(0, rows, SEED_CHUNK):
+            conn.execute(insert(ChatLog), [{
+                "experiment_id": BENCH_EXPERIMENT_OFFSET + random.randrange(experiments),
+                "sender": "user" if i % 2 == 0 else "ai",
+                "message": f"벤치마크 메시지 {i}",
+                "created_at": start + timedelta(seconds=i),
+            } for i in range(offset, min(offset + SEED_CHUNK, rows))])
+
+
+def cleanup(session_factory):
+    db = session_factory()
+    try:
+        db.query(ChatLog).filter(ChatLog.experiment_id >= BENCH_EXPERIMENT_OFFSET).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def drop_experiment_index(engine):
+    for index in ChatLog.__table__.indexes:
+        if index.name == "ix_chat_logs_experiment_id_created_at_id":
+            index.drop(bind=engine, checkfirst=True)
+
+
+def measure(session_factory, experiment_ids: List[int]) -> Dict[str, float]:
+    db = session_factory()
+    cursors = {}
+    for experiment_id in experiment_ids:
+        ids = [row.id for row in db.query(ChatLog.id).filter(ChatLog.experiment_id == experiment_id)
+               .order_by(ChatLog.created_at, ChatLog.id)]
+        cursors[experiment_id] = (ids[len(ids) // 2], ids[len(ids) // 10]) if ids else (None, None)
+
+    queries: Dict[str, Callable[[int], object]] = {
+        "full": lambda e: db.query(ChatLog).filter(ChatLog.experiment_id == e).order_by(ChatLog.created_at).all(),
+        "latest": lambda e: chat_log_crud.continue_chat_logs(db, e, limit=10),
+        "before": lambda e: chat_log_crud.load_chat_logs(db, e, limit=100, before=cursors[e][0]),
+        "after": lambda e: chat_log_crud.load_chat_logs(db, e, limit=100, after=cursors[e][1]),
+    }
+    results = {}
+    try:
+        for name, query in queries.items():
+            start = time.perf_counter()
+            for experiment_id in experiment_ids:
+                query(experiment_id)
+            results[name] = (time.perf_counter() - start) * 1000 / len(experiment_ids)
+            db.expunge_all()
+    finally:
+        db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--experiments", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--database-url", help="측정할 DB (기본: 임시 SQLite 파일)")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'chat_log_query_bench.db')}"
+    engine = create_engine(database_url)
+    ChatLog.__table__.create(bind=engine, checkfirst=True)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    experiment_ids = [BENCH_EXPERIMENT_OFFSET + e for e in random.sample(range(args.experiments),
+                                                                          min(args.queries, args.experiments))]
+    try:
+        seed(engine, args.rows, args.experiments)
+        drop_experiment_index(engine)
+        before = measure(session_factory, experiment_ids)
+        add_chat_log_experiment_index(engine)
+        after = measure(session_factory, experiment_ids)
+    finally:
+        cleanup(session_factory)
+
+    print(f"DB: {engine.url.render_as_string(hide_password=True)}, 행 {args.rows}개, "
+          f"실험 {args.experiments}개, 질의 {len(experiment_ids)}회씩")
+    print(f"{'query':<10} {'no index ms':>12} {'index ms':>10} {'speedup':>8}")
+    for name in before:
+        print(f"{name:<10} {before[name]:>12.2f} {after[name]:>10.2f} {before[name] / after[name]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+검색 컨텍스트 정리(context_builder) 전후 비교 리포트.
+
+실제 채팅 로그의 사용자 질문으로 hybrid_search 결과를 받아,
+기존 방식(청크 page_content 단순 연결)과 build_context 결과의 토큰 수를 비교합니다.
+답에 필요한 문장이 빠지지 않았는지 보기 위해, 원문에서 질의어와 겹치는 문장 중
+정리된 컨텍스트에도 남아 있는 비율(관련 문장 보존율)을 함께 출력합니다.
+
+실행: python -m benchmarks.context_builder_report [--max-queries 200] [--k 4] [--budget 1500]
+"""
+import re
+import argparse
+from typing import List
+
+from app.core.tokens import count_tokens
+from app.services.context_builder import build_context
+from app.services.lexical_index import hybrid_search, tokenize
+from benchmarks.quantization_report import load_logged_questions
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+_SPACES = re.compile(r"\s+")
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def relevant_sentences(texts: List[str], query: str) -> List[str]:
+    """질의어 토큰이 2개 이상 들어 있는 원문 문장 (답이 들어 있을 가능성이 높은 문장의 근사치)"""
+    query_terms = set(tokenize(query))
+    sentences = []
+    for text in texts:
+        for sentence in _SENTENCE_BREAK.split(text):
+            sentence = _SPACES.sub(" ", sentence).strip()
+            if len(sentence) >= 10 and len(set(tokenize(sentence)) & query_terms) >= 2:
+                sentences.append(sentence)
+    return sentences
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--budget", type=int, default=1500)
+    args = parser.parse_args()
+
+    raw_tokens, built_tokens, kept, total = [], [], 0, 0
+    for manual_id, questions in load_logged_questions(args.max_queries).items():
+        for question in questions:
+            docs = hybrid_search(manual_id, question, k=args.k)
+            if not docs:
+                continue
+            raw = "\n".join(doc.page_content for doc in docs)
+            built = build_context(docs, question, token_budget=args.budget)
+            raw_tokens.append(count_tokens(raw))
+            built_tokens.append(count_tokens(built))
+            flat = _SPACES.sub(" ", built)
+            for sentence in relevant_sentences([doc.page_content for doc in docs], question):
+                total += 1
+                kept += sentence in flat
+
+    if not raw_tokens:
+        print("평가할 질의가 없습니다. (chat_logs에 사용자 질문이 필요합니다)")
+        return
+    saved = 1 - sum(built_tokens) / sum(raw_tokens)
+    print(f"질의 {len(raw_tokens)}개, k={args.k}, 예산 {args.budget} 토큰")
+    print(f"{'':<10} {'mean':>8} {'p50':>8} {'p95':>8}")
+    for label, samples in (("raw", raw_tokens), ("built", built_tokens)):
+        print(f"{label:<10} {sum(samples) / len(samples):>8.0f} {_percentile(samples, 0.5):>8.0f} "
+              f"{_percentile(samples, 0.95):>8.0f}")
+    print(f"프롬프트 토큰 절감: {saved:.1%}")
+    print(f"관련 문장 보존율: {kept / total if total else 1.0:.1%} ({kept}/{total})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+임베딩 양자화(float16/int8) 정확도·지연시간 리포트.
+
+실제 채팅 로그의 사용자 질문(chat_logs.sender='user')을 질의로 사용하여,
+매뉴얼별 float32 정확 검색 결과를 기준으로 양자화 검색의 recall@k, 지연시간, 메모리 크기를 비교합니다.
+각 양자화 방식은 재점수 없음(양자화 점수만) / float32 재점수 두 가지로 측정합니다.
+
+질의 임베딩에 OpenAI API를 사용합니다. --proxy-queries를 주면 로그 대신
+매뉴얼 청크 벡터에 잡음을 섞어 질의로 사용하므로 API 호출 없이 실행됩니다.
+
+실행: python -m benchmarks.quantization_report [--k 4] [--max-queries 500] [--proxy-queries]
+"""
+import time
+import argparse
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+from app.db.database import SessionLocal
+from app.db.quantization import QuantizedMatrix, top_k_indices
+from app.db.vector_store import get_embeddings, get_vector_store, _normalize_rows
+from app.models.chat_logs import ChatLog
+from app.models.manuals import Manual
+
+MODES = ("float16", "int8")
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def load_logged_questions(max_queries: int) -> Dict[str, List[str]]:
+    """manual_id(문자열) → 사용자 질문 목록"""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Manual.manual_id, ChatLog.message)
+            .join(Manual, Manual.id == ChatLog.manual_id)
+            .filter(ChatLog.sender == "user")
+            .order_by(ChatLog.created_at.desc())
+            .limit(max_queries)
+            .all()
+        )
+    finally:
+        db.close()
+    questions = defaultdict(list)
+    for manual_id, message in rows:
+        if message and message.strip():
+            questions[manual_id].append(message.strip())
+    return questions
+
+
+def load_manual_matrix(manual_id: str) -> np.ndarray:
+    results = get_vector_store().get(where={"manual_id": manual_id}, include_embeddings=True)
+    if not results["ids"]:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.ascontiguousarray(_normalize_rows(np.asarray(results["embeddings"], dtype=np.float32)))
+
+
+def build_queries(max_queries: int, proxy: bool, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """manual_id → 정규화된 질의 행렬"""
+    if proxy:
+        store = get_vector_store()
+        manual_ids = sorted({m.get("manual_id") for m in store.get()["metadatas"] if m and m.get("manual_id")})
+        per_manual = max(1, max_queries // max(len(manual_ids), 1))
+        queries = {}
+        for manual_id in manual_ids:
+            matrix = load_manual_matrix(manual_id)
+            if len(matrix) == 0:
+                continue
+            picked = matrix[rng.integers(len(matrix), size=per_manual)]
+            noise = rng.standard_normal(picked.shape).astype(np.float32) * 0.02
+            queries[manual_id] = _normalize_rows(picked + noise)
+        return queries
+
+    embeddings = get_embeddings()
+    queries = {}
+    for manual_id, questions in load_logged_questions(max_queries).items():
+        queries[manual_id] = _normalize_rows(np.asarray(embeddings.embed_documents(questions), dtype=np.float32))
+    return queries
+
+
+def evaluate(queries: Dict[str, np.ndarray], k: int, rescore_factor: int):
+    stats = defaultdict(lambda: {"hits": 0, "total": 0, "latencies": [], "bytes": 0})
+    for manual_id, query_matrix in queries.items():
+        matrix = load_manual_matrix(manual_id)
+        if len(matrix) == 0:
+            continue
+        quantized = {mode: QuantizedMatrix.from_float32(matrix, mode) for mode in MODES}
+        stats["float32"]["bytes"] += matrix.nbytes
+        for mode in MODES:
+            stats[mode]["bytes"] += quantized[mode].nbytes
+            stats[f"{mode}+rescore"]["bytes"] += quantized[mode].nbytes
+
+        for query in query_matrix:
+            start = time.perf_counter()
+            exact_scores = matrix @ query
+            truth = top_k_indices(exact_scores, k)
+            stats["float32"]["latencies"].append((time.perf_counter() - start) * 1000)
+            truth_set = set(truth.tolist())
+
+            for mode in MODES:
+                for label, factor, exact_rows in (
+                    (mode, 1, None),
+                    (f"{mode}+rescore", rescore_factor, lambda idx: matrix[idx]),
+                ):
+                    start = time.perf_counter()
+                    found, _ = quantized[mode].search(query, k, exact_rows=exact_rows, rescore_factor=factor)
+                    stats[label]["latencies"].append((time.perf_counter() - start) * 1000)
+                    stats[label]["hits"] += len(truth_set.intersection(found.tolist()))
+                    stats[label]["total"] += len(truth_set)
+            stats["float32"]["hits"] += len(truth_set)
+            stats["float32"]["total"] += len(truth_set)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--max-queries", type=int, default=500)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--proxy-queries", action="store_true", help="로그 대신 청크 벡터+잡음을 질의로 사용 (API 호출 없음)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    queries = build_queries(args.max_queries, args.proxy_queries, np.random.default_rng(args.seed))
+    total_queries = sum(len(q) for q in queries.values())
+    if not total_queries:
+        print("평가할 질의가 없습니다. (채팅 로그가 비어 있으면 --proxy-queries 사용)")
+        return
+    print(f"매뉴얼 {len(queries)}개, 질의 {total_queries}개, recall@{args.k}")
+
+    stats = evaluate(queries, args.k, args.rescore_factor)
+    print(f"{'mode':<16} {'recall':>8} {'p50(ms)':>9} {'p95(ms)':>9} {'vectors(MB)':>12}")
+    for label in ("float32",) + tuple(f"{m}{suffix}" for m in MODES for suffix in ("", "+rescore")):
+        row = stats[label]
+        recall = row["hits"] / row["total"] if row["total"] else 0.0
+        print(f"{label:<16} {recall:>8.4f} {_percentile(row['latencies'], 0.5):>9.3f} "
+              f"{_percentile(row['latencies'], 0.95):>9.3f} {row['bytes'] / 1024 / 1024:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+벡터 저장소 백엔드(Chroma vs NumPy) 벤치마크.
+
+실제 매뉴얼 규모(매뉴얼당 수백~수천 청크, 1536차원 OpenAI 임베딩)를 난수 단위벡터로 재현하여
+적재 시간, manual_id 필터 top-k 검색 지연시간(p50/p95), 디스크 사용량을 비교합니다.
+임베딩 API는 호출하지 않습니다.
+
+실행: python -m benchmarks.vector_store_bench [--manuals 20] [--chunks 300,1000,3000]
+"""
+import time
+import shutil
+import argparse
+import tempfile
+from typing import List
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.db.vector_store import ChromaVectorStore, NumpyVectorStore, VectorStore, dir_size
+
+DIM = 1536
+
+
+class _NoEmbeddings:
+    """벤치마크에서는 미리 만든 벡터만 사용하므로 임베딩 호출이 일어나면 안 됩니다."""
+
+    def embed_query(self, text):
+        raise RuntimeError("benchmark must not call the embedding API")
+
+    def embed_documents(self, texts):
+        raise RuntimeError("benchmark must not call the embedding API")
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def run(store: VectorStore, directory: str, manuals: int, chunks: int, queries: int, rng: np.random.Generator):
+    manual_ids = [f"bench-{chunks}-{m}" for m in range(manuals)]
+
+    start = time.perf_counter()
+    for manual_id in manual_ids:
+        vectors = rng.standard_normal((chunks, DIM)).astype(np.float32)
+        docs = [Document(page_content=f"{manual_id} chunk {i}", metadata={"manual_id": manual_id, "chunk_idx": i})
+                for i in range(chunks)]
+        # Chroma 배치 상한을 넘지 않도록 나누어 적재
+        for offset in range(0, chunks, 1000):
+            store.add_documents(docs[offset:offset + 1000],
+                                ids=[f"{manual_id}:{i}" for i in range(offset, min(offset + 1000, chunks))],
+                                embeddings=vectors[offset:offset + 1000])
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(queries):
+        manual_id = manual_ids[rng.integers(len(manual_ids))]
+        query = rng.standard_normal(DIM).astype(np.float32)
+        start = time.perf_counter()
+        store.similarity_search_by_vector_with_score(query, k=4, filter={"manual_id": manual_id})
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "load_s": load_seconds,
+        "p50_ms": _percentile(latencies, 0.5),
+        "p95_ms": _percentile(latencies, 0.95),
+        "disk_mb": dir_size(directory) / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manuals", type=int, default=20)
+    parser.add_argument("--chunks", default="300,1000,3000", help="매뉴얼당 청크 수 (쉼표 구분)")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'chunks/manual':>13} {'load(s)':>9} {'p50(ms)':>9} {'p95(ms)':>9} {'disk(MB)':>9}")
+    for chunks in [int(c) for c in args.chunks.split(",")]:
+        for name, factory in (("chroma", ChromaVectorStore), ("numpy", NumpyVectorStore)):
+            directory = tempfile.mkdtemp(prefix=f"vs-bench-{name}-")
+            try:
+                store = factory(_NoEmbeddings(), directory)
+                result = run(store, directory, args.manuals, chunks, args.queries, np.random.default_rng(0))
+                print(f"{name:<8} {chunks:>13} {result['load_s']:>9.2f} {result['p50_ms']:>9.2f} "
+                      f"{result['p95_ms']:>9.2f} {result['disk_mb']:>9.1f}")
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
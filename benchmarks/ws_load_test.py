@@ -0,0 +1,82 @@
+"""
+/api/ws/agent-chat 동시 접속 부하 테스트.
+
+N개의 WebSocket 세션이 동시에 질문을 보내고 응답 지연시간을 측정합니다.
+응답 처리가 이벤트 루프를 막으면 세션들이 한 줄로 처리되어 전체 소요시간 ≈ 개별 지연시간의 합이 되고,
+비동기로 처리되면 전체 소요시간 ≈ 가장 느린 세션 하나의 시간에 가까워집니다.
+(직렬화 비율 = 전체 소요시간 / 개별 지연시간 합, 1에 가까우면 직렬화, 1/N에 가까우면 병렬)
+
+실행 (서버가 떠 있는 상태에서):
+    python -m benchmarks.ws_load_test --manual-id <manual_id> [--sessions 10] [--turns 3] [--stream]
+"""
+import time
+import asyncio
+import argparse
+import json
+from typing import List
+
+import websockets
+
+DEFAULT_QUESTIONS = [
+    "이 실험에서 사용하는 시약의 농도는 얼마인가요?",
+    "실험 전에 확인해야 할 안전 수칙을 알려주세요.",
+    "장비 세척은 어떻게 하나요?",
+]
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+async def run_session(url: str, manual_id: str, user_id: str, turns: int, latencies: List[float],
+                      ttfts: List[float], stream: bool):
+    async with websockets.connect(f"{url}?manual_id={manual_id}", max_size=None) as ws:
+        for turn in range(turns):
+            payload = {"manual_id": manual_id, "user_id": user_id, "stream": stream,
+                       "message": DEFAULT_QUESTIONS[turn % len(DEFAULT_QUESTIONS)]}
+            start = time.perf_counter()
+            first_frame = None
+            await ws.send(json.dumps(payload, ensure_ascii=False))
+            while True:
+                frame = json.loads(await ws.recv())
+                if first_frame is None:
+                    first_frame = time.perf_counter()
+                # 스트리밍 프레임(delta)은 건너뛰고 최종 응답까지 기다림
+                if "answer" in frame or "error" in frame:
+                    break
+            latencies.append(time.perf_counter() - start)
+            ttfts.append(first_frame - start)
+
+
+async def main_async(args):
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_session(args.url, args.manual_id, f"{args.user_prefix}{i}", args.turns, latencies, ttfts, args.stream)
+        for i in range(args.sessions)
+    ])
+    wall = time.perf_counter() - start
+
+    total = sum(latencies)
+    print(f"세션 {args.sessions}개 × {args.turns}턴, 응답 {len(latencies)}건")
+    print(f"전체 소요: {wall:.2f}s, 개별 지연 합: {total:.2f}s, 직렬화 비율: {wall / total if total else 0:.2f}")
+    print(f"응답 지연 p50: {_percentile(latencies, 0.5):.2f}s, p95: {_percentile(latencies, 0.95):.2f}s, "
+          f"최대: {max(latencies, default=0):.2f}s")
+    print(f"첫 프레임까지 p50: {_percentile(ttfts, 0.5):.2f}s, p95: {_percentile(ttfts, 0.95):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="ws://localhost:8000/api/ws/agent-chat")
+    parser.add_argument("--manual-id", required=True)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--user-prefix", default="loadtest_user_")
+    parser.add_argument("--stream", action="store_true", help="delta 프레임 스트리밍으로 요청")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,13 @@ from app.api.manual_summary_router import router as manual_summary_router
 from app.api.experiment_analysis_router import router as experiment_analysis_router
 # from app.api.web_voice_chat_router import router as web_voice_chat_router
 from app.api.user import router as user_router
-from app.services.agent_chat_service import flush_all_chat_logs
+from app.services.agent_chat_service import experiment_logger
+from app.services.chat_log_flusher import chat_log_flusher
+from app.services import conversation_memory
+from app.services.chat_log_archive_service import archive_old_chat_logs, CHAT_LOG_ARCHIVE_INTERVAL
+from app.services.vector_purge_service import (
+    process_purge_queue, compact_vector_store, recover_stale_jobs, VECTOR_COMPACTION_CHECK_INTERVAL
+)
 from app.db import create_tables
 import asyncio
 from fastapi.middleware.cors import CORSMiddleware
@@ -20,6 +26,7 @@ from app.api.experiment_router import router as experiment_router
 from app.api.chat_log_router import router as chat_log_router
 from app.api.voice_chat_router import router as voice_chat_router
 from app.api.briefing_router import router as briefing_router
+from app.api.metrics_router import router as metrics_router
 
 app = FastAPI()
 
@@ -34,13 +41,66 @@ app.add_middleware(
 )
 
 @app.on_event("startup")
-@repeat_every(seconds=60, wait_first=True)
-async def periodic_flush_chat_logs():
+async def start_chat_log_flusher():
+    """
+    Start the background task that moves buffered chat logs from Redis to the database.
+    """
+    chat_log_flusher.start()
+
+@app.on_event("shutdown")
+async def stop_chat_log_flusher():
+    """
+    Stop the flusher and persist whatever is still buffered.
+    """
+    await chat_log_flusher.stop()
+
+@app.on_event("startup")
+@repeat_every(seconds=CHAT_LOG_ARCHIVE_INTERVAL, wait_first=True)
+async def periodic_chat_log_archive():
+    """
+    Move chat logs older than the retention period into the archive table in a worker thread.
+    """
+    await asyncio.to_thread(archive_old_chat_logs)
+
+@app.on_event("startup")
+@repeat_every(seconds=30, wait_first=True)
+async def periodic_vector_purge():
+    """
+    Process queued vector deletions for deleted manuals in a worker thread.
+    """
+    await asyncio.to_thread(process_purge_queue)
+
+@app.on_event("startup")
+@repeat_every(seconds=VECTOR_COMPACTION_CHECK_INTERVAL, wait_first=True)
+async def periodic_vector_compaction():
+    """
+    Compact the vector store once enough vectors have been deleted and the compaction interval has passed.
+    """
+    await asyncio.to_thread(compact_vector_store)
+
+@app.on_event("startup")
+def recover_vector_purge_jobs():
+    """
+    Requeue vector purge jobs whose lease expired (their worker died mid-purge).
+    """
+    try:
+        recover_stale_jobs()
+    except Exception as e:
+        print(f"Vector purge job recovery failed: {e}")
+
+@app.on_event("startup")
+async def purge_legacy_voice_buffers():
+    """
+    Remove the old unbounded chat:{experiment_id} voice chat lists (runs once, idempotent).
+    """
+    await conversation_memory.purge_legacy_voice_buffers()
+
+@app.on_event("startup")
+async def import_legacy_experiment_logs():
     """
-    Periodically flush chat logs from Redis to the database.
-    Waits for the first 60 seconds before running.
+    Move experiment logs from the old JSON file into the experiment_logs table (runs once).
     """
-    flush_all_chat_logs()
+    await asyncio.to_thread(experiment_logger.import_legacy_file)
 
 @app.on_event("startup")
 def on_startup():
@@ -64,4 +124,5 @@ app.include_router(experiment_router, prefix="/api")
 app.include_router(chat_log_router, prefix="/api")
 app.include_router(manual_summary_router, prefix="/api")
 app.include_router(voice_chat_router, prefix="/api")
-app.include_router(briefing_router, prefix="/api")
\ No newline at end of file
+app.include_router(briefing_router, prefix="/api")
+app.include_router(metrics_router, prefix="/api")
\ No newline at end of file
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# app 모듈은 import 시점에 DB/API 키 환경 변수를 읽으므로 테스트용 값을 먼저 넣어 둡니다.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
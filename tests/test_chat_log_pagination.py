@@ -0,0 +1,86 @@
+"""
+/chat/continue 이어보기: Redis tail에서 응답하더라도 DB에 저장된 메시지는 id를 가져야 하고,
+그 id를 before 커서로 넘겨 이전 페이지를 읽을 수 있어야 합니다.
+"""
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (매퍼 관계 등록)
+from app.api import chat_log_router
+from app.core import metrics
+from app.db.database import get_db
+from app.models.chat_log_archive import ChatLogArchive
+from app.models.chat_logs import ChatLog
+from app.services import chat_log_service as service_module
+
+EXPERIMENT_ID = 7
+
+
+@pytest.fixture
+def client(monkeypatch):
+    redis_conn = fakeredis.FakeRedis(decode_responses=True)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    ChatLog.__table__.create(bind=engine)
+    ChatLogArchive.__table__.create(bind=engine)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    monkeypatch.setattr(metrics, "get_redis_conn", lambda: redis_conn)
+    monkeypatch.setattr(service_module.chat_log_service, "redis_conn", redis_conn)
+    monkeypatch.setattr(service_module, "SessionLocal", session_factory)
+    monkeypatch.setattr(service_module.id_resolver, "resolve", lambda kind, external_id: None)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(chat_log_router.router, prefix="/api")
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def _add(count: int, prefix: str = "msg"):
+    for i in range(count):
+        service_module.chat_log_service.add_chat_to_cache(EXPERIMENT_ID, "user", "manual", "user", f"{prefix} {i}")
+
+
+def test_continue_from_tail_returns_ids_after_flush(client):
+    _add(12)
+    service_module.chat_log_service.flush_chat_logs_from_cache_to_db()
+
+    logs = client.get(f"/api/chat/continue/{EXPERIMENT_ID}").json()
+    assert [log["message"] for log in logs] == [f"msg {i}" for i in range(2, 12)]
+    assert [log["id"] for log in logs] == list(range(3, 13))
+
+    # 두 번째 요청은 다시 채워진 tail에서 응답해도 id가 유지됨
+    assert client.get(f"/api/chat/continue/{EXPERIMENT_ID}").json() == logs
+
+
+def test_continue_pages_backwards_with_before(client):
+    _add(25)
+    service_module.chat_log_service.flush_chat_logs_from_cache_to_db()
+    _add(2, prefix="buffered")
+
+    latest = client.get(f"/api/chat/continue/{EXPERIMENT_ID}", params={"limit": 5}).json()
+    assert [log["message"] for log in latest] == ["msg 22", "msg 23", "msg 24", "buffered 0", "buffered 1"]
+    assert latest[-1]["id"] is None  # 아직 DB에 저장되지 않은 메시지
+
+    seen = [log["message"] for log in latest]
+    cursor = latest[0]["id"]
+    while cursor is not None:
+        page = client.get(f"/api/chat/continue/{EXPERIMENT_ID}", params={"limit": 5, "before": cursor}).json()
+        if not page:
+            break
+        assert all(log["id"] is not None for log in page)
+        seen = [log["message"] for log in page] + seen
+        cursor = page[0]["id"]
+
+    assert seen == [f"msg {i}" for i in range(25)] + ["buffered 0", "buffered 1"]
@@ -0,0 +1,77 @@
+"""
+로컬 메시지 분류기 보정: 기본 예시에 없는 표현(HELD_OUT)에서 확신도가 실제 정확도보다 크게 높지 않아야
+확신도 기준(MESSAGE_CLASSIFIER_CONFIDENCE)에 따른 LLM 대체가 의미를 가집니다.
+"""
+from app.services import message_classifier
+
+# 학습 예시(SEED_EXAMPLES)에 없는 일반적인 채팅 표현
+HELD_OUT = {
+    "message": [
+        "이 단계 끝나면 뭐 해야 돼?",
+        "온도 몇 도였지?",
+        "원심분리 몇 rpm으로 돌려야 하나요",
+        "시약 섞는 순서가 중요해?",
+        "결과가 이상하게 나왔는데 왜 그럴까요?",
+        "장비 전원은 언제 꺼도 되나요?",
+        "샘플 보관 온도 다시 알려줘",
+        "이거 안전한 거 맞아?",
+        "마스크도 써야 해요?",
+        "희석 배수 계산 어떻게 해?",
+        "how much buffer do I need?",
+        "배양은 며칠 해야 하나요",
+        "실험 끝나고 정리는 어떻게 해요?",
+        "흡광도 측정은 몇 번 반복해야 돼?",
+        "혹시 대체 시약 있을까요?",
+        "반응이 안 되면 뭘 확인해야 하죠?",
+    ],
+    "experiment_log": [
+        "방금 원심분리 끝냈어요",
+        "샘플 준비 다 했습니다",
+        "온도 25도에서 반응 시작함",
+        "pH 측정했더니 6.8 나왔어",
+        "겔에 샘플 로딩했어요",
+        "배양기에 플레이트 넣었습니다",
+        "시약 A 10mL 첨가 완료",
+        "용액이 뿌옇게 변했어요",
+        "측정 끝나서 데이터 저장했어",
+        "loaded the gel and started the run",
+        "세 번째 반복 측정 완료했습니다",
+        "침전이 생겨서 필터링했어요",
+        "장갑 갈아끼고 다시 시작했어",
+        "반응 20분 지났어요",
+        "흡광도 0.8로 나왔어요",
+        "실험 중간에 정전돼서 멈췄어요",
+    ],
+}
+
+
+def _held_out_predictions():
+    classifier = message_classifier.get_classifier()
+    assert classifier is not None
+    return [(label, *classifier.predict(text)) for label, texts in HELD_OUT.items() for text in texts]
+
+
+def test_bundled_weights_are_not_overconfident_on_held_out_messages():
+    predictions = _held_out_predictions()
+    accuracy = sum(label == predicted for label, predicted, _ in predictions) / len(predictions)
+    confidence = sum(c for _, _, c in predictions) / len(predictions)
+    assert accuracy >= 0.85
+    assert confidence - accuracy <= 0.03
+
+
+def test_misclassified_held_out_messages_fall_back_to_llm():
+    for label, predicted, confidence in _held_out_predictions():
+        if label != predicted:
+            assert confidence < message_classifier.MESSAGE_CLASSIFIER_CONFIDENCE
+
+
+def test_cross_validated_scale_beats_fixed_scale():
+    examples = [(text, label) for label, texts in message_classifier.SEED_EXAMPLES.items() for text in texts]
+    scored = message_classifier.held_out_scores(examples)
+    scale = message_classifier.fit_calibration_scale(scored)
+    assert message_classifier._log_loss(scored, scale) <= message_classifier._log_loss(scored, 20.0)
+
+
+def test_llm_classifier_is_the_default(monkeypatch):
+    monkeypatch.setattr(message_classifier, "MESSAGE_CLASSIFIER_ENABLED", False)
+    assert message_classifier.predict("PCR 실험 시작했어요") == (None, 0.0)